@@ -0,0 +1,224 @@
+"""
+Admission control for agent runs.
+
+Deep and lite queries get separate concurrency pools with bounded wait
+queues, so minutes-long deep runs can never hold up answers that should
+take seconds. Lite has priority: when its own pool is busy it may borrow an
+idle deep slot. A request that would have to queue beyond the pool's limit
+is rejected immediately, and one that waits too long gives up, in both cases
+with an estimate of when to retry, rather than piling up unbounded work.
+
+Everything here runs on the asyncio event loop, so no locking is needed.
+"""
+
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+try:
+    from agents.metrics import REGISTRY
+except ImportError:
+    from metrics import REGISTRY
+
+logger = logging.getLogger("Admission")
+
+ADMISSION_WAIT = REGISTRY.histogram(
+    "agent_admission_wait_seconds", "Time queued before an agent run was admitted", ["pool"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+ADMISSION_REJECTED = REGISTRY.counter(
+    "agent_admission_rejected_total", "Agent runs turned away by admission control", ["pool", "reason"]
+)
+
+REJECT_QUEUE_FULL = "queue_full"
+REJECT_TIMEOUT = "timeout"
+
+
+class Overloaded(Exception):
+    """
+    A run was not admitted.
+
+    `status_code` is 429 when the queue was already full and 503 when the
+    request waited for the full queue timeout; `retry_after` is in seconds.
+    """
+
+    def __init__(self, pool: str, reason: str, retry_after: int):
+        self.pool = pool
+        self.reason = reason
+        self.retry_after = retry_after
+        self.status_code = 429 if reason == REJECT_QUEUE_FULL else 503
+        super().__init__(f"{pool} agent is at capacity ({reason}); retry in {retry_after}s")
+
+
+class AdmissionPool:
+    """
+    Concurrency limit with a bounded FIFO wait queue.
+
+    Args:
+        name: Pool name used in metrics and errors
+        max_concurrency: Runs admitted at the same time
+        max_queued: Requests allowed to wait for a slot
+        queue_timeout: Seconds a request waits before giving up
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queued: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queued = max(0, max_queued)
+        self.queue_timeout = queue_timeout
+
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Smoothed time a slot is held, used for Retry-After estimates
+        self._hold_seconds: Optional[float] = None
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def has_capacity(self) -> bool:
+        return self.active < self.max_concurrency and not self._waiters
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up for a new request."""
+        hold = self._hold_seconds or 5.0
+        waves = (self.active + self.queued) / self.max_concurrency
+        return max(1, min(300, math.ceil(hold * max(1.0, waves))))
+
+    async def acquire(self) -> float:
+        """
+        Take a slot, waiting in line if needed.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            Overloaded: If the queue is full or the wait times out
+        """
+        if self.has_capacity():
+            self.active += 1
+            self.admitted += 1
+            return 0.0
+
+        if self.queued >= self.max_queued:
+            self.rejected += 1
+            raise Overloaded(self.name, REJECT_QUEUE_FULL, self.retry_after())
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # wait_for (not asyncio.timeout) keeps Python 3.10 supported; on
+            # timeout it cancels the waiter, so release() skips it
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise Overloaded(self.name, REJECT_TIMEOUT, self.retry_after()) from None
+            raise
+
+        self.admitted += 1
+        return time.perf_counter() - started
+
+    def release(self, held_seconds: Optional[float] = None):
+        """Free a slot, handing it directly to the longest waiting request."""
+        if held_seconds is not None:
+            self._hold_seconds = held_seconds if self._hold_seconds is None else (
+                0.8 * self._hold_seconds + 0.2 * held_seconds
+            )
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class Slot:
+    """An admitted run's hold on a pool slot. Releasing twice is a no-op."""
+
+    def __init__(self, pool: AdmissionPool, borrowed: bool = False):
+        self.pool = pool
+        self.borrowed = borrowed
+        self._acquired = time.perf_counter()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.pool.release(time.perf_counter() - self._acquired)
+
+
+class AdmissionController:
+    """
+    Deep and lite pools with lite priority.
+
+    Args:
+        deep: Pool for deep research runs
+        lite: Pool for lite runs
+    """
+
+    def __init__(self, deep: AdmissionPool, lite: AdmissionPool):
+        self.pools = {"deep": deep, "lite": lite}
+        self.borrowed = 0
+
+    async def admit(self, agent: str) -> Slot:
+        """
+        Admit a run of the given agent type.
+
+        Raises:
+            Overloaded: If the run cannot be admitted
+        """
+        pool = self.pools[agent]
+        deep = self.pools["deep"]
+        if agent == "lite" and not pool.has_capacity() and deep.has_capacity():
+            # Lite never waits while a deep slot sits idle
+            self.borrowed += 1
+            await deep.acquire()
+            ADMISSION_WAIT.observe(0.0, pool=agent)
+            return Slot(deep, borrowed=True)
+
+        try:
+            waited = await pool.acquire()
+        except Overloaded as e:
+            ADMISSION_REJECTED.inc(pool=agent, reason=e.reason)
+            logger.warning(str(e))
+            raise
+        ADMISSION_WAIT.observe(waited, pool=agent)
+        return Slot(pool)
+
+    @property
+    def max_concurrency(self) -> int:
+        return sum(pool.max_concurrency for pool in self.pools.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **{name: pool.stats() for name, pool in self.pools.items()},
+            "lite_borrowed_deep_slots": self.borrowed,
+        }
@@ -0,0 +1,322 @@
+"""
+Run-scoped tracking, encoding and lookup of generated artifacts.
+
+Tools that create files call `record_chart()`; the file is attributed to the
+deep research run active in the current context (set with `start_run()`).
+When the run finishes, `ImageIndex.collect()` returns only that run's charts,
+and base64 output is cached by content hash so a chart is never encoded twice.
+`ArtifactStore` persists a manifest per run so the API can serve the report
+and charts by URL.
+"""
+
+import base64
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar, Token
+from pathlib import Path
+from typing import Optional, Dict, List, Any
+
+logger = logging.getLogger("Artifacts")
+
+SUPPORTED_IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".gif", ".svg"}
+
+# Run ID of the deep research run executing in the current context.
+# LangGraph copies contextvars into its tool worker threads, so tools see it too.
+current_run: ContextVar[Optional[str]] = ContextVar("current_run", default=None)
+
+# run_id -> chart paths recorded while the run was active
+_run_charts: Dict[str, List[str]] = {}
+_registry_lock = threading.Lock()
+
+
+def start_run(run_id: str) -> Token:
+    """Mark `run_id` as the active run in this context. Pass the token to end_run()."""
+    with _registry_lock:
+        _run_charts.setdefault(run_id, [])
+    return current_run.set(run_id)
+
+
+def end_run(token: Token):
+    """Restore the previously active run."""
+    try:
+        current_run.reset(token)
+    except ValueError:
+        # Token created in a different context (generator resumed elsewhere)
+        current_run.set(None)
+
+
+def discard_run(run_id: str):
+    """Forget a run's recorded charts (e.g. after it failed)."""
+    with _registry_lock:
+        _run_charts.pop(run_id, None)
+
+
+def record_chart(path: str):
+    """Attribute a generated chart file to the active run, if any."""
+    run_id = current_run.get()
+    if run_id is None:
+        return
+    with _registry_lock:
+        charts = _run_charts.setdefault(run_id, [])
+        if path not in charts:
+            charts.append(path)
+
+
+def mime_type_for(path: Path) -> str:
+    """MIME type for an image file based on its extension."""
+    ext_lower = path.suffix[1:].lower()
+    if ext_lower == "svg":
+        return "image/svg+xml"
+    if ext_lower == "jpg":
+        return "image/jpeg"
+    return f"image/{ext_lower}"
+
+
+class ImageIndex:
+    """
+    Collects the charts produced by a single run and encodes them once.
+
+    Args:
+        max_cache_bytes: Upper bound on cached base64 output
+    """
+
+    def __init__(self, max_cache_bytes: int = 64 * 1024 * 1024):
+        self.max_cache_bytes = max_cache_bytes
+
+        # (path, mtime_ns, size) -> sha256, so unchanged files are not re-read
+        self._digests: "OrderedDict[tuple, str]" = OrderedDict()
+        # sha256 -> base64 string, least recently used first
+        self._encoded: "OrderedDict[str, str]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def run_paths(self, run_id: str, release: bool = True) -> List[Path]:
+        """
+        Chart files produced by a run.
+
+        Only charts recorded for this run count: images that merely appeared
+        while it ran may belong to a concurrent run.
+        """
+        with _registry_lock:
+            if release:
+                recorded = _run_charts.pop(run_id, [])
+            else:
+                recorded = list(_run_charts.get(run_id, []))
+        return [Path(p) for p in recorded if Path(p).exists()]
+
+    def digest(self, filepath: Path) -> tuple[str, Optional[bytes]]:
+        """
+        Content hash of a file.
+
+        Returns:
+            tuple: (sha256 hex digest, file bytes if they had to be read, else None)
+        """
+        stat = filepath.stat()
+        key = (str(filepath.resolve()), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._digests.get(key)
+        if cached:
+            return cached, None
+
+        data = filepath.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._digests[key] = digest
+            if len(self._digests) > 4096:
+                self._digests.popitem(last=False)
+        return digest, data
+
+    def describe(self, filepath: Path) -> Dict[str, Any]:
+        """Image metadata without the encoded payload."""
+        digest, _ = self.digest(filepath)
+        return {
+            "filename": filepath.name,
+            "mime_type": mime_type_for(filepath),
+            "size_bytes": filepath.stat().st_size,
+            "sha256": digest,
+            "path": str(filepath),
+        }
+
+    def encode(self, filepath: Path) -> Dict[str, Any]:
+        """Base64-encode an image, reusing cached output for identical content."""
+        digest, data = self.digest(filepath)
+        with self._lock:
+            encoded = self._encoded.get(digest)
+            if encoded is not None:
+                self._encoded.move_to_end(digest)
+
+        if encoded is None:
+            if data is None:
+                data = filepath.read_bytes()
+            encoded = base64.b64encode(data).decode("utf-8")
+            with self._lock:
+                if digest not in self._encoded:
+                    self._encoded[digest] = encoded
+                    self._cached_bytes += len(encoded)
+                    while self._cached_bytes > self.max_cache_bytes and len(self._encoded) > 1:
+                        _, evicted = self._encoded.popitem(last=False)
+                        self._cached_bytes -= len(evicted)
+
+        return {
+            "filename": filepath.name,
+            "mime_type": mime_type_for(filepath),
+            "base64": encoded,
+            "size_bytes": filepath.stat().st_size,
+            "sha256": digest,
+            "path": str(filepath),
+        }
+
+    def collect(self, run_id: str, inline: bool = True) -> List[Dict[str, Any]]:
+        """
+        Describe (and optionally encode) the charts produced by a run.
+
+        Args:
+            run_id: Run whose charts to collect
+            inline: Include base64 data; otherwise only metadata is returned
+
+        Returns:
+            List of dicts with filename, mime_type, size, hash, local path and
+            base64 data when inline
+        """
+        images = []
+        seen = set()
+        for filepath in self.run_paths(run_id):
+            abs_path = filepath.resolve()
+            if abs_path in seen:
+                continue
+            try:
+                images.append(self.encode(filepath) if inline else self.describe(filepath))
+                seen.add(abs_path)
+                logger.debug(f"Encoded image: {filepath.name}")
+            except Exception as e:
+                logger.warning(f"Could not process image {filepath}: {e}")
+
+        logger.info(f"Collected {len(images)} images for run {run_id[:8]}...")
+        return images
+
+
+class ArtifactStore:
+    """
+    Persists, per run, the mapping from artifact name to file on disk.
+
+    Manifests are small JSON files, so any worker process can serve a run's
+    artifacts regardless of which process produced them. A run that is
+    executing also keeps a `<run_id>.running` marker fresh, so other workers
+    can tell it apart from a run whose process died.
+
+    Args:
+        runs_dir: Directory holding one `<run_id>.json` manifest per run
+    """
+
+    _RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+    def __init__(self, runs_dir: Path):
+        self.runs_dir = Path(runs_dir)
+
+    def _manifest_path(self, run_id: str) -> Optional[Path]:
+        if not self._RUN_ID_PATTERN.match(run_id):
+            return None
+        return self.runs_dir / f"{run_id}.json"
+
+    def save(self, run_id: str, artifacts: Dict[str, str], **metadata):
+        """
+        Write a run's manifest.
+
+        Args:
+            run_id: Run identifier (thread ID)
+            artifacts: Artifact name -> absolute file path
+            metadata: Extra fields stored with the manifest (query, session_id, ...)
+        """
+        manifest_path = self._manifest_path(run_id)
+        if manifest_path is None:
+            raise ValueError(f"Invalid run id: {run_id}")
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+
+        manifest = self.load(run_id) or {"run_id": run_id, "created_at": time.time()}
+        manifest.update(metadata)
+        manifest.setdefault("artifacts", {}).update(artifacts)
+
+        # Atomic replace so readers never see a partial file
+        tmp_path = manifest_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, manifest_path)
+
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Manifest of a run, or None if unknown."""
+        manifest_path = self._manifest_path(run_id)
+        if manifest_path is None or not manifest_path.exists():
+            return None
+        try:
+            return json.loads(manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read manifest for run {run_id}: {e}")
+            return None
+
+    def heartbeat(self, run_id: str, start: bool = False):
+        """
+        Refresh the marker of an executing run.
+
+        Only `start` creates the marker, so a heartbeat racing with
+        end_heartbeat() cannot bring a finished run back to life.
+        """
+        manifest_path = self._manifest_path(run_id)
+        if manifest_path is None:
+            raise ValueError(f"Invalid run id: {run_id}")
+        marker = manifest_path.with_suffix(".running")
+        if start:
+            self.runs_dir.mkdir(parents=True, exist_ok=True)
+            marker.touch()
+        else:
+            try:
+                os.utime(marker)
+            except FileNotFoundError:
+                pass
+
+    def end_heartbeat(self, run_id: str):
+        """Remove the marker of a run that stopped executing."""
+        manifest_path = self._manifest_path(run_id)
+        if manifest_path is not None:
+            manifest_path.with_suffix(".running").unlink(missing_ok=True)
+
+    def is_running(self, run_id: str, timeout: float) -> bool:
+        """Whether some worker refreshed the run's marker within `timeout` seconds."""
+        manifest_path = self._manifest_path(run_id)
+        if manifest_path is None:
+            return False
+        try:
+            beat = manifest_path.with_suffix(".running").stat().st_mtime
+        except FileNotFoundError:
+            return False
+        return time.time() - beat < timeout
+
+    def resolve(self, run_id: str, name: str) -> Optional[Path]:
+        """
+        File backing an artifact.
+
+        Only names listed in the run's manifest resolve, so arbitrary paths
+        can never be requested.
+        """
+        manifest = self.load(run_id)
+        if not manifest:
+            return None
+        path = manifest.get("artifacts", {}).get(name)
+        if not path or not os.path.isfile(path):
+            return None
+        return Path(path)
+
+
+def content_type_for(path: Path) -> str:
+    """Content-Type header value for an artifact file."""
+    if path.suffix.lower() in SUPPORTED_IMAGE_SUFFIXES:
+        return mime_type_for(path)
+    if path.suffix.lower() == ".md":
+        return "text/markdown; charset=utf-8"
+    guessed, _ = mimetypes.guess_type(path.name)
+    return guessed or "application/octet-stream"
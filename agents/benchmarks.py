@@ -0,0 +1,583 @@
+"""
+Micro-benchmarks for the agent serving stack.
+
+Usage:
+    python agents/benchmarks.py stream [--steps 200] [--content-size 2000] [--query "..."]
+    python agents/benchmarks.py importtime [--module route] [--top 15] [--runs 3] [--build]
+    python agents/benchmarks.py resume [--subagents 6] [--kill-at 4] [--work 0.2]
+    python agents/benchmarks.py serialization [--report output/report.md] [--steps 60] [--images 4] [--repeat 200]
+    python agents/benchmarks.py litecontext [--dir output] [--copies 30] [--query "..."] [--llm]
+"""
+
+import re
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, Callable, Iterable, List
+
+try:
+    from agents.streaming import iter_message_deltas
+except ImportError:
+    from streaming import iter_message_deltas
+
+
+def _measure(run: Callable[[], Iterable[Any]], size_of: Callable[[Any], int]) -> Dict[str, float]:
+    """Consume an iterator, recording CPU time, wall time, chunk count and payload bytes."""
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    chunks = 0
+    payload_bytes = 0
+    for chunk in run():
+        chunks += 1
+        payload_bytes += size_of(chunk)
+    return {
+        "chunks": chunks,
+        "payload_bytes": payload_bytes,
+        "cpu_seconds": round(time.process_time() - cpu_start, 4),
+        "wall_seconds": round(time.perf_counter() - wall_start, 4),
+    }
+
+
+def _message_bytes(message: Any) -> int:
+    """Serialized size of a message as it would be forwarded to a client."""
+    if isinstance(message, dict):
+        return len(json.dumps(message, default=str))
+    return len(json.dumps({
+        "type": getattr(message, "type", ""),
+        "content": str(getattr(message, "content", "")),
+        "tool_calls": getattr(message, "tool_calls", None) or [],
+    }, default=str))
+
+
+def build_synthetic_graph(steps: int, content_size: int):
+    """
+    A LangGraph loop that appends one message of `content_size` chars per step.
+
+    Exercises the streaming machinery without any LLM or network calls.
+    """
+    from typing import Annotated, TypedDict
+    from langgraph.graph import StateGraph, START, END
+    from langgraph.graph.message import add_messages
+    from langchain_core.messages import AIMessage
+
+    class State(TypedDict):
+        messages: Annotated[list, add_messages]
+
+    def agent_node(state: State):
+        return {"messages": [AIMessage(content="x" * content_size)]}
+
+    def should_continue(state: State):
+        return END if len(state["messages"]) > steps else "agent"
+
+    graph = StateGraph(State)
+    graph.add_node("agent", agent_node)
+    graph.add_edge(START, "agent")
+    graph.add_conditional_edges("agent", should_continue)
+    return graph.compile()
+
+
+def bench_stream_modes(agent, query: str, recursion_limit: int = 1000) -> Dict[str, Dict[str, float]]:
+    """
+    Compare full-state ("values") streaming with message-delta streaming.
+
+    Returns:
+        Per-mode chunk count, payload bytes, CPU and wall time for one run
+    """
+    inputs = {"messages": [{"role": "user", "content": query}]}
+
+    def values_mode():
+        config = {"configurable": {"thread_id": "bench-values"}, "recursion_limit": recursion_limit}
+        return agent.stream(inputs, config=config, stream_mode="values")
+
+    def deltas_mode():
+        config = {"configurable": {"thread_id": "bench-deltas"}, "recursion_limit": recursion_limit}
+        return iter_message_deltas(agent, inputs, config=config)
+
+    return {
+        "values": _measure(values_mode, lambda state: sum(_message_bytes(m) for m in state.get("messages", []))),
+        "deltas": _measure(deltas_mode, _message_bytes),
+    }
+
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+_TIMED_IMPORT = """
+import time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+built = None
+if {build}:
+    from final import get_agent
+    get_agent()
+    built = time.perf_counter()
+print(imported - started, (built - imported) if built else -1)
+"""
+
+
+def _run_in_agents_dir(args: List[str]) -> subprocess.CompletedProcess:
+    """Run a fresh interpreter from the agents directory (where the modules import each other)."""
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True
+    )
+
+
+def bench_import_time(module: str = "route", top: int = 15, runs: int = 3, build: bool = False) -> Dict[str, Any]:
+    """
+    Startup cost of importing a module, in fresh interpreters.
+
+    Returns:
+        Best-of-N import (and optionally deep agent build) wall time, plus the
+        slowest imports by cumulative and self time from `python -X importtime`
+    """
+    import_seconds, build_seconds = [], []
+    for _ in range(runs):
+        proc = _run_in_agents_dir(["-c", _TIMED_IMPORT.format(module=module, build=build)])
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr.strip()[-2000:]}")
+        imported, built = (float(v) for v in proc.stdout.split()[-2:])
+        import_seconds.append(imported)
+        if built >= 0:
+            build_seconds.append(built)
+
+    proc = _run_in_agents_dir(["-X", "importtime", "-c", f"import {module}"])
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                "module": name,
+                "depth": len(indent) // 2,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+            })
+
+    return {
+        "import_seconds": round(min(import_seconds), 3),
+        "build_seconds": round(min(build_seconds), 3) if build_seconds else None,
+        "modules_imported": len(entries),
+        "by_cumulative": sorted(entries, key=lambda e: e["cumulative_ms"], reverse=True)[:top],
+        "by_self": sorted(entries, key=lambda e: e["self_ms"], reverse=True)[:top],
+    }
+
+
+def _print_import_report(module: str, report: Dict[str, Any]):
+    print(f"\nImport time of '{module}' (best of runs, fresh interpreter)")
+    print("-" * 80)
+    print(f"import:            {report['import_seconds']:.3f}s ({report['modules_imported']} modules)")
+    if report["build_seconds"] is not None:
+        print(f"deep agent build:  {report['build_seconds']:.3f}s")
+    for title, key in (("Slowest imports (cumulative)", "by_cumulative"), ("Slowest imports (self)", "by_self")):
+        print(f"\n{title}")
+        print(f"{'module':<50}{'self ms':>14}{'cumulative ms':>16}")
+        for entry in report[key]:
+            print(f"{entry['module'][:49]:<50}{entry['self_ms']:>14.1f}{entry['cumulative_ms']:>16.1f}")
+
+
+def build_checkpointed_graph(subagents: int, calls_log: Path, kill_at: int = 0, work: float = 0.0):
+    """
+    A LangGraph loop that delegates `subagents` times, checkpointed to SQLite by the caller.
+
+    Every subagent call appends "start <i>" and "done <i>" to `calls_log`, so
+    repeated work is visible across processes. With `kill_at` the process is
+    killed (no cleanup, like SIGKILL) in the middle of that subagent call.
+    """
+    import os
+    from typing import Annotated, TypedDict
+    from langgraph.graph import StateGraph, START, END
+    from langgraph.graph.message import add_messages
+    from langchain_core.messages import AIMessage
+
+    class State(TypedDict):
+        messages: Annotated[list, add_messages]
+        completed: int
+
+    def log_call(line: str):
+        with open(calls_log, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def planner(state: State):
+        return {"messages": [AIMessage(content=f"delegate subagent {state.get('completed', 0) + 1}")]}
+
+    def subagent(state: State):
+        call = state.get("completed", 0) + 1
+        log_call(f"start {call}")
+        time.sleep(work)
+        if call == kill_at:
+            os._exit(137)
+        log_call(f"done {call}")
+        return {"messages": [AIMessage(content=f"subagent {call} finished")], "completed": call}
+
+    def should_continue(state: State):
+        return END if state.get("completed", 0) >= subagents else "planner"
+
+    graph = StateGraph(State)
+    graph.add_node("planner", planner)
+    graph.add_node("subagent", subagent)
+    graph.add_edge(START, "planner")
+    graph.add_edge("planner", "subagent")
+    graph.add_conditional_edges("subagent", should_continue)
+    return graph
+
+
+def _compile_with_sqlite(graph, db_path: Path):
+    import sqlite3
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    return graph.compile(checkpointer=SqliteSaver(conn)), conn
+
+
+_RESUME_CHILD = """
+import sys
+from pathlib import Path
+from benchmarks import build_checkpointed_graph, _compile_with_sqlite
+graph = build_checkpointed_graph({subagents}, Path({calls_log!r}), kill_at={kill_at}, work={work})
+agent, _ = _compile_with_sqlite(graph, Path({db_path!r}))
+agent.invoke({{"messages": [("user", "benchmark")], "completed": 0}}, {{"configurable": {{"thread_id": "resume-demo"}}}})
+"""
+
+
+def bench_resume(subagents: int = 6, kill_at: int = 4, work: float = 0.2) -> Dict[str, Any]:
+    """
+    Kill a checkpointed run mid-way, resume it, and count repeated subagent work.
+
+    The run is started in a child interpreter that dies inside subagent call
+    `kill_at`; this process then resumes the same thread from the SQLite
+    checkpoint, the way POST /api/runs/{id}/resume does.
+
+    Returns:
+        Calls started/finished before and after the kill, the calls repeated
+        on resume (only the one interrupted mid-flight should be), and wall time
+    """
+    import tempfile
+
+    if not 0 < kill_at <= subagents:
+        raise ValueError("--kill-at must be between 1 and --subagents")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path, calls_log = Path(tmp) / "checkpoints.db", Path(tmp) / "calls.log"
+        calls_log.touch()
+
+        started = time.perf_counter()
+        proc = _run_in_agents_dir(["-c", _RESUME_CHILD.format(
+            subagents=subagents, calls_log=str(calls_log), kill_at=kill_at, work=work, db_path=str(db_path)
+        )])
+        killed_after = time.perf_counter() - started
+        if proc.returncode != 137:
+            raise RuntimeError(f"Run was not killed as expected (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+        before = calls_log.read_text(encoding="utf-8").split()
+
+        agent, conn = _compile_with_sqlite(build_checkpointed_graph(subagents, calls_log, work=work), db_path)
+        try:
+            config = {"configurable": {"thread_id": "resume-demo"}}
+            resumed_from = len(agent.get_state(config).values.get("messages", []))
+            started = time.perf_counter()
+            agent.invoke(None, config)
+            resume_seconds = time.perf_counter() - started
+            final = agent.get_state(config).values
+        finally:
+            conn.close()
+        after = calls_log.read_text(encoding="utf-8").split()[len(before):]
+
+    return {
+        "subagents": subagents,
+        "kill_at": kill_at,
+        "finished_before_kill": _logged_calls(before, "done"),
+        "started_on_resume": _logged_calls(after, "start"),
+        "repeated_on_resume": sorted(set(_logged_calls(before, "done")) & set(_logged_calls(after, "start"))),
+        "resumed_from_messages": resumed_from,
+        "completed": final.get("completed"),
+        "seconds_before_kill": round(killed_after, 3),
+        "resume_seconds": round(resume_seconds, 3),
+        "restart_seconds_estimate": round(subagents * work, 3),
+    }
+
+
+def _logged_calls(tokens: List[str], op: str) -> List[int]:
+    """Call numbers logged with `op` in a whitespace-split calls log."""
+    return [int(n) for logged_op, n in zip(tokens[::2], tokens[1::2]) if logged_op == op]
+
+
+def _print_resume_report(report: Dict[str, Any]):
+    print(f"\nKill-and-resume of a checkpointed run ({report['subagents']} subagent calls, killed during #{report['kill_at']})")
+    print("-" * 80)
+    for key, value in report.items():
+        print(f"{key:<28}{value}")
+    ok = not report["repeated_on_resume"] and report["completed"] == report["subagents"]
+    print(f"\n{'PASS' if ok else 'FAIL'}: finished subagent calls were {'not ' if ok else ''}repeated on resume")
+    return 0 if ok else 1
+
+
+def build_deep_payload(report: str, steps: int, images: int, image_bytes: int) -> Dict[str, Any]:
+    """
+    A deep run's SSE events and final result, shaped like `_run_deep_agent` output.
+
+    Images are random bytes (as incompressible as real PNGs) embedded as base64,
+    i.e. the `inline_artifacts=true` case.
+    """
+    import os
+    import base64
+    from datetime import datetime
+
+    run_id = "0" * 8 + "-bench"
+    step_events = [
+        {
+            "type": "step",
+            "data": {
+                "step_number": i + 1,
+                "role": "ai" if i % 2 == 0 else "tool",
+                "content": report[(i * 400) % max(len(report), 1):][:800],
+                "sender": "DeepAgent",
+                "timestamp": datetime.now().isoformat(),
+                **({"tool_calls": [{"name": "task", "args": {"subagent_type": "pubmed-agent", "description": report[:200]}}]}
+                   if i % 2 == 0 else {}),
+            },
+        }
+        for i in range(steps)
+    ]
+    image_list = [
+        {
+            "filename": f"chart_{i}.png",
+            "url": f"/api/artifacts/{run_id}/chart_{i}.png",
+            "size_bytes": image_bytes,
+            "base64": base64.b64encode(os.urandom(image_bytes)).decode("ascii"),
+        }
+        for i in range(images)
+    ]
+    result = {
+        "agent": "deep",
+        "text": report,
+        "report_base64": base64.b64encode(report.encode("utf-8")).decode("ascii"),
+        "report_filename": "report.md",
+        "report_url": f"/api/artifacts/{run_id}/report.md",
+        "report_size_bytes": len(report.encode("utf-8")),
+        "images": image_list,
+        "run_id": run_id,
+        "session_id": "bench-session",
+        "timestamp": datetime.now().isoformat(),
+        "total_steps": steps,
+    }
+    return {"steps": step_events, "result": result}
+
+
+def bench_serialization(payload: Dict[str, Any], repeat: int = 200) -> Dict[str, Dict[str, Any]]:
+    """
+    Serialization CPU and bytes on the wire for a deep result and its SSE stream.
+
+    Compares the previous stdlib encoding (`json.dumps(..., ensure_ascii=False)`)
+    with `compression.dumps`, and each body uncompressed, gzip (one-shot for
+    JSON, sync-flushed per event for SSE) and brotli when installed.
+    """
+    try:
+        from agents import compression
+    except ImportError:
+        import compression
+
+    def stdlib_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    def cpu_ms(fn, *args) -> float:
+        started = time.process_time()
+        for _ in range(repeat):
+            fn(*args)
+        return round((time.process_time() - started) / repeat * 1000, 3)
+
+    def sse_bytes(encode) -> List[bytes]:
+        return [b"data: " + encode(event) + b"\n\n" for event in payload["steps"]]
+
+    def stream_size(chunks: List[bytes], encoding: str) -> int:
+        compressor = compression.StreamCompressor(encoding, flush=True)
+        return sum(len(compressor.compress(chunk)) for chunk in chunks) + len(compressor.finish())
+
+    results = {}
+    for name, encode in (("json", stdlib_dumps), (compression.JSON_BACKEND + "*", compression.dumps)):
+        body = encode(payload["result"])
+        chunks = sse_bytes(encode)
+        row = {
+            "result_ms": cpu_ms(encode, payload["result"]),
+            "sse_ms": cpu_ms(sse_bytes, encode),
+            "result_bytes": len(body),
+            "sse_bytes": sum(len(c) for c in chunks),
+        }
+        for encoding in compression.supported_encodings():
+            row[f"result_{encoding}"] = len(compression.compress(body, encoding))
+            row[f"sse_{encoding}"] = stream_size(chunks, encoding)
+        row[f"{compression.supported_encodings()[-1]}_ms"] = cpu_ms(
+            compression.compress, body, compression.supported_encodings()[-1]
+        )
+        results[name] = row
+    return results
+
+
+DEFAULT_LITE_QUERIES = (
+    "What is minocycline CAGR?",
+    "Which patents on minocycline expire soon?",
+    "Summarize the ongoing clinical trials",
+)
+
+
+def bench_lite_context(
+    report_dir: Path,
+    queries: Iterable[str] = DEFAULT_LITE_QUERIES,
+    copies: int = 1,
+    repeat: int = 20,
+    llm: bool = False
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Prompt size and latency of lite answers: top-k report sections vs. every report in full.
+
+    Reports from `report_dir` are copied `copies` times into a scratch
+    directory to simulate a full `output/` folder. Prompt tokens are
+    estimated as characters / 4. With `llm` each query is also answered by
+    the real lite agent in both modes (uses API quota).
+    """
+    import shutil
+    import tempfile
+    import statistics
+
+    try:
+        from agents import lite
+    except ImportError:
+        import lite
+
+    queries = list(queries)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = Path(tmp)
+        reports = sorted(Path(report_dir).glob("*.md"))
+        if not reports:
+            raise ValueError(f"No reports found in {report_dir}")
+        for i in range(copies):
+            for report in reports:
+                shutil.copy(report, scratch / f"{report.stem}_{i:03d}.md")
+
+        corpus = lite.ReportCorpus(scratch)
+        index = lite.ReportIndex(corpus)
+        originals = lite.get_corpus, lite.get_report_index
+        lite.get_corpus, lite.get_report_index = (lambda: corpus), (lambda: index)
+        try:
+            started = time.perf_counter()
+            index.sync()
+            index_seconds = time.perf_counter() - started
+
+            for mode in ("full", "sections"):
+                prompt_chars, build_ms, answer_seconds = [], [], []
+                for query in queries:
+                    prompt = lite.build_prompt(query, mode)
+                    prompt_chars.append(len(prompt))
+                    started = time.perf_counter()
+                    for _ in range(repeat):
+                        lite.build_prompt(query, mode)
+                    build_ms.append((time.perf_counter() - started) / repeat * 1000)
+                    if llm:
+                        agent = lite.get_agent()
+                        started = time.perf_counter()
+                        agent.invoke({"messages": [{"role": "user", "content": prompt}]})
+                        answer_seconds.append(time.perf_counter() - started)
+                results[mode] = {
+                    "reports": len(reports) * copies,
+                    "prompt_tokens": int(statistics.mean(prompt_chars) / 4),
+                    "build_ms": round(statistics.median(build_ms), 3),
+                    "answer_s": round(statistics.median(answer_seconds), 2) if answer_seconds else "-",
+                }
+            results["sections"]["index_build_ms"] = round(index_seconds * 1000, 1)
+            results["full"]["index_build_ms"] = "-"
+        finally:
+            lite.get_corpus, lite.get_report_index = originals
+    return results
+
+
+def _print_table(title: str, results: Dict[str, Dict[str, Any]]):
+    print(f"\n{title}")
+    print("-" * 80)
+    columns = list(next(iter(results.values())).keys())
+    print(f"{'':<12}" + "".join(f"{c:>17}" for c in columns))
+    for name, row in results.items():
+        print(f"{name:<12}" + "".join(f"{row[c]:>17}" for c in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agent serving micro-benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stream = commands.add_parser("stream", help="Compare values vs. delta streaming")
+    stream.add_argument("--steps", type=int, default=200, help="Synthetic graph steps")
+    stream.add_argument("--content-size", type=int, default=2000, help="Chars per synthetic message")
+    stream.add_argument("--query", help="Run against the real deep agent with this query instead")
+
+    importtime = commands.add_parser("importtime", help="Startup cost of importing the API")
+    importtime.add_argument("--module", default="route", help="Module to import (from the agents directory)")
+    importtime.add_argument("--top", type=int, default=15, help="Slowest imports to list")
+    importtime.add_argument("--runs", type=int, default=3, help="Fresh interpreters to time")
+    importtime.add_argument("--build", action="store_true", help="Also time building the deep agent")
+
+    resume = commands.add_parser("resume", help="Kill a checkpointed run mid-way and resume it")
+    resume.add_argument("--subagents", type=int, default=6, help="Subagent calls in the run")
+    resume.add_argument("--kill-at", type=int, default=4, help="Subagent call during which the run is killed")
+    resume.add_argument("--work", type=float, default=0.2, help="Seconds each subagent call takes")
+
+    serialization = commands.add_parser("serialization", help="JSON encoding CPU and compressed sizes of a deep result")
+    serialization.add_argument("--report", help="Markdown report to embed (default: output/minocycline_research_report.md)")
+    serialization.add_argument("--steps", type=int, default=60, help="SSE step events")
+    serialization.add_argument("--images", type=int, default=4, help="Inline base64 images")
+    serialization.add_argument("--image-bytes", type=int, default=60_000, help="Bytes per image")
+    serialization.add_argument("--repeat", type=int, default=200, help="Encodings timed per measurement")
+
+    litecontext = commands.add_parser("litecontext", help="Lite prompt size and latency: top-k sections vs. full reports")
+    litecontext.add_argument("--dir", default=str(Path(__file__).parent.parent / "output"), help="Directory with reports")
+    litecontext.add_argument("--copies", type=int, default=30, help="Copies of each report, to simulate a full output folder")
+    litecontext.add_argument("--query", action="append", help="Question to measure (repeatable)")
+    litecontext.add_argument("--repeat", type=int, default=20, help="Prompt builds timed per query")
+    litecontext.add_argument("--llm", action="store_true", help="Also time real lite answers (uses API quota)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "stream":
+        if args.query:
+            try:
+                from agents.final import get_agent
+            except ImportError:
+                from final import get_agent
+            agent = get_agent()
+            results = bench_stream_modes(agent, args.query)
+            title = f"Deep agent stream modes: '{args.query[:50]}'"
+        else:
+            agent = build_synthetic_graph(args.steps, args.content_size)
+            results = bench_stream_modes(agent, "benchmark", recursion_limit=args.steps + 10)
+            title = f"Synthetic graph stream modes ({args.steps} steps x {args.content_size} chars)"
+        _print_table(title, results)
+
+    elif args.command == "importtime":
+        _print_import_report(args.module, bench_import_time(args.module, args.top, args.runs, args.build))
+
+    elif args.command == "serialization":
+        report_path = Path(args.report) if args.report else Path(__file__).parent.parent / "output" / "minocycline_research_report.md"
+        report = report_path.read_text(encoding="utf-8") if report_path.exists() else "## Findings\n" + "Lorem ipsum dolor sit amet. " * 2000
+        payload = build_deep_payload(report, args.steps, args.images, args.image_bytes)
+        results = bench_serialization(payload, args.repeat)
+        _print_table(
+            f"Deep result serialization ({len(report)} char report, {args.images} inline images, {args.steps} SSE steps; * = new path)",
+            results
+        )
+        print("\n*_ms: CPU ms per encoding; *_bytes / *_gzip / *_br: bytes on the wire")
+
+    elif args.command == "litecontext":
+        results = bench_lite_context(
+            Path(args.dir), args.query or DEFAULT_LITE_QUERIES, args.copies, args.repeat, args.llm
+        )
+        _print_table(f"Lite context per question ({args.copies} copies of each report in {args.dir})", results)
+
+    elif args.command == "resume":
+        return _print_resume_report(bench_resume(args.subagents, args.kill_at, args.work))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
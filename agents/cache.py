@@ -0,0 +1,270 @@
+"""
+Caches of deep research results and lite answers.
+
+Repeated questions ("Minocycline repurposing for CNS") are answered from a
+local SQLite cache instead of re-running the whole orchestrator. Entries are
+keyed by the normalized query text plus a data-version stamp, expire after a
+TTL and are evicted least-recently-used once the cache is full. Lite
+follow-ups ("current market size") are cached in memory the same way, keyed
+by the version of the reports their answer was built from.
+"""
+
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterable
+
+try:
+    from agents.sqlite_local import ThreadLocalConnection
+except ImportError:
+    from sqlite_local import ThreadLocalConnection
+
+logger = logging.getLogger("ReportCache")
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a query."""
+    text = unicodedata.normalize("NFKC", query).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def compute_data_version(sources: Iterable[Path], extra: str = "") -> str:
+    """
+    Stamp identifying the data behind cached reports.
+
+    Changes whenever a source file (or any file in a source directory) is
+    added, removed or modified, so reports built on stale data are not reused.
+    """
+    h = hashlib.sha256(extra.encode("utf-8"))
+    for source in sources:
+        source = Path(source)
+        files = sorted(source.rglob("*")) if source.is_dir() else [source]
+        for f in files:
+            try:
+                stat = f.stat()
+            except OSError:
+                continue
+            if f.is_file():
+                h.update(f"{f.name}:{stat.st_size}:{stat.st_mtime_ns};".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+class ReportCache:
+    """
+    SQLite-backed result cache with TTL and LRU size bound.
+
+    Args:
+        db_path: Path of the SQLite database file
+        data_version: Stamp of the local data, mixed into every key together
+            with the generation bumped by invalidate_all()
+        ttl_seconds: Age after which an entry is ignored and removed
+        max_entries: Maximum entries kept; least recently used are evicted
+    """
+
+    def __init__(self, db_path: str, data_version: str = "", ttl_seconds: float = 24 * 3600, max_entries: int = 500):
+        self.db_path = str(db_path)
+        self.base_version = data_version
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._connection = ThreadLocalConnection(self.db_path)
+
+        self.hits = 0
+        self.misses = 0
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS reports ("
+                " key TEXT PRIMARY KEY,"
+                " query TEXT NOT NULL,"
+                " data_version TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_last_access ON reports(last_access)")
+            # Kept in the database so every worker and restart sees the same generation
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    @property
+    def data_version(self) -> str:
+        """Current data version: the local data stamp plus the invalidation generation."""
+        row = self._connection().execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        return f"{self.base_version}.{row[0]}" if row else self.base_version
+
+    def key_for(self, query: str, data_version: Optional[str] = None) -> str:
+        """Cache key of a query under the current (or the given) data version."""
+        if data_version is None:
+            data_version = self.data_version
+        return hashlib.sha256(f"{data_version}\n{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Cached result for a query, or None on a miss or expired entry."""
+        key = self.key_for(query)
+        now = time.time()
+        with self._connection() as conn:
+            row = conn.execute("SELECT result, created_at FROM reports WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute("UPDATE reports SET last_access = ? WHERE key = ?", (now, key))
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, query: str, result: Dict[str, Any]):
+        """Store a result, evicting the least recently used entries beyond max_entries."""
+        now = time.time()
+        data_version = self.data_version
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reports(key, query, data_version, result, created_at, last_access) "
+                "VALUES(?, ?, ?, ?, ?, ?)",
+                (self.key_for(query, data_version), normalize_query(query), data_version,
+                 json.dumps(result, ensure_ascii=False), now, now)
+            )
+            overflow = conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0] - self.max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM reports WHERE key IN "
+                    "(SELECT key FROM reports ORDER BY last_access LIMIT ?)",
+                    (overflow,)
+                )
+
+    def invalidate(self, query: str) -> bool:
+        """Drop the entry for a query. Returns False if there was none."""
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM reports WHERE key = ?", (self.key_for(query),)).rowcount > 0
+
+    def invalidate_all(self) -> str:
+        """
+        Start a new data generation, e.g. after documents were ingested into
+        the knowledge base, which the local data stamp cannot see.
+
+        Returns:
+            The new data version
+        """
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO meta(name, value) VALUES('generation', 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1"
+            )
+            data_version = self.data_version
+            conn.execute("DELETE FROM reports WHERE data_version != ?", (data_version,))
+        logger.info(f"Report cache invalidated, data version {data_version}")
+        return data_version
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and hit/miss counters (this process)."""
+        entries = self._connection().execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "data_version": self.data_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class AnswerCache:
+    """
+    In-memory LRU cache of lite answers with a TTL.
+
+    An answer is keyed by the normalized question plus a version stamp of the
+    report files its context came from, so a new or changed report only
+    affects the answers it feeds. Entries also remember those files by name,
+    so a changed report can drop its dependents right away instead of
+    leaving them to age out.
+
+    Args:
+        ttl_seconds: Age after which an entry is ignored and removed
+        max_entries: Maximum entries kept; least recently used are evicted
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_entries: int = 2000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def key_for(query: str, version: str) -> str:
+        """Cache key of a query answered from reports at `version`."""
+        return hashlib.sha256(f"{version}\n{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def get(self, query: str, version: str) -> Optional[Any]:
+        """Cached answer, or None on a miss or expired entry."""
+        key = self.key_for(query, version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry["created_at"] > self.ttl_seconds:
+                del self._entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry["answer"]
+
+    def put(self, query: str, version: str, answer: Any, sources: Iterable[str] = ()):
+        """Store an answer built from the report files named in `sources`."""
+        key = self.key_for(query, version)
+        with self._lock:
+            self._entries[key] = {"answer": answer, "sources": frozenset(sources), "created_at": time.monotonic()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def invalidate_sources(self, names: Iterable[str]) -> int:
+        """Drop answers built from any of the named report files. Returns how many."""
+        names = set(names)
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry["sources"] & names]
+            for key in stale:
+                del self._entries[key]
+            self.invalidated += len(stale)
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evicted": self.evicted,
+                "expired": self.expired,
+                "invalidated": self.invalidated,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
@@ -0,0 +1,229 @@
+"""
+Compact JSON serialization and negotiated response compression.
+
+Deep results carry full markdown reports (and, on request, base64 images),
+so they are the largest thing the API sends. `dumps` uses orjson when it is
+installed and falls back to the standard library. `CompressionMiddleware`
+gzip/brotli-encodes JSON responses, and encodes Server-Sent Event streams
+with a flush after every event so the client still sees each event as soon
+as it is produced.
+"""
+
+import json
+import zlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger("Compression")
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+# Responses smaller than this are sent as-is (compression would not pay off)
+DEFAULT_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Content types worth compressing; images are already compressed and
+# artifact downloads (which support Range requests) are skipped below
+COMPRESSIBLE_TYPES = ("application/json", "text/event-stream", "text/plain")
+STREAMING_TYPES = ("text/event-stream",)
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON; unknown types are converted with str()."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def supported_encodings() -> List[str]:
+    """Content codings this process can produce, most preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the content coding for a request's Accept-Encoding header.
+
+    Returns:
+        'br' or 'gzip', or None to send the response uncompressed
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in supported_encodings():
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class StreamCompressor:
+    """
+    Incremental gzip or brotli encoder.
+
+    With `flush=True` every chunk is flushed (zlib Z_SYNC_FLUSH / brotli
+    flush), so the compressed bytes of each chunk can be decoded by the
+    client immediately. Without it the encoder buffers for a better ratio.
+    """
+
+    def __init__(self, encoding: str, flush: bool = False):
+        self.encoding = encoding
+        self.flush = flush
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            # wbits=31 writes a gzip header and trailer
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + self._brotli.flush() if self.flush else out
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH) if self.flush else out
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """One-shot compression of a complete body."""
+    compressor = StreamCompressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing JSON and SSE responses per Accept-Encoding.
+
+    Complete bodies are compressed in one shot when at least `min_size`
+    bytes; streamed bodies are compressed chunk by chunk, and event streams
+    are flushed after every chunk. Responses that already have a
+    Content-Encoding, partial responses and responses advertising Range
+    support are passed through untouched.
+    """
+
+    def __init__(self, app, min_size: int = DEFAULT_MIN_SIZE):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = _header(scope.get("headers") or [], b"accept-encoding")
+        encoding = negotiate_encoding(accept_encoding.decode("latin-1") if accept_encoding else None)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponse(send, encoding, self.min_size).run(self.app, scope, receive)
+
+
+class _CompressedResponse:
+    """Per-request state of CompressionMiddleware."""
+
+    def __init__(self, send, encoding: str, min_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.min_size = min_size
+        self.start_message: Optional[Dict[str, Any]] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def run(self, app, scope, receive):
+        await app(scope, receive, self.handle)
+
+    def _should_compress(self, message: Dict[str, Any]) -> bool:
+        headers = message.get("headers") or []
+        content_type = (_header(headers, b"content-type") or b"").decode("latin-1").lower()
+        return (
+            message.get("status", 200) == 200
+            and content_type.startswith(COMPRESSIBLE_TYPES)
+            and _header(headers, b"content-encoding") is None
+            and _header(headers, b"accept-ranges") is None
+        )
+
+    def _compressed_start(self, body_length: Optional[int]) -> Dict[str, Any]:
+        headers = [
+            (key, value) for key, value in self.start_message.get("headers") or []
+            if key.lower() not in (b"content-length", b"vary")
+        ]
+        vary = _header(self.start_message.get("headers") or [], b"vary")
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        headers.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+        if body_length is not None:
+            headers.append((b"content-length", str(body_length).encode("latin-1")))
+        return {**self.start_message, "headers": headers}
+
+    async def handle(self, message: Dict[str, Any]):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            self.passthrough = not self._should_compress(message)
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body:
+                # Complete body in a single message
+                if len(body) < self.min_size:
+                    await self.send(self.start_message)
+                    await self.send(message)
+                    return
+                data = compress(body, self.encoding)
+                await self.send(self._compressed_start(len(data)))
+                await self.send({"type": "http.response.body", "body": data})
+                return
+            content_type = (_header(self.start_message.get("headers") or [], b"content-type") or b"").decode("latin-1")
+            self.compressor = StreamCompressor(
+                self.encoding, flush=content_type.lower().startswith(STREAMING_TYPES)
+            )
+            await self.send(self._compressed_start(None))
+
+        data = self.compressor.compress(body) if body else b""
+        if not more_body:
+            data += self.compressor.finish()
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -0,0 +1,144 @@
+"""
+Incrementally loaded corpus of markdown reports.
+
+The lite agent answers from every report in `output/`. Instead of reading
+and concatenating all of them on every query, the corpus keeps each file's
+text in memory and, on refresh, only stats the directory: files whose
+mtime or size changed are re-read, new files are added and deleted files
+dropped. The version stamp changes exactly when the corpus content does,
+so anything derived from it (the section index, cached lite answers) is
+updated only then.
+"""
+
+import os
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("Corpus")
+
+
+class CorpusFile:
+    """A loaded report and the stat fields used to detect changes."""
+
+    __slots__ = ("name", "path", "mtime_ns", "size", "text")
+
+    def __init__(self, name: str, path: str, mtime_ns: int, size: int, text: str):
+        self.name = name
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.text = text
+
+
+class ReportCorpus:
+    """
+    Markdown files of a directory, reloaded only when they change.
+
+    Args:
+        directory: Directory holding the reports
+        suffix: File suffix to include
+    """
+
+    def __init__(self, directory: Path, suffix: str = ".md"):
+        self.directory = Path(directory)
+        self.suffix = suffix
+        self._files: Dict[str, CorpusFile] = {}
+        self._version = self._stamp()
+        self._text: Optional[str] = None
+        self._lock = threading.Lock()
+
+        self.loads = 0
+        self.refreshes = 0
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    def _stamp(self) -> str:
+        h = hashlib.sha256()
+        for name in sorted(self._files):
+            f = self._files[name]
+            h.update(f"{name}:{f.size}:{f.mtime_ns};".encode("utf-8"))
+        return h.hexdigest()[:16]
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        try:
+            entries = os.scandir(self.directory)
+        except FileNotFoundError:
+            return {}
+        with entries:
+            return {
+                entry.name: entry.stat()
+                for entry in entries
+                if entry.name.endswith(self.suffix) and entry.is_file()
+            }
+
+    def refresh(self) -> str:
+        """
+        Pick up new, changed and deleted files.
+
+        Returns:
+            The corpus version after the refresh
+        """
+        with self._lock:
+            self.refreshes += 1
+            stats = self._scan()
+            changed = False
+
+            for name in list(self._files):
+                if name not in stats:
+                    del self._files[name]
+                    changed = True
+
+            for name, stat in stats.items():
+                current = self._files.get(name)
+                if current is not None and current.mtime_ns == stat.st_mtime_ns and current.size == stat.st_size:
+                    continue
+                path = self.directory / name
+                try:
+                    text = path.read_text(encoding="utf-8")
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.warning(f"Skipping unreadable report {path}: {e}")
+                    if self._files.pop(name, None) is not None:
+                        changed = True
+                    continue
+                self._files[name] = CorpusFile(name, str(path), stat.st_mtime_ns, stat.st_size, text)
+                self.loads += 1
+                changed = True
+
+            if changed:
+                self._version = self._stamp()
+                self._text = None
+                logger.info(f"Report corpus now {len(self._files)} files (version {self._version})")
+            return self._version
+
+    def files(self) -> List[CorpusFile]:
+        """Loaded reports in name order."""
+        with self._lock:
+            return [self._files[name] for name in sorted(self._files)]
+
+    def text(self) -> str:
+        """All reports concatenated with a header per file (built once per version)."""
+        return self.snapshot()[1]
+
+    def snapshot(self) -> Tuple[str, str]:
+        """Version and concatenated text, consistent with each other."""
+        with self._lock:
+            if self._text is None:
+                self._text = "".join(
+                    f"\n\n--- FILE: {name} ---\n{self._files[name].text}"
+                    for name in sorted(self._files)
+                )
+            return self._version, self._text
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "chars": sum(len(f.text) for f in self._files.values()),
+                "loads": self.loads,
+                "refreshes": self.refreshes,
+            }
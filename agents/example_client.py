@@ -133,8 +133,16 @@ class ResearchAgentClient:
         print(f"💚 Health: {health['status']} | Active sessions: {health['sessions_active']}")
         return health
     
+    def download_artifact(self, url: str, filepath: str):
+        """Stream an artifact (report or chart) from its URL to a local file."""
+        with requests.get(f"{self.base_url}{url}", stream=True, timeout=60) as response:
+            response.raise_for_status()
+            with open(filepath, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+    
     def save_images(self, result: dict, output_dir: str = "downloads"):
-        """Save base64 images from result to files."""
+        """Save images from result to files (inline base64 or downloaded by URL)."""
         import os
         import base64
         
@@ -143,10 +151,13 @@ class ResearchAgentClient:
         for img in result.get('images', []):
             filepath = os.path.join(output_dir, img['filename'])
             
-            # Decode and save
-            img_data = base64.b64decode(img['base64'])
-            with open(filepath, 'wb') as f:
-                f.write(img_data)
+            if img.get('base64'):
+                # Decode and save
+                img_data = base64.b64decode(img['base64'])
+                with open(filepath, 'wb') as f:
+                    f.write(img_data)
+            else:
+                self.download_artifact(img['url'], filepath)
             
             print(f"💾 Saved image: {filepath} ({img['size_bytes']} bytes)")
 
@@ -241,6 +252,13 @@ def example_streaming():
                 for tc in data['tool_calls']:
                     print(f"   🔧 {tc['name']}")
         
+        elif event_type == 'token':
+            # Lite answers stream token by token
+            if event['kind'] == 'text':
+                print(event['content'], end="", flush=True)
+            elif event['kind'] == 'tool_start':
+                print(f"\n   🔧 {event['tool']}...")
+        
         elif event_type == 'result':
             data = event['data']
             print(f"\n✅ FINAL RESULT:")
@@ -253,8 +271,8 @@ def example_streaming():
             if data['images']:
                 client.save_images(data)
                 
-            # Save report if provided as base64
-            if data.get('report_base64') and data.get('report_filename'):
+            # Save report (inline base64 or downloaded by URL)
+            if data.get('report_filename') and (data.get('report_base64') or data.get('report_url')):
                 import base64
                 import os
                 
@@ -262,8 +280,11 @@ def example_streaming():
                 report_path = os.path.join("downloads", data['report_filename'])
                 
                 try:
-                    with open(report_path, "wb") as f:
-                        f.write(base64.b64decode(data['report_base64']))
+                    if data.get('report_base64'):
+                        with open(report_path, "wb") as f:
+                            f.write(base64.b64decode(data['report_base64']))
+                    else:
+                        client.download_artifact(data['report_url'], report_path)
                     print(f"💾 Saved report: {report_path}")
                 except Exception as e:
                     print(f"❌ Failed to save report: {e}")
@@ -1,5 +1,3 @@
-from deepagents import create_deep_agent, CompiledSubAgent
-from langchain.agents import create_agent
 from langchain.agents.middleware import ModelCallLimitMiddleware, ToolCallLimitMiddleware
 from dotenv import load_dotenv
 from market_agents import get_market_agent
@@ -9,15 +7,22 @@ from market_agents import get_trials_agent
 from internal_knowlege import get_knowledge_agent
 from visualization_agent import get_visualization_agent
 import os
+import logging
 from web_search import internet_search
 from pubmed_tool import pubmed_search_tool
-from langchain_openai import ChatOpenAI
+from streaming import iter_message_deltas
+from runlog import get_run_log
+from lazy import lazy
 import json
 
 load_dotenv()
 
+logger = logging.getLogger("DeepAgent")
+
 def get_deep_agent_llm():
     """Initialize the LLM for the Deep Research Agent with error handling."""
+    from langchain_openai import ChatOpenAI
+
     api_key = os.getenv("OPENROUTER_API_KEY")
     if not api_key:
         raise ValueError("OPENROUTER_API_KEY not found in environment variables. Please check your .env file.")
@@ -29,14 +34,6 @@ def get_deep_agent_llm():
         temperature=0.1,
     )
 
-llm = get_deep_agent_llm()
-market_agent = get_market_agent()
-trade_agent = get_trade_agent()
-patent_agent = get_patent_agent()
-trials_agent = get_trials_agent()
-knowledge_agent = get_knowledge_agent()
-viz_agent = get_visualization_agent()
-
 research_subagent = {
     "name": "web-intelligence-agent",
     "description": "Performs real-time web search for guidelines, scientific publications, news and patient forums.",
@@ -55,50 +52,6 @@ pubmed_subagent = {
     'max_iterations': 1
 }
 
-market_subagent = CompiledSubAgent(
-    name="iqvia-insights-agent",
-    description="Queries IQVIA datasets for sales trends, volume shifts and therapy area dynamics. Outputs: Market size tables, CAGR trends, therapy-level competition summaries.",
-    runnable=market_agent,
-    max_iterations=2
-)
-
-trade_subagent = CompiledSubAgent(
-    name="exim-trends-agent",
-    description="Extracts export-import data for APIs/formulations across countries. Outputs: Trade volume charts, sourcing insights, import dependency tables.",
-    runnable=trade_agent,
-    max_iterations=2
-
-)
-
-patent_subagent = CompiledSubAgent(
-    name="patent-landscape-agent",
-    description="Searches USPTO and other IP databases for active patents, expiry timelines and FTO flags. Outputs: Patent status tables, competitive filing heatmaps.",
-    runnable=patent_agent,
-    max_iterations=2
-
-)
-
-trials_subagent = CompiledSubAgent(
-    name="clinical-trials-agent",
-    description="Fetches trial pipeline data from ClinicalTrials.gov. Outputs: Tables of active trials, sponsor profiles, trial phase distributions.",
-    runnable=trials_agent,
-    max_iterations=2
-)
-
-knowledge_subagent = CompiledSubAgent(
-    name="internal-knowledge-agent",
-    description="Retrieves and summarizes internal documents (e.g., MINS, strategy decks, field insights). Outputs: Key takeaways, comparative tables.",
-    runnable=knowledge_agent,
-    max_iterations=2
-)
-
-visualization_subagent = CompiledSubAgent(
-    name="visualization-agent",
-    description="Creates data visualizations (charts/plots) from provided data. Supports bar, line, pie, histogram, and scatter plots. Output: Path to saved image file.",
-    runnable=viz_agent,
-    max_iterations=2
-)
-
 prompt = """
    You are the Master Agent (Conversation Orchestrator) for a multinational pharmaceutical company.
 Your mission is to support diversification beyond low-margin generics by evaluating repurposing opportunities for approved molecules and providing highly rigorous, multi-section strategic reports.
@@ -670,14 +623,63 @@ Interpretation
 
 Strategic Implications
     """
-subagents = [research_subagent, pubmed_subagent, market_subagent, trade_subagent, patent_subagent, trials_subagent, knowledge_subagent, visualization_subagent]
 
-from deepagents.backends import CompositeBackend, StateBackend, StoreBackend, FilesystemBackend
-from langgraph.store.memory import InMemoryStore
 import uuid
 
+def build_subagents():
+    """Subagent specs for the orchestrator; the compiled ones build their graphs and LLMs here."""
+    from deepagents import CompiledSubAgent
+
+    market_subagent = CompiledSubAgent(
+        name="iqvia-insights-agent",
+        description="Queries IQVIA datasets for sales trends, volume shifts and therapy area dynamics. Outputs: Market size tables, CAGR trends, therapy-level competition summaries.",
+        runnable=get_market_agent(),
+        max_iterations=2
+    )
+
+    trade_subagent = CompiledSubAgent(
+        name="exim-trends-agent",
+        description="Extracts export-import data for APIs/formulations across countries. Outputs: Trade volume charts, sourcing insights, import dependency tables.",
+        runnable=get_trade_agent(),
+        max_iterations=2
+
+    )
+
+    patent_subagent = CompiledSubAgent(
+        name="patent-landscape-agent",
+        description="Searches USPTO and other IP databases for active patents, expiry timelines and FTO flags. Outputs: Patent status tables, competitive filing heatmaps.",
+        runnable=get_patent_agent(),
+        max_iterations=2
+
+    )
+
+    trials_subagent = CompiledSubAgent(
+        name="clinical-trials-agent",
+        description="Fetches trial pipeline data from ClinicalTrials.gov. Outputs: Tables of active trials, sponsor profiles, trial phase distributions.",
+        runnable=get_trials_agent(),
+        max_iterations=2
+    )
+
+    knowledge_subagent = CompiledSubAgent(
+        name="internal-knowledge-agent",
+        description="Retrieves and summarizes internal documents (e.g., MINS, strategy decks, field insights). Outputs: Key takeaways, comparative tables.",
+        runnable=get_knowledge_agent(),
+        max_iterations=2
+    )
+
+    visualization_subagent = CompiledSubAgent(
+        name="visualization-agent",
+        description="Creates data visualizations (charts/plots) from provided data. Supports bar, line, pie, histogram, and scatter plots. Output: Path to saved image file.",
+        runnable=get_visualization_agent(),
+        max_iterations=2
+    )
+
+    return [research_subagent, pubmed_subagent, market_subagent, trade_subagent, patent_subagent, trials_subagent, knowledge_subagent, visualization_subagent]
+
 # Define the backend factory
 def get_backend(runtime):
+    from deepagents.backends import CompositeBackend, StateBackend, StoreBackend, FilesystemBackend
+
     # Ensure the output directory exists
     output_dir = os.path.join(os.getcwd(), "output")
     os.makedirs(output_dir, exist_ok=True)
@@ -690,20 +692,92 @@ def get_backend(runtime):
         }
     )
 
-store = InMemoryStore()
+# Durable checkpoints of deep runs, so interrupted runs resume instead of restarting
+CHECKPOINT_ENABLED = os.getenv("DEEP_CHECKPOINT_ENABLED", "1").lower() in ("1", "true", "yes")
+CHECKPOINT_DB_PATH = os.getenv(
+    "DEEP_CHECKPOINT_DB",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "state", "checkpoints.db")
+)
+# Checkpoints of runs that did not complete are kept this long so they can be resumed (0: until resumed)
+CHECKPOINT_RETENTION_HOURS = float(os.getenv("DEEP_CHECKPOINT_RETENTION_HOURS", "72"))
 
+@lazy
+def get_checkpointer():
+    """
+    SQLite checkpointer shared by all deep runs (keyed by thread_id).
 
-agent = create_deep_agent(
-    model=llm,
-    subagents=subagents,
-    system_prompt=prompt,
-    backend=get_backend,
-    store=store,
-    middleware=[
-        ModelCallLimitMiddleware(run_limit=40, exit_behavior="end"),
-        ToolCallLimitMiddleware(run_limit=20, exit_behavior="continue")
-    ]
-)
+    The graph state is saved after every step, including the results of
+    tool and subagent calls that completed within an unfinished step, so a
+    resumed run does not repeat them. Checkpoints are deleted once a run
+    completes (see delete_checkpoints).
+    """
+    import sqlite3
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    os.makedirs(os.path.dirname(CHECKPOINT_DB_PATH), exist_ok=True)
+    # The saver serializes access to the connection itself
+    conn = sqlite3.connect(CHECKPOINT_DB_PATH, check_same_thread=False)
+    # Only takes effect when the database is created: lets deleted checkpoints shrink the file
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    return SqliteSaver(conn)
+
+def checkpointed_threads():
+    """Thread IDs (run IDs) that have checkpoints."""
+    with get_checkpointer().cursor(transaction=False) as cur:
+        cur.execute("SELECT DISTINCT thread_id FROM checkpoints")
+        return [row[0] for row in cur.fetchall()]
+
+def has_checkpoint(thread_id) -> bool:
+    """Whether a run has a checkpointed conversation to resume from."""
+    # Read through the saver: building the agent just to check is expensive.
+    # A checkpoint only holds the channels its step updated, but channel_versions
+    # lists every channel written so far.
+    saved = get_checkpointer().get_tuple({"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}})
+    return bool(saved and "messages" in saved.checkpoint.get("channel_versions", {}))
+
+def delete_checkpoints(thread_ids):
+    """
+    Delete the checkpoints and pending writes of runs that no longer need resuming.
+
+    Every step stores the full message state, so a completed run's
+    checkpoints are by far the largest thing in the database.
+    """
+    saver = get_checkpointer()
+    for thread_id in thread_ids:
+        saver.delete_thread(thread_id)
+    with saver.cursor() as cur:
+        cur.execute("PRAGMA incremental_vacuum")
+
+@lazy
+def get_agent():
+    """
+    The compiled deep research agent.
+
+    Built on first use (or by a warm-up) rather than at import, so importing
+    this module is cheap and a missing API key fails the run, not the server.
+    """
+    from deepagents import create_deep_agent
+    from langgraph.store.memory import InMemoryStore
+
+    return create_deep_agent(
+        model=get_deep_agent_llm(),
+        subagents=build_subagents(),
+        system_prompt=prompt,
+        backend=get_backend,
+        store=InMemoryStore(),
+        checkpointer=get_checkpointer() if CHECKPOINT_ENABLED else None,
+        middleware=[
+            ModelCallLimitMiddleware(run_limit=40, exit_behavior="end"),
+            ToolCallLimitMiddleware(run_limit=20, exit_behavior="continue")
+        ]
+    )
+
+def __getattr__(name):
+    # `from final import agent` keeps working, but builds the agent on first access
+    if name == "agent":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def run_deep_research(user_query: str):
     """
@@ -714,56 +788,51 @@ def run_deep_research(user_query: str):
     thread_id = str(uuid.uuid4())
     config = {"configurable": {"thread_id": thread_id}}
     
-    # Setup logging
-    steps_file = "steps.md"
-    # Overwrite steps file for new run
-    with open(steps_file, "a", encoding='utf-8') as f:
-        f.write(f"\n# Execution Log for {user_query}\n\n")
+    # Setup logging: one buffered log file per run (logs/runs/<thread_id>.md)
+    run_log = get_run_log()
+    run_log.write(thread_id, f"\n# Execution Log for {user_query}\n")
 
     def log(message):
         # Convert message to string safely
         msg_str = str(message)
-        print(msg_str)
-        with open(steps_file, "a", encoding='utf-8') as f:
-            f.write(msg_str + "\n")
+        logger.debug(msg_str)
+        run_log.write(thread_id, msg_str)
 
     log(f"Starting execution for query: '{user_query}' with thread_id: {thread_id}")
     log("--------------------------------------------------------------------------------")
     
-    final_state = None
+    messages = []
     
     try:
-        # Use stream_mode="values" to get the full state evolution and capture the final result easily.
+        # Stream per-node updates and only handle the messages each step added.
         step_count = 0
-        for state in agent.stream({"messages": [{"role": "user", "content": user_query}]}, config=config, stream_mode="values"):
-            final_state = state
+        for last_msg in iter_message_deltas(get_agent(), {"messages": [{"role": "user", "content": user_query}]}, config=config):
+            messages.append(last_msg)
             step_count += 1
             log(f"\n[Step {step_count} State Update]")
             
-            if "messages" in state and state["messages"]:
-                last_msg = state["messages"][-1]
-                sender = getattr(last_msg, "name", "Agent")
-                msg_type = last_msg.type
-                
-                log(f"Role: {msg_type}")
-                if sender:
-                    log(f"Sender: {sender}")
-                
-                if hasattr(last_msg, 'content') and last_msg.content:
-                    log(f"Content: {str(last_msg.content)[:500]}..." if len(str(last_msg.content)) > 500 else f"Content: {str(last_msg.content)}")
-                
-                if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
-                    log(f"Tool Calls ({len(last_msg.tool_calls)}):")
-                    for tc in last_msg.tool_calls:
-                        log(f"  - {tc['name']}: {tc['args']}")
+            sender = getattr(last_msg, "name", "Agent")
+            msg_type = last_msg.type
+            
+            log(f"Role: {msg_type}")
+            if sender:
+                log(f"Sender: {sender}")
+            
+            if hasattr(last_msg, 'content') and last_msg.content:
+                log(f"Content: {str(last_msg.content)[:500]}..." if len(str(last_msg.content)) > 500 else f"Content: {str(last_msg.content)}")
+            
+            if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
+                log(f"Tool Calls ({len(last_msg.tool_calls)}):")
+                for tc in last_msg.tool_calls:
+                    log(f"  - {tc['name']}: {tc['args']}")
 
     except Exception as e:
         log(f"An error occurred during streaming: {e}")
         return f"Error: {e}"
 
-    # Extract final result from final_state
-    if final_state and "messages" in final_state:
-        result = final_state
+    # Extract final result from the collected messages
+    if messages:
+        result = {"messages": messages}
         
         # Save JSON result
         try:
@@ -795,4 +864,5 @@ def run_deep_research(user_query: str):
 if __name__ == "__main__":
     user_query = "Tell me about a deep research about Minocycline"
     run_deep_research(user_query)
+    get_run_log().flush()
 
@@ -1,16 +1,44 @@
 import os
 import sys
+import time
+import uuid
+import logging
+import argparse
+import functools
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from dotenv import load_dotenv
-from langchain_community.document_loaders import PyPDFLoader, TextLoader, UnstructuredMarkdownLoader, UnstructuredPDFLoader, Docx2txtLoader, UnstructuredWordDocumentLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger("Ingest")
+
+INDEX_NAME = "boundless-alder"
+
+# Pinecone accepts at most ~2MB per upsert request; 100 vectors stays well below
+UPSERT_BATCH_SIZE = 100
+
+# Called with (stage, **details) as ingestion advances
+ProgressCallback = Callable[..., None]
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt', '.md')
+
+# Bulk ingestion defaults
+BULK_PARSE_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+BULK_EMBED_BATCH_SIZE = 64
+BULK_EMBED_CONCURRENCY = 4
+BULK_MAX_ATTEMPTS = 4
+
 def get_embeddings():
     """Initialize the same embedding model used in internal_knowledge.py"""
+    # Imported on first use: the route module imports this one at startup
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
     api_key = os.getenv("API_4")    
     if not api_key:
         raise ValueError("API_4 environment variable not set (required for Google Embeddings)")
@@ -22,27 +50,30 @@ def get_embeddings():
 
 def load_document(file_path: str):
     """Load a document based on its extension."""
+    from langchain_community.document_loaders import (
+        PyPDFLoader, TextLoader, UnstructuredMarkdownLoader, UnstructuredPDFLoader,
+        Docx2txtLoader, UnstructuredWordDocumentLoader
+    )
+
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
     ext = os.path.splitext(file_path)[1].lower()
     
-    print(f"Loading {file_path}...")
+    logger.info(f"Loading {file_path}...")
     
     if ext == '.pdf':
         try:
-            print("Attempting to load PDF with UnstructuredPDFLoader...")
             loader = UnstructuredPDFLoader(file_path)
         except Exception as e:
-            print(f"UnstructuredPDFLoader failed: {e}. Falling back to PyPDFLoader.")
+            logger.warning(f"UnstructuredPDFLoader failed: {e}. Falling back to PyPDFLoader.")
             loader = PyPDFLoader(file_path)
             
     elif ext == '.docx':
         try:
-            print("Attempting to load DOCX with UnstructuredWordDocumentLoader...")
             loader = UnstructuredWordDocumentLoader(file_path)
         except Exception as e:
-            print(f"UnstructuredWordDocumentLoader failed: {e}. Falling back to Docx2txtLoader.")
+            logger.warning(f"UnstructuredWordDocumentLoader failed: {e}. Falling back to Docx2txtLoader.")
             loader = Docx2txtLoader(file_path)
             
     elif ext == '.txt':
@@ -52,62 +83,338 @@ def load_document(file_path: str):
         loader = UnstructuredMarkdownLoader(file_path)
         
     else:
-        print(f"Warning: Unsupported extension {ext}, attempting to load as text.")
+        logger.warning(f"Unsupported extension {ext}, attempting to load as text.")
         loader = TextLoader(file_path, encoding='utf-8')
     
     return loader.load()
 
-def ingest_file(file_path: str):
-    """Main ingestion process."""
-    try:
-        # 1. Load Document
-        docs = load_document(file_path)
-        print(f"Loaded {len(docs)} pages/documents.")
-
-        # 2. Split Text
-        print("Splitting text into chunks...")
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        splits = text_splitter.split_documents(docs)
-        print(f"Created {len(splits)} chunks.")
-
-        # 3. Initialize Embeddings & Vector Store
-        print("Initializing Embeddings...")
-        embeddings = get_embeddings()
-        
-        index_name = "boundless-alder"
-        print(f"Target Pinecone Index: {index_name}")
-
-        # 4. Upsert to Pinecone
-        print("Upserting vectors to Pinecone...")
-        pinecone_api_key = os.getenv("PINECONE_API_KEY")
-        if not pinecone_api_key:
-             raise ValueError("PINECONE_API_KEY environment variable not set")
-
-        PineconeVectorStore.from_documents(
-            documents=splits,
-            embedding=embeddings,
-            index_name=index_name,
-            pinecone_api_key=pinecone_api_key
-        )
-        
-        print("✅ Ingestion successfully completed!")
-        
-    except Exception as e:
-        print(f"❌ Error during ingestion: {str(e)}")
+@functools.lru_cache(maxsize=1)
+def get_index():
+    """Pinecone index the internal knowledge tool retrieves from."""
+    from pinecone import Pinecone
+
+    pinecone_api_key = os.getenv("PINECONE_API_KEY")
+    if not pinecone_api_key:
+        raise ValueError("PINECONE_API_KEY environment variable not set")
+    return Pinecone(api_key=pinecone_api_key).Index(INDEX_NAME)
+
+def split_documents(docs):
+    """Split loaded documents into retrieval-sized chunks."""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=1000,
+        chunk_overlap=200,
+        separators=["\n\n", "\n", " ", ""]
+    )
+    return text_splitter.split_documents(docs)
+
+def _pinecone_metadata(metadata: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """
+    Metadata in the form Pinecone accepts (no nulls or nested objects).
+
+    The chunk text is stored under 'text', where PineconeVectorStore reads it
+    back in `retrieve_context`.
+    """
+    clean = {}
+    for key, value in metadata.items():
+        if value is None:
+            continue
+        if isinstance(value, (str, int, float, bool)):
+            clean[key] = value
+        elif isinstance(value, (list, tuple)) and all(isinstance(v, str) for v in value):
+            clean[key] = list(value)
+        else:
+            clean[key] = str(value)
+    clean["text"] = text
+    return clean
+
+def upsert_vectors(index, splits, vectors: List[List[float]]) -> int:
+    """Write embedded chunks to the index in batches. Returns the number of vectors upserted."""
+    upserted = 0
+    for start in range(0, len(splits), UPSERT_BATCH_SIZE):
+        batch = [
+            (str(uuid.uuid4()), vector, _pinecone_metadata(doc.metadata, doc.page_content))
+            for doc, vector in zip(splits[start:start + UPSERT_BATCH_SIZE], vectors[start:start + UPSERT_BATCH_SIZE])
+        ]
+        response = index.upsert(vectors=batch)
+        upserted += getattr(response, "upserted_count", None) or len(batch)
+    return upserted
+
+def ingest_file(
+    file_path: str,
+    progress: Optional[ProgressCallback] = None,
+    source_name: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Load, split, embed and upsert one document into the knowledge base.
+
+    Args:
+        file_path: Document to ingest
+        progress: Called with (stage, **details) as each stage starts and ends
+        source_name: Value stored as the chunks' 'source' (e.g. the uploaded
+            file name instead of a temporary path)
+
+    Returns:
+        Counts (documents, chunks, vectors) and per-stage timings in seconds
+
+    Raises:
+        Any loader, embedding or Pinecone error; nothing is swallowed.
+    """
+    report = progress or (lambda stage, **details: None)
+    timings: Dict[str, float] = {}
+
+    def timed(stage: str, func: Callable[[], Any]) -> Any:
+        report(stage)
+        started = time.perf_counter()
+        result = func()
+        timings[stage] = round(time.perf_counter() - started, 3)
+        return result
+
+    # 1. Load Document
+    docs = timed("parse", lambda: load_document(file_path))
+    if source_name:
+        for doc in docs:
+            doc.metadata["source"] = source_name
+    logger.info(f"Loaded {len(docs)} pages/documents.")
+
+    # 2. Split Text
+    splits = timed("split", lambda: split_documents(docs))
+    logger.info(f"Created {len(splits)} chunks.")
+    if not splits:
+        raise ValueError(f"No text could be extracted from {source_name or os.path.basename(file_path)}")
+    report("split", documents=len(docs), chunks=len(splits))
+
+    # 3. Embed chunks
+    embeddings = get_embeddings()
+    vectors = timed("embed", lambda: embeddings.embed_documents([doc.page_content for doc in splits]))
+
+    # 4. Upsert to Pinecone
+    logger.info(f"Upserting {len(vectors)} vectors to Pinecone index {INDEX_NAME}...")
+    upserted = timed("upsert", lambda: upsert_vectors(get_index(), splits, vectors))
+
+    logger.info(f"Ingestion completed: {len(splits)} chunks, {upserted} vectors in {sum(timings.values()):.2f}s")
+    return {
+        "documents": len(docs),
+        "chunks": len(splits),
+        "vectors": upserted,
+        "timings": timings,
+    }
+
+def _with_retry(func: Callable[[], Any], what: str, attempts: int = BULK_MAX_ATTEMPTS, base_delay: float = 1.0) -> Any:
+    """Call func, retrying with exponential backoff (rate limits, transient network errors)."""
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == attempts:
+                raise
+            delay = base_delay * 2 ** (attempt - 1)
+            logger.warning(f"{what} failed (attempt {attempt}/{attempts}): {e}. Retrying in {delay:.0f}s")
+            time.sleep(delay)
+
+def _parse_file(file_path: str, source_name: str) -> Tuple[int, List[Tuple[str, Dict[str, Any]]], float]:
+    """
+    Load and split one file. Runs in a worker process.
+
+    Returns plain (text, metadata) pairs, which are cheap to send back to the parent.
+    """
+    started = time.perf_counter()
+    docs = load_document(file_path)
+    for doc in docs:
+        doc.metadata["source"] = source_name
+    chunks = [(doc.page_content, doc.metadata) for doc in split_documents(docs)]
+    return len(docs), chunks, time.perf_counter() - started
+
+def find_documents(directory: str) -> List[str]:
+    """Supported documents below a directory, in a stable order."""
+    found = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                found.append(os.path.join(root, name))
+    return sorted(found)
+
+def ingest_paths(
+    files: Iterable[Tuple[str, str]],
+    progress: Optional[ProgressCallback] = None,
+    parse_workers: int = BULK_PARSE_WORKERS,
+    batch_size: int = BULK_EMBED_BATCH_SIZE,
+    embed_concurrency: int = BULK_EMBED_CONCURRENCY
+) -> Dict[str, Any]:
+    """
+    Ingest many documents at once.
+
+    Files are parsed and split in a process pool. Chunks are streamed into
+    fixed-size batches as each file finishes, and batches are embedded and
+    upserted by a bounded thread pool with retries, so parsing, embedding and
+    upserting overlap and memory stays bounded however many files there are.
+    A file that cannot be parsed is reported and skipped; a batch that still
+    fails after all retries aborts the run.
+
+    Args:
+        files: (path, source name) pairs
+        progress: Called with (stage, **details) as files and batches complete
+        parse_workers: Processes parsing documents
+        batch_size: Chunks per embedding/upsert batch
+        embed_concurrency: Batches embedded and upserted in parallel
+
+    Returns:
+        Counts, failures, per-stage timings and documents/chunks per second
+    """
+    files = list(files)
+    report = progress or (lambda stage, **details: None)
+    started = time.perf_counter()
+
+    embeddings = get_embeddings()
+    index = get_index()
+
+    lock = threading.Lock()
+    totals = {"files": len(files), "files_done": 0, "documents": 0, "chunks": 0, "vectors": 0}
+    stage_seconds = {"parse": 0.0, "embed": 0.0, "upsert": 0.0}
+    failed: List[Dict[str, str]] = []
+    # At most two batches waiting per embedding thread
+    in_flight = threading.BoundedSemaphore(embed_concurrency * 2)
+
+    def embed_and_upsert(batch: List[Tuple[str, Dict[str, Any]]]) -> int:
+        try:
+            texts = [text for text, _ in batch]
+            t0 = time.perf_counter()
+            vectors = _with_retry(lambda: embeddings.embed_documents(texts), "Embedding batch")
+            t1 = time.perf_counter()
+            records = [
+                (str(uuid.uuid4()), vector, _pinecone_metadata(metadata, text))
+                for (text, metadata), vector in zip(batch, vectors)
+            ]
+            response = _with_retry(lambda: index.upsert(vectors=records), "Upsert batch")
+            upserted = getattr(response, "upserted_count", None) or len(records)
+            with lock:
+                stage_seconds["embed"] += t1 - t0
+                stage_seconds["upsert"] += time.perf_counter() - t1
+                totals["vectors"] += upserted
+                snapshot = dict(totals)
+            report("embed", **snapshot)
+            return upserted
+        finally:
+            in_flight.release()
+
+    # Spawned workers do not inherit the server's threads and locks
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=parse_workers, mp_context=context) as parsers, \
+            ThreadPoolExecutor(max_workers=embed_concurrency, thread_name_prefix="ingest-embed") as embedders:
+        report("parse", **totals)
+        # Only a bounded window of files is parsing (or holding parsed chunks) at a time
+        remaining_files = iter(files)
+        max_parsing = parse_workers * 2
+        parse_futures = {}
+        batch_futures = []
+        pending: List[Tuple[str, Dict[str, Any]]] = []
+
+        def submit_parses():
+            for path, source_name in itertools.islice(remaining_files, max_parsing - len(parse_futures)):
+                parse_futures[parsers.submit(_parse_file, path, source_name)] = source_name
+
+        def flush(batch):
+            in_flight.acquire()
+            batch_futures.append(embedders.submit(embed_and_upsert, batch))
+
+        submit_parses()
+        while parse_futures:
+            done, _ = wait(parse_futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                # Dropping the future releases its chunks once they are batched
+                source_name = parse_futures.pop(future)
+                try:
+                    documents, chunks, seconds = future.result()
+                except Exception as e:
+                    logger.error(f"Could not parse {source_name}: {e}")
+                    failed.append({"file": source_name, "error": str(e)})
+                    continue
+                with lock:
+                    totals["files_done"] += 1
+                    totals["documents"] += documents
+                    totals["chunks"] += len(chunks)
+                    stage_seconds["parse"] += seconds
+                    snapshot = dict(totals)
+                report("parse", **snapshot)
+
+                pending.extend(chunks)
+                while len(pending) >= batch_size:
+                    flush(pending[:batch_size])
+                    pending = pending[batch_size:]
+            submit_parses()
+        if pending:
+            flush(pending)
+
+        for future in batch_futures:
+            # Re-raises a batch that failed after all retries
+            future.result()
+
+    elapsed = time.perf_counter() - started
+    result = {
+        **{k: v for k, v in totals.items() if k != "files_done"},
+        "files_ingested": totals["files_done"],
+        "files_failed": failed,
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_second": round(totals["documents"] / elapsed, 2) if elapsed else 0.0,
+        "files_per_second": round(totals["files_done"] / elapsed, 2) if elapsed else 0.0,
+        "chunks_per_second": round(totals["chunks"] / elapsed, 2) if elapsed else 0.0,
+        # Summed across workers, so they can exceed the wall-clock time
+        "stage_seconds": {k: round(v, 3) for k, v in stage_seconds.items()},
+    }
+    logger.info(
+        f"Bulk ingestion completed: {result['files_ingested']}/{len(files)} files, "
+        f"{result['chunks']} chunks in {elapsed:.1f}s "
+        f"({result['documents_per_second']} docs/s, {result['chunks_per_second']} chunks/s)"
+    )
+    return result
+
+def ingest_directory(directory: str, **options) -> Dict[str, Any]:
+    """Ingest every supported document below a directory (see ingest_paths)."""
+    files = find_documents(directory)
+    if not files:
+        raise ValueError(f"No supported documents ({', '.join(SUPPORTED_EXTENSIONS)}) found in {directory}")
+    return ingest_paths([(path, os.path.relpath(path, directory)) for path in files], **options)
+
+def _print_bulk_report(result: Dict[str, Any]):
+    print(f"\n✅ Ingested {result['files_ingested']}/{result['files']} files in {result['elapsed_seconds']:.1f}s")
+    print(f"   Documents: {result['documents']:>8}  ({result['documents_per_second']}/s)")
+    print(f"   Chunks:    {result['chunks']:>8}  ({result['chunks_per_second']}/s)")
+    print(f"   Vectors:   {result['vectors']:>8}")
+    print("   Worker time: " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in result["stage_seconds"].items()))
+    for failure in result["files_failed"]:
+        print(f"   ❌ {failure['file']}: {failure['error']}")
 
 # CLI Entry point
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("\nUsage: python ingest_docs.py <path_to_file>")
-        print("Example: python ingest_docs.py ./data/my_document.pdf\n")
-    else:
-        target_file = sys.argv[1]
-        # Handle relative paths
-        if not os.path.isabs(target_file):
-            target_file = os.path.abspath(target_file)
-            
-        ingest_file(target_file)
+    parser = argparse.ArgumentParser(description="Ingest documents into the internal knowledge base")
+    parser.add_argument("file", nargs="?", help="Single document to ingest")
+    parser.add_argument("--dir", help="Ingest every supported document below this directory")
+    parser.add_argument("--workers", type=int, default=BULK_PARSE_WORKERS, help="Parsing processes (bulk mode)")
+    parser.add_argument("--batch-size", type=int, default=BULK_EMBED_BATCH_SIZE, help="Chunks per embedding batch (bulk mode)")
+    parser.add_argument("--concurrency", type=int, default=BULK_EMBED_CONCURRENCY, help="Parallel embedding batches (bulk mode)")
+    args = parser.parse_args()
+
+    if not args.file and not args.dir:
+        parser.print_help()
+        print("\nExamples:")
+        print("  python ingest_docs.py ./data/my_document.pdf")
+        print("  python ingest_docs.py --dir ./Internal_DB --workers 4\n")
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    try:
+        if args.dir:
+            result = ingest_directory(
+                os.path.abspath(args.dir),
+                parse_workers=args.workers,
+                batch_size=args.batch_size,
+                embed_concurrency=args.concurrency
+            )
+            _print_bulk_report(result)
+        else:
+            result = ingest_file(os.path.abspath(args.file))
+            print(f"✅ Ingestion successfully completed! {result['chunks']} chunks, {result['vectors']} vectors")
+            print("Timings: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["timings"].items()))
+    except Exception as e:
+        print(f"❌ Error during ingestion: {str(e)}")
+        sys.exit(1)
@@ -1,30 +1,36 @@
 import os
-import functools
 from dotenv import load_dotenv
 
 from langchain.tools import tool
 from langchain.agents import create_agent
 from langchain.agents.middleware import ModelCallLimitMiddleware, ToolCallLimitMiddleware
 from langchain.chat_models import init_chat_model
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
+try:
+    from agents.lazy import lazy
+except ImportError:
+    from lazy import lazy
 
 # Load environment variables
 load_dotenv()
 
-# Initialize LLM
-llm = init_chat_model(
-    model="moonshotai/kimi-k2-instruct-0905",
-    model_provider="groq",
-    temperature=0.3
-)
+@lazy
+def get_llm():
+    """LLM of the knowledge agent, created when the agent is built."""
+    return init_chat_model(
+        model="moonshotai/kimi-k2-instruct-0905",
+        model_provider="groq",
+        temperature=0.3
+    )
 
-@functools.lru_cache(maxsize=1)
+@lazy
 def _get_vectorstore():
     """
     Lazy-load the VectorStore. 
     This prevents the app from crashing on import if keys are missing/invalid.
     """
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    from langchain_pinecone import PineconeVectorStore
+
     try:
         print("Initializing Google Embeddings...")
         embeddings = GoogleGenerativeAIEmbeddings(
@@ -77,7 +83,7 @@ def get_knowledge_agent():
 
     # Create Agent with middleware
     agent = create_agent(
-        llm, 
+        get_llm(), 
         tools=tools, 
         system_prompt=system_prompt,
         middleware=[
@@ -0,0 +1,174 @@
+"""
+Background job scheduler for long-running agent work.
+
+Jobs are queued and executed by a fixed number of worker threads, so callers
+get a job ID immediately and poll for status and results instead of holding
+an HTTP connection open for the whole run.
+"""
+
+import uuid
+import queue
+import threading
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable, List
+
+logger = logging.getLogger("JobScheduler")
+
+# Job lifecycle states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+TERMINAL_STATES = {JOB_SUCCEEDED, JOB_FAILED}
+
+
+class JobQueueFull(Exception):
+    """Raised when the scheduler queue is at capacity."""
+
+
+class Job:
+    """A unit of background work with status, progress and result."""
+
+    def __init__(self, kind: str, params: Optional[Dict[str, Any]] = None):
+        self.job_id = str(uuid.uuid4())
+        self.kind = kind
+        self.params = params or {}
+        self.status = JOB_QUEUED
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in TERMINAL_STATES
+
+    def update_progress(self, **fields):
+        """Merge progress fields reported by the running job."""
+        with self._lock:
+            self.progress.update(fields)
+            self.progress["updated_at"] = datetime.now().isoformat()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable snapshot of the job (without the result payload)."""
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "kind": self.kind,
+                "status": self.status,
+                "progress": dict(self.progress),
+                "error": self.error,
+                "created_at": self.created_at.isoformat(),
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            }
+
+
+class JobScheduler:
+    """
+    Bounded FIFO scheduler backed by a fixed pool of worker threads.
+
+    Args:
+        max_concurrency: Number of jobs executed in parallel
+        max_queued: Maximum number of jobs waiting to start
+        max_retained: Finished jobs kept in memory for polling
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_queued: int = 100, max_retained: int = 500):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queued = max_queued
+        self.max_retained = max_retained
+
+        self._queue: "queue.Queue[tuple[Job, Callable[[Job], Dict[str, Any]]]]" = queue.Queue()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._pending = 0
+
+    def _ensure_workers(self):
+        """Start worker threads on first submission."""
+        if self._workers:
+            return
+        for i in range(self.max_concurrency):
+            worker = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, kind: str, run: Callable[[Job], Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Queue a job for background execution.
+
+        Args:
+            kind: Job category (e.g. 'deep')
+            run: Callable executed on a worker; receives the Job and returns its result
+            params: Request parameters recorded with the job
+
+        Raises:
+            JobQueueFull: If max_queued jobs are already waiting
+        """
+        job = Job(kind, params)
+        with self._lock:
+            if self._pending >= self.max_queued:
+                raise JobQueueFull(f"Job queue is full ({self.max_queued} pending)")
+            self._ensure_workers()
+            self._pending += 1
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+        self._queue.put((job, run))
+        logger.info(f"Queued {kind} job {job.job_id[:8]}... ({self._pending} pending)")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by ID."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_position(self, job: Job) -> Optional[int]:
+        """1-based position among queued jobs, or None if the job has started."""
+        if job.status != JOB_QUEUED:
+            return None
+        with self._lock:
+            queued = [j for j in self._jobs.values() if j.status == JOB_QUEUED]
+        return queued.index(job) + 1 if job in queued else None
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of jobs by status."""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        counts["max_concurrency"] = self.max_concurrency
+        return counts
+
+    def _evict_finished(self):
+        """Drop the oldest finished jobs beyond max_retained. Caller holds the lock."""
+        overflow = len(self._jobs) - self.max_retained
+        if overflow <= 0:
+            return
+        for job_id in [jid for jid, j in self._jobs.items() if j.is_finished][:overflow]:
+            del self._jobs[job_id]
+
+    def _worker_loop(self):
+        while True:
+            job, run = self._queue.get()
+            with self._lock:
+                self._pending -= 1
+            job.status = JOB_RUNNING
+            job.started_at = datetime.now()
+            try:
+                job.result = run(job)
+                job.status = JOB_SUCCEEDED
+            except Exception as e:
+                logger.error(f"Job {job.job_id} failed: {e}", exc_info=True)
+                job.error = str(e)
+                job.status = JOB_FAILED
+            finally:
+                job.finished_at = datetime.now()
+                self._queue.task_done()
+            logger.info(f"Job {job.job_id[:8]}... finished with status '{job.status}'")
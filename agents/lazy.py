@@ -0,0 +1,52 @@
+"""
+Build-once, thread-safe factories.
+
+Agents, LLM clients and heavy libraries are created on first use instead of
+at import time, so importing the API is fast and a missing key only fails
+the request that needs it. Concurrent first calls build the object once.
+"""
+
+import functools
+import threading
+from typing import Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+_UNSET = object()
+
+
+class LazyFactory(Generic[T]):
+    """
+    Callable returning the (cached) result of `build`.
+
+    If building raises, nothing is cached and the next call tries again.
+    """
+
+    def __init__(self, build: Callable[[], T]):
+        self._build = build
+        self._value = _UNSET
+        self._lock = threading.Lock()
+        functools.update_wrapper(self, build)
+
+    def __call__(self) -> T:
+        value = self._value
+        if value is _UNSET:
+            with self._lock:
+                value = self._value
+                if value is _UNSET:
+                    value = self._value = self._build()
+        return value
+
+    @property
+    def is_built(self) -> bool:
+        return self._value is not _UNSET
+
+    def reset(self):
+        """Forget the built object; the next call builds it again."""
+        with self._lock:
+            self._value = _UNSET
+
+
+def lazy(build: Callable[[], T]) -> LazyFactory[T]:
+    """Decorator turning a zero-argument builder into a LazyFactory."""
+    return LazyFactory(build)
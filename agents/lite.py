@@ -3,39 +3,42 @@ from final import run_deep_research
 from web_search import internet_search
 from dotenv import load_dotenv
 import os
-import glob
-from langchain_google_genai import ChatGoogleGenerativeAI
+import hashlib
+from cache import AnswerCache
+from corpus import ReportCorpus
+from report_index import ReportIndex, SessionIndexCache, select_sections
+from lazy import lazy
 
 load_dotenv()
 api_key = os.getenv("API_4")
 OUTPUT_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "output")
 
-def get_answer(query: str):
-    # Read all markdown files from output directory
-    md_context = ""
-    for filepath in glob.glob(os.path.join(OUTPUT_DIR, "*.md")):
-        with open(filepath, "r", encoding="utf-8") as f:
-            md_context += f"\n\n--- FILE: {os.path.basename(filepath)} ---\n"
-            md_context += f.read()
+# 'sections': only the report sections relevant to the question; 'full': every report in full
+CONTEXT_MODE = os.getenv("LITE_CONTEXT_MODE", "sections").lower()
+TOP_K_SECTIONS = int(os.getenv("LITE_TOP_K_SECTIONS", "6"))
+MAX_CONTEXT_CHARS = int(os.getenv("LITE_MAX_CONTEXT_CHARS", "12000"))
+# Per-session indexes of a session's own reports, kept while the session is active
+SESSION_CACHE_TTL = float(os.getenv("LITE_SESSION_CACHE_TTL", os.getenv("SESSION_TTL_SECONDS", "21600")))
+SESSION_CACHE_MAX = int(os.getenv("LITE_SESSION_CACHE_MAX", "1000"))
+# Answers to repeated questions, reused while the reports they came from are unchanged
+ANSWER_CACHE_ENABLED = os.getenv("LITE_ANSWER_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+ANSWER_CACHE_TTL = float(os.getenv("LITE_ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX = int(os.getenv("LITE_ANSWER_CACHE_MAX", "2000"))
 
-    llm = ChatGoogleGenerativeAI(
-        api_key=api_key,
-        model="models/gemini-flash-lite-latest",
-        temperature=0,
-    )
-    
-    SYSTEM_PROMPT = f"""
+SYSTEM_PROMPT = """
 You are a Research Assistant Agent.
 
 ## Knowledge Sources (Ranked Order)
-1. **Primary Source** → The markdown documents located in the output folder.
+1. **Primary Source** → The markdown report excerpts provided with each question.
+   Excerpts marked `SCOPE: session` come from this conversation's own research and take
+   precedence over `SCOPE: global` excerpts from other reports.
 2. **Secondary Source** → The Internet (via the provided internet_search tool) ONLY IF:
-   - The answer is not present in the markdown documents, OR
+   - The answer is not present in the markdown excerpts, OR
    - User explicitly requests updated / latest / external information.
 
 ## Your Task
 When answering any user query:
-- FIRST search inside the markdown context included below.
+- FIRST search inside the markdown context provided with the question.
 - If relevant information exists in the markdown text, answer ONLY from that.
 - If the markdown does not contain enough information, then call the internet_search tool.
 - Combine markdown + search results when needed, but never ignore markdown context.
@@ -44,25 +47,254 @@ When answering any user query:
 - Do not hallucinate — if neither markdown nor the internet contains the answer, say so.
 - Keep answers concise and factual unless user requests otherwise.
 - Never mention that you "read from OUTPUT_DIR". Treat the markdown as built-in knowledge.
+"""
 
-## Markdown Knowledge Context
-Below are all markdown documents available to you:
+@lazy
+def get_llm():
+    """LLM client of the lite agent, shared by all queries."""
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
-{md_context}
+    return ChatGoogleGenerativeAI(
+        api_key=api_key,
+        model="models/gemini-flash-lite-latest",
+        temperature=0,
+    )
 
-End of markdown context.
-"""
+@lazy
+def get_corpus():
+    """Reports in the output directory, loaded once and refreshed incrementally."""
+    return ReportCorpus(OUTPUT_DIR)
+
+@lazy
+def get_report_index():
+    """Section index over the reports, updated as reports are added or changed."""
+    return ReportIndex(get_corpus(), on_change=_invalidate_answers)
 
-    agent = create_agent(
-        model=llm,
+@lazy
+def get_agent():
+    """Lite agent; report context travels with each question, so one agent serves all."""
+    return create_agent(
+        model=get_llm(),
         tools=[internet_search],
         system_prompt=SYSTEM_PROMPT,
     )
-    
-    result = agent.invoke({
-        "messages": [{"role": "user", "content": query}]
-    })
-    return result["messages"][-1].content
+
+@lazy
+def get_session_indexes():
+    """Indexes of each active session's own reports."""
+    return SessionIndexCache(ttl_seconds=SESSION_CACHE_TTL, max_sessions=SESSION_CACHE_MAX)
+
+@lazy
+def get_answer_cache():
+    """Cache of lite answers, or None when disabled."""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    return AnswerCache(ttl_seconds=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX)
+
+def _invalidate_answers(names):
+    """Drop cached answers built from reports that changed or were removed."""
+    cache = get_answer_cache()
+    if cache is not None:
+        cache.invalidate_sources(names)
+
+def answer_cache_stats():
+    """Counters of the answer cache, or None when it is disabled."""
+    cache = get_answer_cache()
+    return cache.stats() if cache is not None else None
+
+def index_reports() -> str:
+    """Bring the section index up to date with the output directory; returns its version."""
+    return get_report_index().sync()
+
+def session_report_files(session_id: str, linked_reports=()):
+    """
+    Reports belonging to a session: those saved for it (deep_report_<session_id>_*.md)
+    plus any linked to it explicitly, e.g. a cached report served to the session.
+    """
+    names = {os.path.basename(path) for path in linked_reports if path}
+    prefix = f"deep_report_{session_id}_"
+    return [f for f in get_corpus().files() if f.name.startswith(prefix) or f.name in names]
+
+def _format_sections(sections, scope: str) -> str:
+    return "".join(
+        f"\n\n--- FILE: {s['source']} | SECTION: {s['title']} | SCOPE: {scope} ---\n{s['text']}"
+        for s in sections
+    )
+
+def retrieve_context(query: str, mode: str = None, session_id: str = None, session_reports=()):
+    """
+    Markdown context for a question and the reports it was built from.
+
+    The session's own reports come first; reports from other sessions only
+    fill the remaining budget, ranked by relevance. In 'full' mode every
+    report is included in full (the session's first).
+
+    Returns:
+        (context, sources) where sources lists (scope, CorpusFile) pairs
+    """
+    index_reports()
+    own = session_report_files(session_id, session_reports) if session_id else []
+    own_names = {f.name for f in own}
+
+    if (mode or CONTEXT_MODE) == "full":
+        others = [f for f in get_corpus().files() if f.name not in own_names]
+        sources = [("session", f) for f in own] + [("global", f) for f in others]
+        return "".join(
+            f"\n\n--- FILE: {f.name} | SCOPE: {scope} ---\n{f.text}"
+            for scope, f in sources
+        ), sources
+
+    seen = set()
+    session_sections = []
+    if own:
+        session_index = get_session_indexes().get(session_id, own)
+        session_sections = select_sections(session_index.search(query, None), TOP_K_SECTIONS, MAX_CONTEXT_CHARS, seen)
+        if not session_sections:
+            # Follow-ups like "summarize that" match no terms: lead with the report's opening sections
+            session_sections = select_sections(session_index.sections(), TOP_K_SECTIONS // 2 or 1, MAX_CONTEXT_CHARS // 2, seen)
+
+    remaining_k = TOP_K_SECTIONS - len(session_sections)
+    remaining_chars = MAX_CONTEXT_CHARS - sum(len(s["text"]) for s in session_sections)
+    global_sections = []
+    if remaining_k > 0 and remaining_chars > 0:
+        global_sections = [
+            s for s in get_report_index().search(
+                query, k=remaining_k, max_chars=remaining_chars, exclude=own_names, sync=False
+            )
+            if s["text"] not in seen
+        ]
+
+    # The session's ranking depends on all of its reports; other reports only on the ones retrieved
+    files = {f.name: f for f in get_corpus().files()}
+    sources = [("session", f) for f in own]
+    sources += [("global", files[name]) for name in dict.fromkeys(s["source"] for s in global_sections) if name in files]
+    if not session_sections and not global_sections:
+        return "(No report section matches this question.)", sources
+    return _format_sections(session_sections, "session") + _format_sections(global_sections, "global"), sources
+
+def build_context(query: str, mode: str = None, session_id: str = None, session_reports=()) -> str:
+    """Markdown context for a question (see retrieve_context)."""
+    return retrieve_context(query, mode, session_id, session_reports)[0]
+
+def _format_prompt(query: str, context: str) -> str:
+    return (
+        "## Markdown Knowledge Context\n"
+        f"{context}\n\n"
+        "End of markdown context.\n\n"
+        f"## Question\n{query}"
+    )
+
+def build_prompt(query: str, mode: str = None, session_id: str = None, session_reports=()) -> str:
+    """User message: the markdown context followed by the question."""
+    return _format_prompt(query, build_context(query, mode, session_id, session_reports))
+
+def sources_version(sources) -> str:
+    """Stamp of the reports behind a context; changes when any of them (or their scope) does."""
+    h = hashlib.sha256((CONTEXT_MODE + ";").encode("utf-8"))
+    for scope, f in sources:
+        h.update(f"{scope}:{f.name}:{f.size}:{f.mtime_ns};".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+def _prepare(query: str, session_id: str = None, session_reports=()):
+    """Prompt for a question plus the version and names of the reports it was built from."""
+    context, sources = retrieve_context(query, session_id=session_id, session_reports=session_reports)
+    return _format_prompt(query, context), sources_version(sources), [f.name for _, f in sources]
+
+def get_answer(query: str, config=None, session_id: str = None, session_reports=()):
+    """
+    Answer a follow-up question.
+
+    Repeated questions are answered from the answer cache while the reports
+    their context came from are unchanged.
+
+    Args:
+        session_id: Session asking; its own reports are used before any other
+        session_reports: Report paths linked to the session besides its own saved ones
+    """
+    prompt, version, sources = _prepare(query, session_id, session_reports)
+    cache = get_answer_cache()
+    if cache is not None:
+        cached = cache.get(query, version)
+        if cached is not None:
+            return cached
+    result = get_agent().invoke({"messages": [{"role": "user", "content": prompt}]}, config=config)
+    answer = result["messages"][-1].content
+    if cache is not None and answer:
+        cache.put(query, version, answer, sources)
+    return answer
+
+def _chunk_text(content) -> str:
+    """Text of a message chunk (providers send a string or a list of content blocks)."""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in content or []
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+def stream_answer(query: str, config=None, session_id: str = None, session_reports=()):
+    """
+    Answer a follow-up question incrementally.
+
+    Yields (kind, payload) tuples as the agent runs:
+        ("text", str): next piece of the final reply
+        ("tool_start", {"tool", "tool_call_id"}): the model called a tool
+        ("tool_end", {"tool", "tool_call_id"}): the tool returned
+        ("answer", str): the final answer (last), same as get_answer
+
+    A cached answer is yielded as ("cached", {"version"}) followed by the whole
+    answer as one "text" piece.
+
+    Text the model writes alongside a tool call ("Let me search for...") is
+    not part of the answer, and a turn only shows whether it calls a tool
+    once it is complete, so each turn's text is held back until then and
+    dropped if the turn called a tool.
+    """
+    prompt, version, sources = _prepare(query, session_id, session_reports)
+    cache = get_answer_cache()
+    if cache is not None:
+        cached = cache.get(query, version)
+        if cached is not None:
+            yield "cached", {"version": version}
+            yield "text", _chunk_text(cached)
+            yield "answer", cached
+            return
+    inputs = {"messages": [{"role": "user", "content": prompt}]}
+    final_state = None
+    # Text of the model turn in progress, and whether that turn calls a tool
+    pending, calls_tool = [], False
+    for mode, data in get_agent().stream(inputs, config=config, stream_mode=["messages", "values"]):
+        if mode == "values":
+            # A step finished, so the turn is complete
+            if pending and not calls_tool:
+                yield "text", "".join(pending)
+            pending, calls_tool = [], False
+            final_state = data
+            continue
+        message, _ = data
+        if message.type == "tool":
+            yield "tool_end", {"tool": message.name, "tool_call_id": message.tool_call_id}
+            continue
+        if message.type not in ("ai", "AIMessageChunk"):
+            continue
+        if getattr(message, "tool_calls", None):
+            calls_tool = True
+        for chunk in getattr(message, "tool_call_chunks", None) or []:
+            calls_tool = True
+            # Only the first chunk of a tool call carries its name
+            if chunk.get("name"):
+                yield "tool_start", {"tool": chunk["name"], "tool_call_id": chunk.get("id")}
+        text = _chunk_text(message.content)
+        if text and not calls_tool:
+            pending.append(text)
+    if pending and not calls_tool:
+        yield "text", "".join(pending)
+    messages = (final_state or {}).get("messages") or []
+    answer = messages[-1].content if messages else ""
+    if cache is not None and answer:
+        cache.put(query, version, answer, sources)
+    yield "answer", answer
 
 if __name__ == "__main__":
-    print(get_answer("What is minocycline current cagr"))
\ No newline at end of file
+    print(get_answer("What is minocycline current cagr"))
@@ -0,0 +1,569 @@
+"""
+End-to-end load test of the FastAPI/RouteLayer stack without LLM or API quota.
+
+Every LLM (deep orchestrator, its subagents, lite, market, knowledge and
+visualization agents) is replaced with a scripted fake chat model with a
+configurable latency, and Tavily, PubMed and the Pinecone vector store are
+stubbed. Requests go through the real ASGI app in-process, so routing,
+admission control, streaming, serialization, metrics and tracing are all
+exercised; only the network calls are fake.
+
+Usage:
+    python agents/loadtest.py [--paths lite deep] [--concurrency 1 4 16] [--requests 40]
+                              [--llm-latency 0.2] [--tool-latency 0.05] [--stream]
+
+Admission limits come from the usual AGENT_DEEP_* / AGENT_LITE_* variables;
+requests turned away with 429/503 are reported as rejected.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import time
+import asyncio
+import argparse
+import tempfile
+import itertools
+from pathlib import Path
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+try:
+    from agents.corpus import ReportCorpus
+    from agents.report_index import ReportIndex
+except ImportError:
+    from corpus import ReportCorpus
+    from report_index import ReportIndex
+
+DEFAULT_SUBAGENTS = ("pubmed-agent", "web-intelligence-agent", "iqvia-insights-agent", "internal-knowledge-agent")
+
+# Tool call made by a worker agent: "*" is its first bound tool
+CALL_FIRST_TOOL = [{"tools": ["*"]}]
+
+
+# ============================================================================
+# FAKE MODEL AND BACKENDS
+# ============================================================================
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic chat model that follows a script of tool calls.
+
+    Turn N of a conversation (the Nth model call after the last human
+    message) plays `script[N]`; once the script is exhausted the model
+    answers with `answer`. A step is either
+    `{"tool_calls": [{"name": ..., "args": {...}}]}` or `{"tools": [name, ...]}`,
+    where arguments are filled in from the bound tool's schema ("*" is the
+    first bound tool).
+    """
+
+    script: List[Dict[str, Any]] = Field(default_factory=list)
+    answer: str = "Done."
+    latency: float = 0.0
+    tool_query: str = "minocycline"
+    model_name: str = "scripted"
+    bound_tools: List[Dict[str, Any]] = Field(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs):
+        return self.model_copy(update={
+            "bound_tools": [convert_to_openai_tool(t)["function"] for t in tools]
+        })
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        turn = _turns_since_human(messages)
+        if turn < len(self.script):
+            message = AIMessage(content="", tool_calls=self._tool_calls(self.script[turn], turn))
+        else:
+            message = AIMessage(content=self.answer)
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        message.usage_metadata = {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": len(str(message.content)) // 4 + 1,
+            "total_tokens": prompt_chars // 4 + len(str(message.content)) // 4 + 1,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        """Stream the same reply word by word (`latency` is the time to first token)."""
+        message = self._generate(messages, stop, run_manager, **kwargs).generations[0].message
+        if message.tool_calls:
+            chunks = [AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ])]
+        else:
+            chunks = [AIMessageChunk(content=piece) for piece in re.findall(r"\S+\s*", message.content)]
+        for chunk in chunks:
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    def _tool_calls(self, step: Dict[str, Any], turn: int) -> List[Dict[str, Any]]:
+        calls = [dict(call) for call in step.get("tool_calls", [])]
+        for name in step.get("tools", []):
+            tool = self.bound_tools[0] if name == "*" and self.bound_tools else next(
+                (t for t in self.bound_tools if t["name"] == name), None
+            )
+            if tool is not None:
+                calls.append({"name": tool["name"], "args": self._fill_args(tool)})
+        return [
+            {**call, "id": f"call_{turn}_{i}", "type": "tool_call"}
+            for i, call in enumerate(calls)
+        ]
+
+    def _fill_args(self, tool: Dict[str, Any]) -> Dict[str, Any]:
+        """Plausible values for a tool's required parameters."""
+        schema = tool.get("parameters") or {}
+        args = {}
+        for name in schema.get("required", []):
+            spec = schema.get("properties", {}).get(name, {})
+            if spec.get("enum"):
+                args[name] = spec["enum"][0]
+            elif spec.get("type") == "integer":
+                args[name] = 3
+            elif spec.get("type") == "number":
+                args[name] = 1.0
+            elif spec.get("type") == "boolean":
+                args[name] = False
+            else:
+                args[name] = self.tool_query
+        return args
+
+
+def _turns_since_human(messages) -> int:
+    turns = 0
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        if isinstance(message, AIMessage):
+            turns += 1
+    return turns
+
+
+def synthetic_report(chars: int) -> str:
+    """Markdown report of roughly `chars` characters."""
+    sections = ["Executive Summary", "Market Landscape", "Clinical Evidence", "Patent Landscape", "Strategic Implications"]
+    paragraph = (
+        "Minocycline shows neuroprotective activity in preclinical models with a favourable "
+        "safety profile; repurposing would require a new formulation and a phase II trial. "
+    )
+    per_section = max(1, chars // len(sections) // len(paragraph))
+    return "\n\n".join(f"## {title}\n\n" + paragraph * per_section for title in sections)
+
+
+class FakeTavilyClient:
+    """Stands in for TavilyClient.search."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def search(self, query: str, max_results: int = 5, **kwargs) -> Dict[str, Any]:
+        time.sleep(self.latency)
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {i + 1} for {query}",
+                    "url": f"https://example.org/{i + 1}",
+                    "content": f"Snippet {i + 1} about {query}. " * 20,
+                    "score": round(1 - i / 10, 2),
+                }
+                for i in range(max_results)
+            ],
+        }
+
+
+class _EntrezHandle:
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+
+    def close(self):
+        pass
+
+
+class FakeEntrez:
+    """Stands in for Bio.Entrez in pubmed_tool (esearch, efetch, read)."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def esearch(self, db: str, term: str, retmax: int = 5, **kwargs) -> _EntrezHandle:
+        time.sleep(self.latency)
+        return _EntrezHandle({"IdList": [str(40000000 + i) for i in range(retmax)]})
+
+    def efetch(self, db: str, id: List[str], **kwargs) -> _EntrezHandle:
+        time.sleep(self.latency)
+        return _EntrezHandle({"PubmedArticle": [
+            {
+                "MedlineCitation": {
+                    "PMID": pmid,
+                    "Article": {
+                        "ArticleTitle": f"Study {pmid}",
+                        "Abstract": {"AbstractText": ["Background. Methods. Results. Conclusions. " * 15]},
+                        "AuthorList": [{"LastName": "Doe", "Initials": "J"}],
+                        "Journal": {"Title": "J Loadtest", "JournalIssue": {"PubDate": {"Year": "2024", "Month": "Jan"}}},
+                    },
+                }
+            }
+            for pmid in id
+        ]})
+
+    def read(self, handle: _EntrezHandle) -> Dict[str, Any]:
+        return handle.payload
+
+
+class FakeVectorStore:
+    """Stands in for the Pinecone vector store of the knowledge agent."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+        time.sleep(self.latency)
+        return [
+            Document(page_content=f"Internal note {i + 1} on {query}. " * 30, metadata={"source": "loadtest.pdf", "page": i})
+            for i in range(k)
+        ]
+
+
+def _loaded_modules(name: str) -> List[Any]:
+    """A module as imported by the app (bare when run from agents/, or as agents.<name>)."""
+    return [sys.modules[key] for key in (name, f"agents.{name}") if key in sys.modules]
+
+
+def _patch(stack: ExitStack, target: Any, key: str, value: Any):
+    """Set an attribute (or dict item) for the duration of `stack`."""
+    if isinstance(target, dict):
+        original = target[key]
+        target[key] = value
+        stack.callback(target.__setitem__, key, original)
+    else:
+        original = getattr(target, key)
+        setattr(target, key, value)
+        stack.callback(setattr, target, key, original)
+
+
+def orchestrator_script(subagents: Sequence[str] = DEFAULT_SUBAGENTS) -> List[Dict[str, Any]]:
+    """Deep orchestrator turn delegating to every subagent in parallel."""
+    return [{"tool_calls": [
+        {"name": "task", "args": {"subagent_type": name, "description": f"Research minocycline repurposing ({name})"}}
+        for name in subagents
+    ]}]
+
+
+def install_fakes(
+    stack: ExitStack,
+    llm_latency: float = 0.2,
+    tool_latency: float = 0.05,
+    subagents: Sequence[str] = DEFAULT_SUBAGENTS,
+    report_chars: int = 6000,
+    output_dir: Optional[Path] = None
+):
+    """
+    Replace every LLM, Tavily, PubMed and the vector store with fakes until `stack` closes.
+
+    The deep orchestrator delegates to `subagents` in parallel and then writes
+    a `report_chars` report; worker agents call their first tool once and
+    answer; lite answers directly. Must be called after the app is imported.
+    """
+    def model(name: str, script: List[Dict[str, Any]], answer: str) -> ScriptedChatModel:
+        return ScriptedChatModel(script=script, answer=answer, latency=llm_latency, model_name=f"fake-{name}")
+
+    deep_script = orchestrator_script(subagents)
+    worker_answer = "Findings: market growing at 4.2% CAGR; two active phase II trials; key patent expires 2027."
+
+    for final in _loaded_modules("final"):
+        _patch(stack, final, "get_deep_agent_llm", lambda: model("deep", deep_script, synthetic_report(report_chars)))
+        for spec in (final.research_subagent, final.pubmed_subagent):
+            _patch(stack, spec, "model", model(spec["name"], CALL_FIRST_TOOL, worker_answer))
+        # Agents built with real models (or before the fakes) must be rebuilt
+        final.get_agent.reset()
+        final.get_checkpointer.reset()
+        stack.callback(final.get_agent.reset)
+        stack.callback(final.get_checkpointer.reset)
+    for module_name in ("market_agents", "internal_knowlege", "visualization_agent"):
+        for module in _loaded_modules(module_name):
+            _patch(stack, module, "get_llm", lambda name=module_name: model(name, CALL_FIRST_TOOL, worker_answer))
+    for module in _loaded_modules("internal_knowlege"):
+        _patch(stack, module, "_get_vectorstore", lambda: FakeVectorStore(tool_latency))
+    for module in _loaded_modules("web_search"):
+        _patch(stack, module, "get_tavily_client", lambda: FakeTavilyClient(tool_latency))
+    for module in _loaded_modules("pubmed_tool"):
+        _patch(stack, module, "Entrez", FakeEntrez(tool_latency))
+    for lite in _loaded_modules("lite"):
+        lite_model = model("lite", [], "Minocycline's market is growing at a 4.2% CAGR (per the latest report).")
+        _patch(stack, lite, "get_llm", lambda: lite_model)
+        if output_dir is not None:
+            corpus = ReportCorpus(output_dir)
+            index = ReportIndex(corpus)
+            _patch(stack, lite, "get_corpus", lambda: corpus)
+            _patch(stack, lite, "get_report_index", lambda: index)
+        # Drop a lite agent compiled with the real model
+        lite.get_agent.reset()
+        stack.callback(lite.get_agent.reset)
+        # Start from an empty answer cache so runs do not see each other's answers
+        lite.get_answer_cache.reset()
+        stack.callback(lite.get_answer_cache.reset)
+
+
+# ============================================================================
+# LOAD GENERATOR
+# ============================================================================
+
+async def asgi_call(
+    app,
+    method: str,
+    path: str,
+    payload: Optional[Dict[str, Any]] = None
+) -> Tuple[int, float, float, bytes]:
+    """
+    Send a request to an ASGI app in-process (with a JSON body if `payload` is given).
+
+    Returns:
+        (status, seconds to first body byte, seconds to last byte, body)
+    """
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    headers = [(b"host", b"loadtest")]
+    if payload is not None:
+        headers += [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("latin-1"),
+        "query_string": b"",
+        "root_path": "",
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("loadtest", 80),
+    }
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    status, first_byte = 0, None
+    chunks: List[bytes] = []
+    started = time.perf_counter()
+
+    async def send(message):
+        nonlocal status, first_byte
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            if first_byte is None and message.get("body"):
+                first_byte = time.perf_counter() - started
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    total = time.perf_counter() - started
+    return status, first_byte if first_byte is not None else total, total, b"".join(chunks)
+
+
+async def asgi_request(app, path: str, payload: Dict[str, Any]) -> Tuple[int, float, float, int]:
+    """
+    POST a JSON body to an ASGI app in-process.
+
+    Returns:
+        (status, seconds to first body byte, seconds to last byte, body bytes)
+    """
+    status, first_byte, total, body = await asgi_call(app, "POST", path, payload)
+    return status, first_byte, total, len(body)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, or None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+# Shared by every level, so no level is answered from a cache filled by an earlier one
+_query_numbers = itertools.count()
+
+
+async def run_level(app, agent: str, concurrency: int, requests: int, stream: bool = False) -> Dict[str, Any]:
+    """
+    Send `requests` queries for one agent path from `concurrency` clients.
+
+    No query text repeats within the process, so deep runs are neither cached
+    nor coalesced and lite answers are not served from the answer cache.
+    """
+    path = "/api/query/stream" if stream else "/api/query"
+    counter = itertools.count()
+    latencies, first_bytes = [], []
+    rejected = errors = 0
+    bytes_received = 0
+
+    async def client():
+        nonlocal rejected, errors, bytes_received
+        while (i := next(counter)) < requests:
+            status, first_byte, total, size = await asgi_request(
+                app, path,
+                {"query": f"Assess minocycline repurposing, variant {next(_query_numbers)}", "agent_type": agent}
+            )
+            bytes_received += size
+            if status == 200:
+                latencies.append(total)
+                first_bytes.append(first_byte)
+            elif status in (429, 503):
+                rejected += 1
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "rejected": rejected,
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "ttfb_p50_ms": ms(percentile(first_bytes, 50)),
+        "kb_per_req": round(bytes_received / max(requests, 1) / 1024, 1),
+    }
+
+
+def _prepare_environment(work_dir: Path, report_cache: bool):
+    """Keep sessions, logs, traces and checkpoints of the load test out of the real state."""
+    os.environ.setdefault("RUN_LOG_DIR", str(work_dir / "runs"))
+    os.environ.setdefault("TRACE_DIR", str(work_dir / "traces"))
+    os.environ.setdefault("DEEP_CHECKPOINT_DB", str(work_dir / "checkpoints.db"))
+    os.environ.setdefault("SESSION_BACKEND", "memory")
+    os.environ["REPORT_CACHE_ENABLED"] = "1" if report_cache else "0"
+
+
+@contextmanager
+def fake_app(work_dir: Path, report_cache: bool = False, **fakes):
+    """
+    The app with fake backends, its sessions, reports, runs and logs kept under `work_dir`.
+
+    Yields the route module (serve `route.app`); the fakes are removed on exit.
+    Environment settings only take effect if the app was not imported yet.
+    """
+    _prepare_environment(work_dir, report_cache)
+    try:
+        from agents import route
+    except ImportError:
+        import route
+    try:
+        from agents.artifacts import ArtifactStore
+    except ImportError:
+        from artifacts import ArtifactStore
+
+    with ExitStack() as stack:
+        output_dir = work_dir / "output"
+        output_dir.mkdir(exist_ok=True)
+        install_fakes(stack, output_dir=output_dir, **fakes)
+        _patch(stack, route.router, "output_dir", output_dir)
+        _patch(stack, route.router, "artifacts", ArtifactStore(work_dir / "state" / "runs"))
+        yield route
+
+
+def run_load_test(
+    paths: Sequence[str],
+    levels: Sequence[int],
+    requests: int,
+    stream: bool = False,
+    report_cache: bool = False,
+    **fakes
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Run every path at every concurrency level against the app with fake backends."""
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp, \
+            fake_app(Path(tmp), report_cache=report_cache, **fakes) as route:
+
+        async def run_all():
+            return {
+                agent: [await run_level(route.app, agent, level, requests, stream) for level in levels]
+                for agent in paths
+            }
+
+        return asyncio.run(run_all())
+
+
+def _print_results(results: Dict[str, List[Dict[str, Any]]], title: str):
+    for agent, rows in results.items():
+        print(f"\n{title}: {agent}")
+        print("-" * 80)
+        columns = list(rows[0].keys())
+        print("".join(f"{c:>13}" for c in columns))
+        for row in rows:
+            print("".join(f"{'-' if row[c] is None else row[c]:>13}" for c in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the agent API with a fake LLM")
+    parser.add_argument("--paths", nargs="+", choices=["lite", "deep"], default=["lite", "deep"], help="Agent paths to load")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16], help="Concurrent clients per level")
+    parser.add_argument("--requests", type=int, default=40, help="Requests per path and level")
+    parser.add_argument("--stream", action="store_true", help="Use /api/query/stream (ttfb is then time to first event/token)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per fake LLM call")
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="Seconds per fake Tavily/PubMed/vector search call")
+    parser.add_argument("--subagents", default=",".join(DEFAULT_SUBAGENTS), help="Subagents the deep orchestrator delegates to")
+    parser.add_argument("--report-chars", type=int, default=6000, help="Size of the fake deep report")
+    parser.add_argument("--report-cache", action="store_true", help="Keep the deep report cache enabled")
+    args = parser.parse_args(argv)
+
+    results = run_load_test(
+        args.paths,
+        args.concurrency,
+        args.requests,
+        stream=args.stream,
+        report_cache=args.report_cache,
+        llm_latency=args.llm_latency,
+        tool_latency=args.tool_latency,
+        subagents=[name.strip() for name in args.subagents.split(",") if name.strip()],
+        report_chars=args.report_chars,
+    )
+    _print_results(
+        results,
+        f"Load test ({args.requests} requests/level, LLM {args.llm_latency}s, tools {args.tool_latency}s"
+        f"{', streaming' if args.stream else ''})"
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,11 +2,13 @@ import os
 from dotenv import load_dotenv
 from langchain.agents import create_agent
 from langchain.agents.middleware import ModelCallLimitMiddleware, ToolCallLimitMiddleware
-from langchain_openai import ChatOpenAI
 from langchain.tools import tool
-from langchain_groq import ChatGroq
 # Import Mock APIs
 from mock_data_api import MockIQVIA, MockEXIM, MockUSPTO, MockClinicalTrials
+try:
+    from agents.lazy import lazy
+except ImportError:
+    from lazy import lazy
 
 # Load environment variables
 load_dotenv()
@@ -16,13 +18,18 @@ iqvia_api = MockIQVIA()
 exim_api = MockEXIM()
 uspto_api = MockUSPTO()
 trials_api = MockClinicalTrials()
-api_key = os.getenv("OPENROUTER_API_KEY")
-# Initialize LLM
-llm=ChatGroq(
-    model='moonshotai/kimi-k2-instruct-0905',
-    api_key=os.getenv('groq'),
-    temperature=0.1
-)
+
+@lazy
+def get_llm():
+    """LLM shared by the market agents, created when the first of them is built."""
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        model='moonshotai/kimi-k2-instruct-0905',
+        api_key=os.getenv('groq'),
+        temperature=0.1
+    )
+
 # --- 1. IQVIA Agent (Market Insights) ---
 @tool
 def get_market_insights(query: str):
@@ -44,7 +51,7 @@ def get_market_agent():
     )
     # Using create_agent which returns a RunnableGraph runnable with middleware
     return create_agent(
-        llm, 
+        get_llm(), 
         tools=tools, 
         system_prompt=system_prompt,
         middleware=[
@@ -72,7 +79,7 @@ def get_trade_agent():
         "Use 'get_trade_data' to assess supply stability, identify major suppliers (e.g., in India/China), and check price trends."
     )
     return create_agent(
-        llm, 
+        get_llm(), 
         tools=tools, 
         system_prompt=system_prompt,
         middleware=[
@@ -100,7 +107,7 @@ def get_patent_agent():
         "Use 'search_patents' to find expiration dates and assignee details."
     )
     return create_agent(
-        llm, 
+        get_llm(), 
         tools=tools, 
         system_prompt=system_prompt,
         middleware=[
@@ -128,7 +135,7 @@ def get_trials_agent():
         "Use 'get_clinical_trials' to check trial phases, sponsors, and results."
     )
     return create_agent(
-        llm, 
+        get_llm(), 
         tools=tools, 
         system_prompt=system_prompt,
         middleware=[
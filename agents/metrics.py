@@ -0,0 +1,315 @@
+"""
+Lightweight Prometheus-style metrics.
+
+Counters and histograms are kept in process memory and rendered in the
+Prometheus text exposition format by `/metrics`. Agent internals are
+measured through `MetricsCallbackHandler`, a LangChain callback handler
+passed in the run config: it times every tool call (including subagent
+`task` calls) and every LLM call without touching the agents themselves.
+"""
+
+import time
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Latency buckets spanning fast lite answers to multi-minute deep runs
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [
+                (self.name, dict(zip(self.labelnames, key)), value)
+                for key, value in self._values.items()
+            ]
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values per label set."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0] * len(self.buckets) + [0.0, 0]
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                labels = dict(zip(self.labelnames, key))
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+                samples.append((f"{self.name}_sum", labels, state[-2]))
+                samples.append((f"{self.name}_count", labels, state[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """Holds metrics and collector callbacks and renders them as text."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]):
+        """
+        Add a callback sampled at render time.
+
+        The callback returns (name, type, help, samples) tuples, which is how
+        state owned elsewhere (sessions, jobs, caches) is exported as gauges.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        families = [(m.name, m.metric_type, m.documentation, m.samples()) for m in self._metrics]
+        for collector in self._collectors:
+            families.extend(collector())
+
+        lines = []
+        for name, metric_type, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+ROUTE_LATENCY = REGISTRY.histogram(
+    "agent_route_latency_seconds", "End-to-end routed query latency", ["agent", "outcome"]
+)
+ROUTE_FIRST_EVENT = REGISTRY.histogram(
+    "agent_route_first_event_seconds", "Time until the agent emitted its first event", ["agent"]
+)
+ROUTE_FIRST_TOKEN = REGISTRY.histogram(
+    "agent_route_first_token_seconds", "Time until the first answer token was streamed", ["agent"],
+    buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10, 30)
+)
+SUBAGENT_DURATION = REGISTRY.histogram(
+    "agent_subagent_duration_seconds", "Duration of subagent invocations", ["subagent"]
+)
+TOOL_CALLS = REGISTRY.counter(
+    "agent_tool_calls_total", "Tool calls by tool name and outcome", ["tool", "status"]
+)
+TOOL_DURATION = REGISTRY.histogram(
+    "agent_tool_duration_seconds", "Duration of tool calls", ["tool"]
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "agent_llm_call_duration_seconds", "LLM call latency by model", ["model"]
+)
+LLM_CALLS = REGISTRY.counter(
+    "agent_llm_calls_total", "LLM calls by model and outcome", ["model", "status"]
+)
+REPORT_BYTES = REGISTRY.counter(
+    "agent_report_bytes_total", "Bytes of report text returned in results", ["agent"]
+)
+IMAGES_RETURNED = REGISTRY.counter(
+    "agent_images_returned_total", "Images returned in results", ["agent"]
+)
+
+
+class RouteTimer:
+    """
+    Observes the events of one routed query.
+
+    Time to first event is measured to the first step, token, result or
+    error, since the status messages emitted up front say nothing about agent
+    progress. Time to first token is measured to the first streamed text.
+    """
+
+    _PREAMBLE = ("session_info", "status")
+
+    def __init__(self, agent: str = "unknown"):
+        self.agent = agent
+        self.outcome = "ok"
+        self._started = time.perf_counter()
+        self._first_seen = False
+        self._first_token_seen = False
+
+    def observe(self, event: Dict[str, Any]):
+        event_type = event.get("type")
+        if not self._first_seen and event_type not in self._PREAMBLE:
+            self._first_seen = True
+            ROUTE_FIRST_EVENT.observe(time.perf_counter() - self._started, agent=self.agent)
+        if event_type == "token":
+            if not self._first_token_seen and event.get("kind") == "text":
+                self._first_token_seen = True
+                ROUTE_FIRST_TOKEN.observe(time.perf_counter() - self._started, agent=self.agent)
+        elif event_type == "result":
+            data = event.get("data") or {}
+            REPORT_BYTES.inc(len(str(data.get("text", "")).encode("utf-8")), agent=self.agent)
+            IMAGES_RETURNED.inc(len(data.get("images") or []), agent=self.agent)
+        elif event_type in ("error", "cancelled"):
+            self.outcome = event_type
+
+    def finish(self):
+        ROUTE_LATENCY.observe(time.perf_counter() - self._started, agent=self.agent, outcome=self.outcome)
+
+
+def _model_name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+    """Best-effort model identifier from LangChain callback arguments."""
+    params = kwargs.get("invocation_params") or {}
+    metadata = kwargs.get("metadata") or {}
+    for candidate in (
+        params.get("model"),
+        params.get("model_name"),
+        metadata.get("ls_model_name"),
+        ((serialized or {}).get("kwargs") or {}).get("model"),
+        ((serialized or {}).get("kwargs") or {}).get("model_name"),
+    ):
+        if candidate:
+            return str(candidate)
+    return "unknown"
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Times tool, subagent and LLM calls of an agent run.
+
+    Subagents run as the deep agent's `task` tool, so their duration is the
+    duration of that tool call, labelled by `subagent_type`.
+    """
+
+    def __init__(self):
+        self._tools: Dict[UUID, Tuple[str, Optional[str], float]] = {}
+        self._llms: Dict[UUID, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    # -- tools ---------------------------------------------------------------
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, inputs: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        subagent = None
+        if name == "task" and isinstance(inputs, dict):
+            subagent = inputs.get("subagent_type")
+        with self._lock:
+            self._tools[run_id] = (name, subagent, time.perf_counter())
+
+    def _finish_tool(self, run_id: UUID, status: str):
+        with self._lock:
+            entry = self._tools.pop(run_id, None)
+        if entry is None:
+            return
+        name, subagent, started = entry
+        elapsed = time.perf_counter() - started
+        TOOL_CALLS.inc(tool=name, status=status)
+        TOOL_DURATION.observe(elapsed, tool=name)
+        if subagent:
+            SUBAGENT_DURATION.observe(elapsed, subagent=subagent)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id, "ok")
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish_tool(run_id, "error")
+
+    # -- LLMs ----------------------------------------------------------------
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            self._llms[run_id] = (_model_name(serialized, kwargs), time.perf_counter())
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            self._llms[run_id] = (_model_name(serialized, kwargs), time.perf_counter())
+
+    def _finish_llm(self, run_id: UUID, status: str):
+        with self._lock:
+            entry = self._llms.pop(run_id, None)
+        if entry is None:
+            return
+        model, started = entry
+        LLM_LATENCY.observe(time.perf_counter() - started, model=model)
+        LLM_CALLS.inc(model=model, status=status)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        self._finish_llm(run_id, "ok")
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._finish_llm(run_id, "error")
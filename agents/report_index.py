@@ -0,0 +1,361 @@
+"""
+Section-level BM25 index over generated reports.
+
+Instead of pasting every report into the lite agent's prompt, reports are
+split into markdown sections (keeping the heading path as context) and only
+the top-scoring sections for a question are sent to the model. The index is
+updated incrementally per file, in step with the ReportCorpus it follows, so
+adding a report costs only the tokenization of that report.
+"""
+
+import re
+import math
+import time
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from agents.corpus import ReportCorpus, CorpusFile
+except ImportError:
+    from corpus import ReportCorpus, CorpusFile
+
+logger = logging.getLogger("ReportIndex")
+
+# Sections longer than this are split at paragraph boundaries
+MAX_SECTION_CHARS = 2000
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.'][a-z0-9]+)*")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by can did do does for from has have how i if in is it its "
+    "me my of on or our so than that the their them then there these they this to was "
+    "we were what when where which who why will with you your about into over per vs".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms without stopwords, with plural 's' folded."""
+    terms = []
+    for term in _TOKEN.findall(text.lower()):
+        if term in _STOPWORDS or (len(term) == 1 and not term.isdigit()):
+            continue
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        terms.append(term)
+    return terms
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+    parts, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        if current and len(current) + len(paragraph) + 2 > max_chars:
+            parts.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_sections(text: str, source: str, max_chars: int = MAX_SECTION_CHARS) -> List[Dict[str, Any]]:
+    """
+    Split a markdown report into sections at its headings.
+
+    Each section carries its heading path ("Report > Market > CAGR") so a
+    retrieved excerpt still says what it is about. Headings inside fenced
+    code blocks are ignored.
+
+    Returns:
+        Dicts with source, title and text
+    """
+    sections = []
+    path: List[Tuple[int, str]] = []
+    lines: List[str] = []
+    in_fence = False
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            title = " > ".join(heading for _, heading in path) or source
+            for part in _split_long(body, max_chars):
+                sections.append({"source": source, "title": title, "text": part})
+        lines.clear()
+
+    for line in text.splitlines():
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            while path and path[-1][0] >= level:
+                path.pop()
+            path.append((level, match.group(2).strip()))
+        else:
+            lines.append(line)
+    flush()
+    return sections
+
+
+def select_sections(
+    hits: Iterable[Dict[str, Any]],
+    k: int,
+    max_chars: Optional[int] = None,
+    seen: Optional[Set[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    First `k` sections, skipping verbatim duplicates, within `max_chars` of text.
+
+    `seen` holds texts already selected elsewhere and is updated in place.
+    """
+    seen = set() if seen is None else seen
+    selected, total = [], 0
+    for hit in hits:
+        if hit["text"] in seen:
+            continue
+        if len(selected) >= k or (max_chars is not None and selected and total + len(hit["text"]) > max_chars):
+            break
+        seen.add(hit["text"])
+        selected.append(hit)
+        total += len(hit["text"])
+    return selected
+
+
+class BM25Index:
+    """
+    In-memory BM25 over sections, with per-source add and remove.
+
+    Args:
+        k1: Term frequency saturation
+        b: Length normalization
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._sections: Dict[int, Dict[str, Any]] = {}
+        self._by_source: Dict[str, List[int]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    @property
+    def sources(self) -> List[str]:
+        return list(self._by_source)
+
+    def add(self, source: str, sections: Iterable[Dict[str, Any]]):
+        """Index a source's sections, replacing any previous version of it."""
+        self.remove(source)
+        ids = []
+        for section in sections:
+            terms = tokenize(f"{section['title']} {section['text']}")
+            section_id = self._next_id
+            self._next_id += 1
+            self._sections[section_id] = {**section, "tf": Counter(terms), "length": len(terms)}
+            self._total_length += len(terms)
+            for term in set(terms):
+                self._postings.setdefault(term, set()).add(section_id)
+            ids.append(section_id)
+        self._by_source[source] = ids
+
+    def remove(self, source: str):
+        for section_id in self._by_source.pop(source, []):
+            section = self._sections.pop(section_id)
+            self._total_length -= section["length"]
+            for term in section["tf"]:
+                posting = self._postings.get(term)
+                if posting is not None:
+                    posting.discard(section_id)
+                    if not posting:
+                        del self._postings[term]
+
+    def sections(self) -> List[Dict[str, Any]]:
+        """Indexed sections (source, title, text) in the order they were added."""
+        return [
+            {"source": section["source"], "title": section["title"], "text": section["text"]}
+            for _, section in sorted(self._sections.items())
+        ]
+
+    def search(self, query: str, k: Optional[int] = 5) -> List[Dict[str, Any]]:
+        """Top `k` (or all matching) sections for a query (source, title, text, score), best first."""
+        n = len(self._sections)
+        if not n:
+            return []
+        avg_length = self._total_length / n or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for section_id in posting:
+                section = self._sections[section_id]
+                tf = section["tf"][term]
+                norm = self.k1 * (1 - self.b + self.b * section["length"] / avg_length)
+                scores[section_id] = scores.get(section_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            {
+                "source": self._sections[section_id]["source"],
+                "title": self._sections[section_id]["title"],
+                "text": self._sections[section_id]["text"],
+                "score": round(score, 4),
+            }
+            for section_id, score in best
+        ]
+
+
+class ReportIndex:
+    """
+    BM25 section index kept in sync with a ReportCorpus.
+
+    Args:
+        corpus: Reports to index
+        on_change: Called after a sync with the names of reports added, changed or removed
+    """
+
+    def __init__(self, corpus: ReportCorpus, on_change: Optional[Callable[[Set[str]], None]] = None):
+        self.corpus = corpus
+        self.on_change = on_change
+        self.bm25 = BM25Index()
+        self._indexed: Dict[str, Tuple[int, int]] = {}  # file name -> (mtime_ns, size) indexed
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[str]:
+        """Corpus version the index reflects."""
+        return self._version
+
+    def sync(self) -> str:
+        """
+        Refresh the corpus and (re)index only the files that changed.
+
+        Returns:
+            The corpus version now indexed
+        """
+        version = self.corpus.refresh()
+        with self._lock:
+            if version == self._version:
+                return version
+            changed = set()
+            files = {f.name: f for f in self.corpus.files()}
+            for name in [n for n in self._indexed if n not in files]:
+                self.bm25.remove(name)
+                del self._indexed[name]
+                changed.add(name)
+            for name, f in files.items():
+                if self._indexed.get(name) != (f.mtime_ns, f.size):
+                    self.bm25.add(name, split_sections(f.text, name))
+                    self._indexed[name] = (f.mtime_ns, f.size)
+                    changed.add(name)
+            self._version = version
+            logger.info(f"Indexed {len(self.bm25)} sections from {len(self._indexed)} reports (version {version})")
+        if changed and self.on_change is not None:
+            self.on_change(changed)
+        return version
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        max_chars: Optional[int] = None,
+        exclude: Iterable[str] = (),
+        sync: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Most relevant sections for a query, synced with the corpus first.
+
+        Sections repeated verbatim across reports are returned once.
+
+        Args:
+            k: Maximum sections
+            max_chars: Stop adding sections once their text exceeds this
+            exclude: Report file names to leave out
+            sync: False if the caller has just synced
+        """
+        if sync:
+            self.sync()
+        exclude = set(exclude)
+        with self._lock:
+            hits = [hit for hit in self.bm25.search(query, None) if hit["source"] not in exclude]
+        return select_sections(hits, k, max_chars)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"reports": len(self._indexed), "sections": len(self.bm25), "version": self._version}
+
+
+class SessionIndexCache:
+    """
+    Per-session BM25 indexes over a session's own reports.
+
+    Follow-up questions in a session are answered from that session's
+    reports first; their index is built once and kept while the session is
+    active (idle TTL, least recently used evicted beyond `max_sessions`).
+    It is rebuilt only if one of the session's reports changes.
+
+    Args:
+        ttl_seconds: Idle time after which a session's index is dropped
+        max_sessions: Maximum sessions cached
+    """
+
+    def __init__(self, ttl_seconds: float = 6 * 3600, max_sessions: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id: str, files: List[CorpusFile]) -> BM25Index:
+        """Index over `files`, the session's reports (cached per session)."""
+        fingerprint = tuple((f.name, f.mtime_ns, f.size) for f in files)
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(session_id)
+            if entry is not None and entry["fingerprint"] == fingerprint:
+                entry["last_used"] = now
+                self._entries.move_to_end(session_id)
+                self.hits += 1
+                return entry["index"]
+            self.misses += 1
+
+        index = BM25Index()
+        for f in files:
+            index.add(f.name, split_sections(f.text, f.name))
+
+        with self._lock:
+            self._entries[session_id] = {"fingerprint": fingerprint, "index": index, "last_used": now}
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_sessions:
+                self._entries.popitem(last=False)
+        return index
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def _expire(self, now: float):
+        """Drop idle sessions. Caller holds the lock."""
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if now - entry["last_used"] <= self.ttl_seconds:
+                break
+            del self._entries[session_id]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"sessions": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -6,30 +6,63 @@ Handles session-based routing between deep research and lite agents with FastAPI
 import os
 import base64
 import uuid
+import shutil
 import asyncio
-from typing import Optional, Dict, Any, Generator, List
+import threading
+from contextlib import aclosing, closing
+from typing import Optional, Dict, Any, Generator, AsyncGenerator, Callable, Iterator, List, Tuple, Union
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from pathlib import Path
-import json
+from urllib.parse import quote
+from email.utils import formatdate, parsedate_to_datetime
 
 try:
-    from agents.final import agent as deep_agent
-    from agents.lite import get_answer as run_lite_agent
+    from agents.final import (
+        get_agent as get_deep_agent, CHECKPOINT_ENABLED, CHECKPOINT_RETENTION_HOURS,
+        checkpointed_threads, delete_checkpoints, has_checkpoint
+    )
+    from agents.lite import stream_answer as stream_lite_answer, index_reports, answer_cache_stats as lite_answer_cache_stats
 except ImportError:
     # Fallback for running directly from the agents directory
-    from final import agent as deep_agent
-    from lite import get_answer as run_lite_agent
+    from final import (
+        get_agent as get_deep_agent, CHECKPOINT_ENABLED, CHECKPOINT_RETENTION_HOURS,
+        checkpointed_threads, delete_checkpoints, has_checkpoint
+    )
+    from lite import stream_answer as stream_lite_answer, index_reports, answer_cache_stats as lite_answer_cache_stats
 
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 
 try:
-    from agents.ingest_docs import ingest_file
+    from agents.ingest_docs import ingest_file, ingest_paths, SUPPORTED_EXTENSIONS
+    from agents.jobs import JobScheduler, Job, JobQueueFull, JOB_SUCCEEDED, JOB_FAILED
+    from agents.sessions import create_session_store
+    from agents.streaming import iter_message_deltas
+    from agents.runlog import get_run_log
+    from agents.cache import ReportCache, compute_data_version, normalize_query
+    from agents.singleflight import SingleFlight
+    from agents.artifacts import ImageIndex, ArtifactStore, start_run, end_run, discard_run, content_type_for
+    from agents.metrics import REGISTRY, MetricsCallbackHandler, RouteTimer
+    from agents.tracing import TraceCallbackHandler, get_span_exporter, build_waterfall
+    from agents.admission import AdmissionController, AdmissionPool, Overloaded, Slot
+    from agents.compression import CompressionMiddleware, dumps
 except ImportError:
-    from ingest_docs import ingest_file
+    from ingest_docs import ingest_file, ingest_paths, SUPPORTED_EXTENSIONS
+    from jobs import JobScheduler, Job, JobQueueFull, JOB_SUCCEEDED, JOB_FAILED
+    from sessions import create_session_store
+    from streaming import iter_message_deltas
+    from runlog import get_run_log
+    from cache import ReportCache, compute_data_version, normalize_query
+    from singleflight import SingleFlight
+    from artifacts import ImageIndex, ArtifactStore, start_run, end_run, discard_run, content_type_for
+    from metrics import REGISTRY, MetricsCallbackHandler, RouteTimer
+    from tracing import TraceCallbackHandler, get_span_exporter, build_waterfall
+    from admission import AdmissionController, AdmissionPool, Overloaded, Slot
+    from compression import CompressionMiddleware, dumps
 
 # Configure logging
 logging.basicConfig(
@@ -38,6 +71,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger("RouteLayer")
 
+# Admission control: separate concurrency pools and wait queues for deep and lite runs
+AGENT_DEEP_CONCURRENCY = int(os.getenv("AGENT_DEEP_CONCURRENCY", "2"))
+AGENT_DEEP_MAX_QUEUED = int(os.getenv("AGENT_DEEP_MAX_QUEUED", "4"))
+AGENT_DEEP_QUEUE_TIMEOUT = float(os.getenv("AGENT_DEEP_QUEUE_TIMEOUT", "30"))
+AGENT_LITE_CONCURRENCY = int(os.getenv("AGENT_LITE_CONCURRENCY", "4"))
+AGENT_LITE_MAX_QUEUED = int(os.getenv("AGENT_LITE_MAX_QUEUED", "20"))
+AGENT_LITE_QUEUE_TIMEOUT = float(os.getenv("AGENT_LITE_QUEUE_TIMEOUT", "10"))
+
+# Background deep research jobs
+JOB_MAX_CONCURRENCY = int(os.getenv("JOB_MAX_CONCURRENCY", "2"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+
+# Background document ingestion (embedding provider and Pinecone quotas are shared)
+INGEST_MAX_CONCURRENCY = int(os.getenv("INGEST_MAX_CONCURRENCY", "1"))
+INGEST_MAX_QUEUED = int(os.getenv("INGEST_MAX_QUEUED", "50"))
+
+# Session backend: 'memory' (single worker) or 'sqlite' (shared across `--workers N`)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH")
+
+# Session lifetime and capacity
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(6 * 3600)))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+# How often checkpoints of completed and long-abandoned deep runs are deleted
+CHECKPOINT_PRUNE_INTERVAL = float(os.getenv("DEEP_CHECKPOINT_PRUNE_INTERVAL", "3600"))
+# Executing deep runs refresh a marker this often; a run whose marker is older
+# than the timeout is taken to have died with its worker and may be resumed
+RUN_HEARTBEAT_INTERVAL = float(os.getenv("DEEP_RUN_HEARTBEAT_INTERVAL", "30"))
+RUN_HEARTBEAT_TIMEOUT = float(os.getenv("DEEP_RUN_HEARTBEAT_TIMEOUT", "120"))
+
+# Deep research result cache
+REPORT_CACHE_ENABLED = os.getenv("REPORT_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+REPORT_CACHE_TTL_SECONDS = float(os.getenv("REPORT_CACHE_TTL_SECONDS", str(24 * 3600)))
+REPORT_CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "500"))
+
+# Build the deep agent in the background at startup instead of on the first deep query
+AGENT_WARMUP = os.getenv("AGENT_WARMUP", "0").lower() in ("1", "true", "yes")
+
+# Span tracing of deep runs (logs/traces/<run_id>.jsonl)
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# Response compression (gzip, or brotli when the brotli package is installed)
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
 
 # ============================================================================
 # PYDANTIC MODELS
@@ -54,20 +133,63 @@ class QueryRequest(BaseModel):
         None,
         description="Session ID for maintaining conversation state. Auto-generated if not provided."
     )
+    inline_artifacts: bool = Field(
+        False,
+        description="Embed the report and images as base64 in the result instead of only returning artifact URLs."
+    )
+    force_refresh: bool = Field(
+        False,
+        description="Bypass the deep research result cache and run the agent again."
+    )
 
 
 class AgentResponse(BaseModel):
     """Response model for agent results."""
     agent: str = Field(..., description="Agent type that processed the query: 'deep' or 'lite'")
     text: str = Field(..., description="Response text in markdown format")
-    images: List[Dict[str, Any]] = Field(default=[], description="List of base64-encoded images")
+    images: List[Dict[str, Any]] = Field(default=[], description="Images with artifact URL and size (plus base64 when inlined)")
     file_path: Optional[str] = Field(None, description="Path to saved report file (for deep agent)")
-    report_base64: Optional[str] = Field(None, description="Base64 encoded content of the markdown report")
+    report_base64: Optional[str] = Field(None, description="Base64 encoded content of the markdown report (only when inlined)")
     report_filename: Optional[str] = Field(None, description="Filename of the saved report")
+    report_url: Optional[str] = Field(None, description="Artifact URL of the saved report")
+    report_size_bytes: Optional[int] = Field(None, description="Size of the saved report in bytes")
+    run_id: Optional[str] = Field(None, description="Run identifier used in artifact URLs")
+    cached: bool = Field(False, description="Whether the result was served from the report or answer cache")
     session_id: str = Field(..., description="Session ID for tracking conversation state")
     timestamp: str = Field(..., description="ISO timestamp of the response")
 
 
+class JobRequest(BaseModel):
+    """Request model for background deep research jobs."""
+    query: str = Field(..., description="The user's research question")
+    session_id: Optional[str] = Field(
+        None,
+        description="Session ID the report is linked to. Auto-generated if not provided."
+    )
+    inline_artifacts: bool = Field(
+        False,
+        description="Embed the report and images as base64 in the job result."
+    )
+    force_refresh: bool = Field(
+        False,
+        description="Bypass the deep research result cache and run the agent again."
+    )
+
+
+class JobResponse(BaseModel):
+    """Status of a background job."""
+    job_id: str = Field(..., description="Job identifier used for polling")
+    kind: str = Field(..., description="Job type, e.g. 'deep'")
+    status: str = Field(..., description="queued, running, succeeded or failed")
+    progress: Dict[str, Any] = Field(default={}, description="Latest progress information")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+    session_id: Optional[str] = Field(None, description="Session the job belongs to")
+    queue_position: Optional[int] = Field(None, description="Position in queue while waiting")
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+
 class ErrorResponse(BaseModel):
     """Error response model."""
     error: str
@@ -80,10 +202,40 @@ class IngestResponse(BaseModel):
     success: bool = Field(..., description="Whether ingestion was successful")
     message: str = Field(..., description="Status message")
     filename: str = Field(..., description="Name of the ingested file")
+    documents_loaded: Optional[int] = Field(None, description="Pages/documents parsed from the file")
     chunks_created: Optional[int] = Field(None, description="Number of chunks created")
+    vectors_upserted: Optional[int] = Field(None, description="Number of vectors written to the index")
+    timings: Dict[str, float] = Field(default={}, description="Seconds spent per stage: parse, split, embed, upsert")
     timestamp: str = Field(..., description="ISO timestamp of the ingestion")
 
 
+class BulkIngestResponse(BaseModel):
+    """Response model for multi-file ingestion."""
+    success: bool = Field(..., description="Whether every batch was ingested")
+    message: str = Field(..., description="Status message")
+    files: int = Field(..., description="Files submitted")
+    files_ingested: int = Field(..., description="Files parsed and ingested")
+    files_failed: List[Dict[str, str]] = Field(default=[], description="Files that could not be parsed, with errors")
+    documents: int = Field(..., description="Pages/documents parsed")
+    chunks: int = Field(..., description="Chunks created")
+    vectors: int = Field(..., description="Vectors written to the index")
+    elapsed_seconds: float = Field(..., description="Wall-clock duration")
+    documents_per_second: float
+    files_per_second: float
+    chunks_per_second: float
+    stage_seconds: Dict[str, float] = Field(default={}, description="Worker seconds per stage: parse, embed, upsert")
+    timestamp: str = Field(..., description="ISO timestamp of completion")
+
+
+class IngestJobResponse(JobResponse):
+    """Status of a background ingestion job."""
+    filename: Optional[str] = Field(None, description="Name of the uploaded file (single-file jobs)")
+    filenames: Optional[List[str]] = Field(None, description="Names of the uploaded files (bulk jobs)")
+    result: Optional[Union[IngestResponse, BulkIngestResponse]] = Field(
+        None, description="Ingestion outcome once the job has succeeded"
+    )
+
+
 # ============================================================================
 # ROUTE LAYER CLASS
 # ============================================================================
@@ -104,8 +256,79 @@ class RouteLayer:
         self.output_dir = self.base_dir / "output"
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Session tracking: session_id -> query_count
-        self.sessions: Dict[str, int] = {}
+        # Local state shared by worker processes (session DB, etc.)
+        self.state_dir = self.base_dir / "state"
+        
+        # Session tracking: session_id -> query_count + linked report (idle TTL + LRU bounded)
+        self.sessions = create_session_store(
+            backend=SESSION_BACKEND,
+            db_path=SESSION_DB_PATH or str(self.state_dir / "sessions.db"),
+            ttl_seconds=SESSION_TTL_SECONDS,
+            max_sessions=SESSION_MAX
+        )
+        
+        # Per-run artifact manifests served by /api/artifacts
+        self.artifacts = ArtifactStore(self.state_dir / "runs")
+        
+        # Cached deep research results, keyed by normalized query + data version
+        self.report_cache = None
+        if REPORT_CACHE_ENABLED:
+            self.report_cache = ReportCache(
+                db_path=str(self.state_dir / "report_cache.db"),
+                data_version=os.getenv("REPORT_CACHE_DATA_VERSION") or compute_data_version(
+                    [self.base_dir / "Internal_DB", Path(__file__).parent / "mock_data_api.py"]
+                ),
+                ttl_seconds=REPORT_CACHE_TTL_SECONDS,
+                max_entries=REPORT_CACHE_MAX_ENTRIES
+            )
+        
+        # Buffered per-run execution logs (logs/runs/<run_id>.md)
+        self.run_log = get_run_log()
+        
+        # Charts produced per run, encoded once per content hash
+        self.images = ImageIndex()
+        
+        # Identical concurrent deep runs share one execution
+        self.flights = SingleFlight()
+        
+        # Runs stopped because every client disconnected
+        self.runs_cancelled = 0
+        
+        # Deep runs executing in this process (cannot be resumed concurrently).
+        # Other workers see them through the heartbeat markers of the artifact store.
+        self._active_runs: set[str] = set()
+        self._resume_jobs: Dict[str, Job] = {}
+        
+        # Times tool, subagent and LLM calls; passed as a callback in every run config
+        self.metrics_callback = MetricsCallbackHandler()
+        REGISTRY.register_collector(self._collect_metrics)
+        
+        # Per-run span traces served by /api/runs/{run_id}/trace
+        self.spans = get_span_exporter()
+        
+        # Deep and lite runs are admitted through separate pools (lite has priority)
+        self.admission = AdmissionController(
+            deep=AdmissionPool("deep", AGENT_DEEP_CONCURRENCY, AGENT_DEEP_MAX_QUEUED, AGENT_DEEP_QUEUE_TIMEOUT),
+            lite=AdmissionPool("lite", AGENT_LITE_CONCURRENCY, AGENT_LITE_MAX_QUEUED, AGENT_LITE_QUEUE_TIMEOUT)
+        )
+        
+        # Worker pool sized so every admitted run gets a thread off the event loop
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.admission.max_concurrency,
+            thread_name_prefix="agent-worker"
+        )
+        
+        # Queue of background deep research runs
+        self.jobs = JobScheduler(
+            max_concurrency=JOB_MAX_CONCURRENCY,
+            max_queued=JOB_MAX_QUEUED
+        )
+        
+        # Queue of document ingestions, kept apart so uploads never delay deep jobs
+        self.ingest_jobs = JobScheduler(
+            max_concurrency=INGEST_MAX_CONCURRENCY,
+            max_queued=INGEST_MAX_QUEUED
+        )
         
         logger.info(f"RouteLayer initialized. Output directory: {self.output_dir}")
 
@@ -116,70 +339,81 @@ class RouteLayer:
         Returns:
             tuple: (session_id, is_first_query)
         """
-        if session_id and session_id in self.sessions:
-            # Existing session
-            self.sessions[session_id] += 1
-            is_first = False
-        else:
-            # New session
-            session_id = session_id or str(uuid.uuid4())
-            self.sessions[session_id] = 1
-            is_first = True
+        session_id = session_id or str(uuid.uuid4())
+        
+        # A new (or expired) session starts again at query #1
+        is_first = self.sessions.increment(session_id) == 1
         
         return session_id, is_first
 
-    def route(
-        self, 
-        query: str, 
+    def _peek_target(self, agent_type: Optional[str], session_id: Optional[str]) -> Optional[str]:
+        """
+        Agent a query will be routed to, without counting it against the session.
+        
+        Returns None for an invalid agent_type (reported by _begin_route).
+        """
+        if agent_type:
+            target_agent = agent_type.lower()
+            return target_agent if target_agent in ("deep", "lite") else None
+        return "lite" if session_id and session_id in self.sessions else "deep"
+
+    def _begin_route(
+        self,
+        query: str,
         agent_type: Optional[str] = None,
         session_id: Optional[str] = None
-    ) -> Generator[Dict[str, Any], None, None]:
+    ) -> tuple[List[Dict[str, Any]], Optional[str], str]:
         """
-        Route query to appropriate agent with streaming support.
+        Resolve the session and target agent for a query.
         
-        Args:
-            query: The user's research question
-            agent_type: Optional override ('deep' or 'lite')
-            session_id: Session identifier for tracking conversation state
-            
-        Yields:
-            Dict containing status updates, steps, or final results
+        This is cheap and never calls an agent, so it is safe to run on the event loop.
+        
+        Returns:
+            tuple: (preamble events, target agent or None if routing failed, session_id)
         """
         # Session management
         session_id, is_first_query = self.get_or_create_session(session_id)
+        query_count = self.sessions.get(session_id)
         
         # Determine target agent
         if agent_type:
             target_agent = agent_type.lower()
             if target_agent not in ['deep', 'lite']:
-                yield {
+                return [{
                     "type": "error",
                     "content": f"Invalid agent_type '{agent_type}'. Must be 'deep' or 'lite'."
-                }
-                return
+                }], None, session_id
         else:
             # Default behavior: first query -> deep, subsequent -> lite
             target_agent = "deep" if is_first_query else "lite"
 
         logger.info(
-            f"Session {session_id[:8]}... | Query #{self.sessions[session_id]} | "
+            f"Session {session_id[:8]}... | Query #{query_count} | "
             f"Agent: {target_agent} | Query: '{query[:50]}...'"
         )
         
-        yield {
+        return [{
             "type": "session_info",
             "data": {
                 "session_id": session_id,
-                "query_count": self.sessions[session_id],
+                "query_count": query_count,
                 "agent": target_agent,
                 "is_first_query": is_first_query
             }
-        }
+        }], target_agent, session_id
 
-        # Route to appropriate agent
+    def _run_agent(
+        self,
+        target_agent: str,
+        query: str,
+        session_id: str,
+        inline_artifacts: bool = False,
+        force_refresh: bool = False
+    ) -> Generator[Dict[str, Any], None, None]:
+        """Run the selected agent, converting unexpected failures into error events."""
         try:
             if target_agent == "deep":
-                yield from self._run_deep_agent(query, session_id)
+                yield from self._run_deep_cached(query, session_id, inline_artifacts, force_refresh)
             else:
                 yield from self._run_lite_agent(query, session_id)
         except Exception as e:
@@ -190,196 +424,835 @@ class RouteLayer:
                 "session_id": session_id
             }
 
-    def _run_deep_agent(self, query: str, session_id: str) -> Generator[Dict[str, Any], None, None]:
+    def route(
+        self, 
+        query: str, 
+        agent_type: Optional[str] = None,
+        session_id: Optional[str] = None,
+        inline_artifacts: bool = False,
+        force_refresh: bool = False
+    ) -> Generator[Dict[str, Any], None, None]:
+        """
+        Route query to appropriate agent with streaming support.
+        
+        Args:
+            query: The user's research question
+            agent_type: Optional override ('deep' or 'lite')
+            session_id: Session identifier for tracking conversation state
+            inline_artifacts: Embed report and images as base64 in the result
+            force_refresh: Bypass the deep research result cache
+            
+        Yields:
+            Dict containing status updates, steps, or final results
+        """
+        timer = RouteTimer()
+        try:
+            events, target_agent, session_id = self._begin_route(query, agent_type, session_id)
+            timer.agent = target_agent or "unknown"
+            for event in events:
+                timer.observe(event)
+                yield event
+            
+            if target_agent is None:
+                return
+            
+            for event in self._run_agent(target_agent, query, session_id, inline_artifacts, force_refresh):
+                timer.observe(event)
+                yield event
+        except GeneratorExit:
+            timer.outcome = "cancelled"
+            raise
+        finally:
+            timer.finish()
+
+    async def aroute(
+        self,
+        query: str,
+        agent_type: Optional[str] = None,
+        session_id: Optional[str] = None,
+        inline_artifacts: bool = False,
+        force_refresh: bool = False
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Async variant of route() for use inside FastAPI handlers.
+        
+        The agent run executes in the bounded worker pool and its events are
+        handed back to the event loop through an asyncio.Queue, so a long deep
+        run never stalls other requests. Identical deep queries that arrive
+        while one is already running subscribe to that run instead of
+        starting another.
+        """
+        timer = RouteTimer()
+        slot: Optional[Slot] = None
+        slot_handed_over = False
+        try:
+            # Admit the run before the query counts against its session, so a
+            # rejected first query is still routed to the deep agent on retry.
+            # Session backends may touch disk, so resolve the route off the loop.
+            peeked_agent = await asyncio.to_thread(self._peek_target, agent_type, session_id)
+            flight_key = f"deep:{int(inline_artifacts)}:{normalize_query(query)}"
+            if peeked_agent is not None:
+                timer.agent = peeked_agent
+                # Joining an identical in-flight deep run costs no slot
+                if not (peeked_agent == "deep" and flight_key in self.flights):
+                    slot = await self.admission.admit(peeked_agent)
+            
+            events, target_agent, session_id = await asyncio.to_thread(
+                self._begin_route, query, peeked_agent or agent_type, session_id
+            )
+            timer.agent = target_agent or "unknown"
+            for event in events:
+                timer.observe(event)
+                yield event
+            
+            if target_agent is None:
+                return
+            
+            async def make_stream():
+                # The run owns the slot from here on, even if its clients leave:
+                # it is freed when the worker finishes, not when the stream closes
+                nonlocal slot, slot_handed_over
+                slot_handed_over = True
+                if slot is None:
+                    # The deep run we meant to join finished while the session was resolved
+                    slot = await self.admission.admit(target_agent)
+                async with aclosing(self._iterate_in_executor(
+                    lambda: self._run_agent(target_agent, query, session_id, inline_artifacts, force_refresh),
+                    on_done=slot.release
+                )) as events:
+                    async for event in events:
+                        yield event
+            
+            if target_agent != "deep":
+                async with aclosing(make_stream()) as events:
+                    async for event in events:
+                        timer.observe(event)
+                        yield event
+                return
+            
+            # When the result will be cached, a run abandoned by its clients is
+            # finished in the background so the next identical query is a cache hit.
+            async with aclosing(self.flights.stream(
+                flight_key,
+                make_stream,
+                keep_alive=self.report_cache is not None
+            )) as events:
+                async for event in events:
+                    event = await self._for_session(event, session_id)
+                    timer.observe(event)
+                    yield event
+        except Overloaded:
+            timer.outcome = "rejected"
+            raise
+        except (GeneratorExit, asyncio.CancelledError):
+            timer.outcome = "cancelled"
+            raise
+        finally:
+            if slot is not None and not slot_handed_over:
+                # Rejected route, or joined a deep run that started meanwhile
+                slot.release()
+            timer.finish()
+
+    async def _for_session(self, event: Dict[str, Any], session_id: str) -> Dict[str, Any]:
+        """
+        Address an event from a (possibly shared) deep run to this request's session.
+        
+        Coalesced requests receive the leader's events, so session IDs are
+        rewritten and the saved report is linked to the follower's session too.
+        """
+        if event.get("session_id") not in (None, session_id):
+            event = {**event, "session_id": session_id}
+        
+        if event.get("type") == "result" and event["data"].get("session_id") != session_id:
+            data = {**event["data"], "session_id": session_id}
+            if data.get("file_path"):
+                await asyncio.to_thread(self.sessions.set_report, session_id, data["file_path"])
+            event = {**event, "data": data}
+        
+        return event
+
+    def submit_deep_job(
+        self,
+        query: str,
+        session_id: Optional[str] = None,
+        inline_artifacts: bool = False,
+        force_refresh: bool = False
+    ) -> Job:
+        """
+        Queue a deep research run as a background job.
+        
+        The session is resolved immediately so the caller can use it for
+        follow-up queries while the job is still waiting.
+        
+        Raises:
+            JobQueueFull: If the job queue is at capacity
+        """
+        events, _, session_id = self._begin_route(query, "deep", session_id)
+        
+        def run(job: Job) -> Dict[str, Any]:
+            return self._consume_deep_events(
+                job, self._run_agent("deep", query, session_id, inline_artifacts, force_refresh)
+            )
+        
+        return self.jobs.submit("deep", run, params={"query": query, "session_id": session_id})
+
+    def submit_resume_job(self, run_id: str, inline_artifacts: bool = False) -> Job:
+        """
+        Queue the continuation of an interrupted deep run as a background job.
+        
+        The run picks up from its last checkpoint, so subagent and tool calls
+        that already finished are not repeated.
+        
+        Raises:
+            JobQueueFull: If the job queue is at capacity
+        """
+        manifest = self.artifacts.load(run_id) or {}
+        query = manifest.get("query", "")
+        # Resuming counts as a query of the run's session (a new one if the manifest has none)
+        session_id, _ = self.get_or_create_session(manifest.get("session_id"))
+        
+        def run(job: Job) -> Dict[str, Any]:
+            result = self._consume_deep_events(
+                job, self._run_deep_agent(query, session_id, inline_artifacts, resume_run_id=run_id)
+            )
+            if self.report_cache is not None:
+                try:
+                    self.report_cache.put(query, self._cacheable_result(result))
+                except Exception as e:
+                    logger.warning(f"Could not cache report: {e}")
+            return result
+        
+        job = self.jobs.submit(
+            "deep_resume", run, params={"query": query, "session_id": session_id, "run_id": run_id}
+        )
+        self._resume_jobs[run_id] = job
+        return job
+
+    @staticmethod
+    def _consume_deep_events(job: Job, events: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """Drive a deep run inside a job, reporting progress; returns the result payload."""
+        result = None
+        steps = 0
+        for event in events:
+            event_type = event.get("type")
+            if event_type == "step":
+                steps += 1
+                job.update_progress(steps=steps, last_sender=event["data"].get("sender"))
+            elif event_type == "status":
+                job.update_progress(message=event.get("content"))
+            elif event_type == "result":
+                result = event["data"]
+            elif event_type == "error":
+                raise RuntimeError(event.get("content", "Unknown error occurred"))
+        if result is None:
+            raise RuntimeError("Agent completed but produced no result")
+        return result
+
+    def resume_blocker(self, run_id: str) -> Optional[Tuple[int, str]]:
+        """
+        Why a run cannot be resumed, as (HTTP status, reason), or None if it can.
+        """
+        if not CHECKPOINT_ENABLED:
+            return 409, "Checkpointing is disabled (DEEP_CHECKPOINT_ENABLED=0)"
+        manifest = self.artifacts.load(run_id)
+        if manifest is None:
+            return 404, f"Run {run_id} not found"
+        # Manifests written before status tracking only exist for finished runs
+        status = manifest.get("status", "completed")
+        if status == "completed":
+            return 409, f"Run {run_id} already completed"
+        if self._is_running(run_id):
+            return 409, f"Run {run_id} is still running"
+        if not has_checkpoint(run_id):
+            return 409, f"Run {run_id} has no checkpoint to resume from"
+        return None
+
+    def _is_running(self, run_id: str) -> bool:
+        """Whether a deep run is executing or queued to resume, in this or another worker."""
+        pending = self._resume_jobs.get(run_id)
+        if run_id in self._active_runs or (pending is not None and not pending.is_finished):
+            return True
+        return self.artifacts.is_running(run_id, RUN_HEARTBEAT_TIMEOUT)
+
+    def _start_active(self, run_id: str):
+        self._active_runs.add(run_id)
+        try:
+            self.artifacts.heartbeat(run_id, start=True)
+        except Exception as e:
+            logger.warning(f"Could not mark run {run_id} as running: {e}")
+
+    def _end_active(self, run_id: str):
+        if run_id not in self._active_runs:
+            # Already ended; the marker may belong to another worker by now
+            return
+        self._active_runs.discard(run_id)
+        try:
+            self.artifacts.end_heartbeat(run_id)
+        except Exception as e:
+            logger.warning(f"Could not clear running marker of run {run_id}: {e}")
+
+    def heartbeat_runs(self):
+        """Refresh the running markers of the deep runs executing in this process."""
+        for run_id in list(self._active_runs):
+            try:
+                self.artifacts.heartbeat(run_id)
+            except Exception as e:
+                logger.warning(f"Could not refresh running marker of run {run_id}: {e}")
+
+    def _invalidate_reports(self):
+        """Stop serving cached reports built before new documents reached the knowledge base."""
+        if self.report_cache is not None:
+            self.report_cache.invalidate_all()
+
+    def submit_ingest_job(self, file_path: str, filename: str) -> Job:
+        """
+        Queue ingestion of an uploaded file as a background job.
+        
+        The job owns `file_path` and deletes it when it finishes.
+        
+        Raises:
+            JobQueueFull: If the ingestion queue is at capacity
+        """
+        def run(job: Job) -> Dict[str, Any]:
+            try:
+                result = ingest_file(
+                    file_path,
+                    progress=lambda stage, **details: job.update_progress(stage=stage, **details),
+                    source_name=filename
+                )
+            finally:
+                try:
+                    os.unlink(file_path)
+                except OSError as e:
+                    logger.warning(f"Failed to delete temp file {file_path}: {e}")
+            self._invalidate_reports()
+            job.update_progress(stage="done")
+            return {
+                "success": True,
+                "message": f"Document '{filename}' successfully ingested into knowledge base",
+                "filename": filename,
+                "documents_loaded": result["documents"],
+                "chunks_created": result["chunks"],
+                "vectors_upserted": result["vectors"],
+                "timings": result["timings"],
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        return self.ingest_jobs.submit("ingest", run, params={"filename": filename})
+
+    def submit_bulk_ingest_job(self, upload_dir: str, files: List[tuple[str, str]]) -> Job:
+        """
+        Queue ingestion of several uploaded files as one background job.
+        
+        Args:
+            upload_dir: Temporary directory holding the uploads; deleted by the job
+            files: (path, original filename) pairs
+        
+        Raises:
+            JobQueueFull: If the ingestion queue is at capacity
+        """
+        def run(job: Job) -> Dict[str, Any]:
+            try:
+                result = ingest_paths(
+                    files,
+                    progress=lambda stage, **details: job.update_progress(stage=stage, **details)
+                )
+            finally:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+            if result["files_ingested"]:
+                self._invalidate_reports()
+            job.update_progress(stage="done")
+            return {
+                **result,
+                "success": True,
+                "message": f"Ingested {result['files_ingested']} of {result['files']} documents into knowledge base",
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        return self.ingest_jobs.submit("ingest_bulk", run, params={"filenames": [name for _, name in files]})
+
+    async def _iterate_in_executor(
+        self,
+        make_events: Callable[[], Generator[Dict[str, Any], None, None]],
+        on_done: Optional[Callable[[], None]] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Drive a synchronous event generator on the worker pool and yield its events.
+        
+        If the consumer stops early (client disconnected), the worker closes the
+        generator at its next yield, i.e. between graph steps, which stops the
+        agent run and frees the worker slot. The run ends with a 'cancelled' event.
+        
+        `on_done` is called on the event loop once the worker has finished,
+        however early the consumer left.
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        cancel = threading.Event()
+        
+        def publish(item: Any):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                # Event loop already closed (server shutting down)
+                pass
+        
+        def pump():
+            if cancel.is_set():
+                # Consumer left before the run got a worker
+                publish(done)
+                return
+            events = make_events()
+            try:
+                for event in events:
+                    publish(event)
+                    if cancel.is_set():
+                        events.close()
+                        logger.info("Run cancelled after client disconnect")
+                        publish({
+                            "type": "cancelled",
+                            "content": "Run cancelled: client disconnected",
+                            "timestamp": datetime.now().isoformat()
+                        })
+                        loop.call_soon_threadsafe(self._count_cancelled)
+                        break
+            except Exception as e:
+                logger.error(f"Worker error: {e}", exc_info=True)
+                publish({
+                    "type": "error",
+                    "content": str(e),
+                    "timestamp": datetime.now().isoformat()
+                })
+            finally:
+                publish(done)
+        
+        def finish(_):
+            try:
+                loop.call_soon_threadsafe(on_done)
+            except RuntimeError:
+                # Event loop already closed: nothing else can be waiting on it
+                on_done()
+        
+        try:
+            work = self.executor.submit(pump)
+        except BaseException:
+            if on_done is not None:
+                on_done()
+            raise
+        if on_done is not None:
+            work.add_done_callback(finish)
+        future = asyncio.wrap_future(work, loop=loop)
+        
+        finished = False
+        try:
+            while True:
+                event = await queue.get()
+                if event is done:
+                    finished = True
+                    break
+                yield event
+        finally:
+            if not finished:
+                cancel.set()
+        
+        await future
+
+    def _count_cancelled(self):
+        self.runs_cancelled += 1
+
+    def _run_deep_cached(
+        self,
+        query: str,
+        session_id: str,
+        inline_artifacts: bool = False,
+        force_refresh: bool = False
+    ) -> Generator[Dict[str, Any], None, None]:
+        """
+        Serve a deep research query from the report cache, or run it and cache the result.
+        """
+        if self.report_cache is None:
+            yield from self._run_deep_agent(query, session_id, inline_artifacts)
+            return
+        
+        cached = None if force_refresh else self.report_cache.get(query)
+        if cached is not None:
+            logger.info(f"Report cache hit for session {session_id[:8]}...")
+            yield {
+                "type": "status",
+                "content": "♻️ Serving cached research report",
+                "timestamp": datetime.now().isoformat()
+            }
+            if cached.get("file_path"):
+                self.sessions.set_report(session_id, cached["file_path"])
+            if inline_artifacts:
+                self._inline_artifacts(cached)
+            yield {
+                "type": "result",
+                "data": {
+                    **cached,
+                    "session_id": session_id,
+                    "timestamp": datetime.now().isoformat(),
+                    "cached": True
+                }
+            }
+            return
+        
+        with closing(self._run_deep_agent(query, session_id, inline_artifacts)) as events:
+            for event in events:
+                if event.get("type") == "result":
+                    try:
+                        self.report_cache.put(query, self._cacheable_result(event["data"]))
+                    except Exception as e:
+                        logger.warning(f"Could not cache report: {e}")
+                yield event
+
+    @staticmethod
+    def _cacheable_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a deep result without inline base64 payloads (served by URL instead)."""
+        cacheable = {k: v for k, v in result.items() if k not in ("report_base64", "session_id", "timestamp")}
+        cacheable["images"] = [
+            {k: v for k, v in image.items() if k != "base64"}
+            for image in result.get("images", [])
+        ]
+        return cacheable
+
+    def _inline_artifacts(self, result: Dict[str, Any]):
+        """Add base64 report and image data to a cached result in place."""
+        result["report_base64"] = base64.b64encode(result.get("text", "").encode("utf-8")).decode("utf-8")
+        run_id = result.get("run_id")
+        for image in result.get("images", []):
+            path = self.artifacts.resolve(run_id, image["filename"]) if run_id else None
+            if path is not None:
+                image["base64"] = self.images.encode(path)["base64"]
+
+    def _run_deep_agent(
+        self,
+        query: str,
+        session_id: str,
+        inline_artifacts: bool = False,
+        resume_run_id: Optional[str] = None
+    ) -> Generator[Dict[str, Any], None, None]:
         """
         Execute Deep Research Agent with full streaming support.
         
+        Args:
+            resume_run_id: Continue this run from its last checkpoint instead
+                of starting a new one
+        
         Yields:
             - Status updates
             - Execution steps with tool calls
-            - Final result with markdown report and base64 images
+            - Final result with the markdown report and artifact URLs
+              (plus base64 report and images when inline_artifacts is set)
         """
         yield {
             "type": "status",
-            "content": "🔬 Initiating Deep Research Agent...",
+            "content": (
+                f"⏯️ Resuming Deep Research run {resume_run_id[:8]}..." if resume_run_id
+                else "🔬 Initiating Deep Research Agent..."
+            ),
             "timestamp": datetime.now().isoformat()
         }
 
-        thread_id = str(uuid.uuid4())
-        config = {"configurable": {"thread_id": thread_id}}
-        
-        # Setup steps logging file
-        steps_file = self.base_dir / "steps.md"
+        thread_id = resume_run_id or str(uuid.uuid4())
+        callbacks = [self.metrics_callback]
+        if TRACE_ENABLED:
+            callbacks.append(TraceCallbackHandler(thread_id, self.spans, name="deep-agent"))
+        config = {"configurable": {"thread_id": thread_id}, "callbacks": callbacks}
         
         def log_step(message: str):
-            """Log message to both terminal and steps.md file."""
+            """Queue a line for this run's log file (written in the background)."""
             msg_str = str(message)
-            print(msg_str)  # Terminal output
-            try:
-                with open(steps_file, "a", encoding='utf-8') as f:
-                    f.write(msg_str + "\n")
-            except Exception as e:
-                logger.warning(f"Could not write to steps.md: {e}")
+            logger.debug(msg_str)
+            self.run_log.write(thread_id, msg_str)
         
-        # Initialize steps.md for this session
-        log_step(f"\n--- Session Start: {thread_id[:16]} ---")
+        # Initialize the run log
+        log_step(f"\n--- Session {'Resumed' if resume_run_id else 'Start'}: {thread_id[:16]} ---")
         log_step(f"Query: {query}")
         log_step(f"Timestamp: {datetime.now().isoformat()}")
         log_step("-" * 80)
         
-        final_state = None
+        # Record the run up front so it can be resumed if this process dies
+        self._mark_run(thread_id, "running", session_id=session_id, query=query)
+        
+        last_msg = None
         step_count = 0
         
+        # Charts created by tools during the stream are attributed to this run
+        run_token = start_run(thread_id)
+        self._start_active(thread_id)
+        
         try:
-            # Stream execution steps
-            for state in deep_agent.stream(
-                {"messages": [{"role": "user", "content": query}]}, 
-                config=config, 
-                stream_mode="values"
-            ):
-                final_state = state
+            # Stream execution steps as message deltas (one step per new message).
+            # A resumed run passes no input and continues from its checkpoint.
+            inputs = None if resume_run_id else {"messages": [{"role": "user", "content": query}]}
+            for last_msg in iter_message_deltas(get_deep_agent(), inputs, config=config):
                 step_count += 1
                 
-                if "messages" in state and state["messages"]:
-                    last_msg = state["messages"][-1]
-                    
-                    # Get message details
-                    sender = getattr(last_msg, "name", "DeepAgent")
-                    msg_type = getattr(last_msg, "type", "assistant")
-                    content = getattr(last_msg, "content", "")
-                    
-                    # Log to terminal and steps.md
-                    log_step(f"\n[Step {step_count}] Role: {msg_type}")
-                    if sender:
-                        log_step(f"Sender: {sender}")
-                    
-                    if content:
-                        content_preview = str(content)[:500] + "..." if len(str(content)) > 500 else str(content)
-                        log_step(f"Content: {content_preview}")
-                    
-                    # Log tool calls
-                    if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
-                        log_step(f"Tool Calls ({len(last_msg.tool_calls)}):")
-                        for tc in last_msg.tool_calls:
-                            log_step(f"  - {tc.get('name', 'unknown')}: {tc.get('args', {})}")
-                    
-                    # Build step info for streaming
-                    step_info = {
-                        "step_number": step_count,
-                        "role": msg_type,
-                        "content": str(content) if content else "",
-                        "sender": sender or "DeepAgent",
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    
-                    # Include tool calls if present
-                    if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
-                        step_info["tool_calls"] = [
-                            {
-                                "name": tc.get("name", ""),
-                                "args": tc.get("args", {})
-                            }
-                            for tc in last_msg.tool_calls
-                        ]
-                    
-                    yield {"type": "step", "data": step_info}
+                # Get message details
+                sender = getattr(last_msg, "name", "DeepAgent")
+                msg_type = getattr(last_msg, "type", "assistant")
+                content = getattr(last_msg, "content", "")
+                
+                # Log to terminal and steps.md
+                log_step(f"\n[Step {step_count}] Role: {msg_type}")
+                if sender:
+                    log_step(f"Sender: {sender}")
+                
+                if content:
+                    content_preview = str(content)[:500] + "..." if len(str(content)) > 500 else str(content)
+                    log_step(f"Content: {content_preview}")
+                
+                # Log tool calls
+                if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
+                    log_step(f"Tool Calls ({len(last_msg.tool_calls)}):")
+                    for tc in last_msg.tool_calls:
+                        log_step(f"  - {tc.get('name', 'unknown')}: {tc.get('args', {})}")
+                
+                # Build step info for streaming
+                step_info = {
+                    "step_number": step_count,
+                    "role": msg_type,
+                    "content": str(content) if content else "",
+                    "sender": sender or "DeepAgent",
+                    "timestamp": datetime.now().isoformat()
+                }
+                
+                # Include tool calls if present
+                if hasattr(last_msg, 'tool_calls') and last_msg.tool_calls:
+                    step_info["tool_calls"] = [
+                        {
+                            "name": tc.get("name", ""),
+                            "args": tc.get("args", {})
+                        }
+                        for tc in last_msg.tool_calls
+                    ]
+                
+                yield {"type": "step", "data": step_info}
 
+        except GeneratorExit:
+            # Consumer closed the stream (client disconnected): stop between steps
+            log_step(f"\n⏹️ CANCELLED after {step_count} steps: client disconnected")
+            self.run_log.close(thread_id)
+            discard_run(thread_id)
+            self._mark_run(thread_id, "cancelled")
+            raise
         except Exception as e:
             error_msg = f"Deep Agent execution error: {e}"
             logger.error(error_msg, exc_info=True)
             log_step(f"\n❌ ERROR: {error_msg}")
+            self.run_log.close(thread_id)
+            discard_run(thread_id)
+            self._mark_run(thread_id, "failed", error=str(e))
+            # The run is over before the error event is consumed, so it can be resumed right away
+            self._end_active(thread_id)
             yield {
                 "type": "error",
                 "content": f"Deep Agent failed: {str(e)}",
-                "session_id": session_id
+                "session_id": session_id,
+                "run_id": thread_id
             }
             return
+        finally:
+            end_run(run_token)
+            self._end_active(thread_id)
 
-        # Process final output
-        if not final_state or "messages" not in final_state:
-            log_step("\n❌ Deep Agent produced no output.")
-            yield {
-                "type": "error",
-                "content": "Deep Agent produced no output.",
-                "session_id": session_id
-            }
-            return
-        
-        result_msg = final_state["messages"][-1]
-        report_content = str(result_msg.content)
-        
-        log_step(f"\n{'='*80}")
-        log_step(f"✅ Execution Complete - {step_count} steps")
-        log_step(f"{'='*80}")
-        
-        # Save markdown report
-        report_filename = f"deep_report_{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
-        report_path = self.output_dir / report_filename
-        
+        # A client can also disconnect while the report and images are being
+        # saved: the run must not be left marked running, nor its charts and log open
+        finished = False
         try:
-            report_path.write_text(report_content, encoding="utf-8")
-            log_step(f"📄 Report saved to: {report_path}")
+            if last_msg is None and resume_run_id:
+                # Interrupted after the final step but before the report was saved
+                last_msg = self._checkpointed_final_message(config)
+
+            # Process final output
+            if last_msg is None:
+                self._mark_run(thread_id, "failed", error="no output")
+                discard_run(thread_id)
+                log_step("\n❌ Deep Agent produced no output.")
+                self.run_log.close(thread_id)
+                finished = True
+                yield {
+                    "type": "error",
+                    "content": "Deep Agent produced no output.",
+                    "session_id": session_id
+                }
+                return
+            
+            report_content = str(last_msg.content)
+            
+            log_step(f"\n{'='*80}")
+            log_step(f"✅ Execution Complete - {step_count} steps")
+            log_step(f"{'='*80}")
+            
+            # Save markdown report
+            report_filename = f"deep_report_{session_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+            report_path = self.output_dir / report_filename
+            
+            report_saved = False
+            try:
+                report_path.write_text(report_content, encoding="utf-8")
+                report_saved = True
+                self.sessions.set_report(session_id, str(report_path))
+                log_step(f"📄 Report saved to: {report_path}")
+                self._index_reports()
+                yield {
+                    "type": "status",
+                    "content": f"📄 Report saved to {report_filename}",
+                    "timestamp": datetime.now().isoformat()
+                }
+            except Exception as e:
+                logger.error(f"Failed to save report: {e}")
+                log_step(f"⚠️ Could not save report: {e}")
+                yield {
+                    "type": "warning",
+                    "content": f"Could not save report file: {str(e)}"
+                }
+            
+            # Collect images produced by this run
             yield {
                 "type": "status",
-                "content": f"📄 Report saved to {report_filename}",
+                "content": "🖼️ Processing visualizations...",
                 "timestamp": datetime.now().isoformat()
             }
-        except Exception as e:
-            logger.error(f"Failed to save report: {e}")
-            log_step(f"⚠️ Could not save report: {e}")
-            yield {
-                "type": "warning",
-                "content": f"Could not save report file: {str(e)}"
-            }
-        
-        # Collect and encode images
-        yield {
-            "type": "status",
-            "content": "🖼️ Processing visualizations...",
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        images = self._collect_images()
-        
-        if images:
-            log_step(f"🖼️ Found {len(images)} visualization(s)")
+            
+            images = self._collect_images(thread_id, inline=inline_artifacts)
+            
+            if images:
+                log_step(f"🖼️ Found {len(images)} visualization(s)")
+                yield {
+                    "type": "status",
+                    "content": f"✅ Found {len(images)} visualization(s)",
+                    "timestamp": datetime.now().isoformat()
+                }
+            
+            # Register artifacts so they can be downloaded by URL
+            artifact_paths = {image["filename"]: image.pop("path") for image in images}
+            if report_saved:
+                artifact_paths[report_filename] = str(report_path)
+            try:
+                self.artifacts.save(thread_id, artifact_paths, session_id=session_id, query=query, status="completed")
+            except Exception as e:
+                logger.error(f"Failed to save artifact manifest: {e}")
+            finished = True
+            # A completed run is never resumed: its checkpoints are dead weight
+            self._drop_checkpoints([thread_id])
+            
+            for image in images:
+                image["url"] = artifact_url(thread_id, image["filename"])
+            
+            # Inline base64 report only on request
+            report_base64 = None
+            if inline_artifacts:
+                report_base64 = base64.b64encode(report_content.encode("utf-8")).decode("utf-8")
+
+            log_step(f"\n--- Session End: {thread_id[:16]} ---\n")
+            self.run_log.close(thread_id)
+            
+            # Final result
             yield {
-                "type": "status",
-                "content": f"✅ Found {len(images)} visualization(s)",
-                "timestamp": datetime.now().isoformat()
+                "type": "result",
+                "data": {
+                    "agent": "deep",
+                    "text": report_content,
+                    "file_path": str(report_path),
+                    "report_base64": report_base64,
+                    "report_filename": report_filename,
+                    "report_url": artifact_url(thread_id, report_filename) if report_saved else None,
+                    "report_size_bytes": len(report_content.encode("utf-8")),
+                    "images": images,
+                    "run_id": thread_id,
+                    "session_id": session_id,
+                    "timestamp": datetime.now().isoformat(),
+                    "total_steps": step_count
+                }
             }
-        
-        # Encode report content to base64
-        report_base64 = None
+        except GeneratorExit:
+            if not finished:
+                log_step(f"\n⏹️ CANCELLED after {step_count} steps: client disconnected")
+                self.run_log.close(thread_id)
+                discard_run(thread_id)
+                self._mark_run(thread_id, "cancelled")
+            raise
+
+    def _index_reports(self):
+        """Add newly saved reports to the lite agent's section index."""
         try:
-            with open(report_path, "rb") as f:
-                report_base64 = base64.b64encode(f.read()).decode('utf-8')
+            index_reports()
         except Exception as e:
-            logger.error(f"Failed to encode report to base64: {e}")
+            logger.warning(f"Could not index reports: {e}")
 
-        log_step(f"\n--- Session End: {thread_id[:16]} ---\n")
-        
-        # Final result
-        yield {
-            "type": "result",
-            "data": {
-                "agent": "deep",
-                "text": report_content,
-                "file_path": str(report_path),
-                "report_base64": report_base64,
-                "report_filename": report_filename,
-                "images": images,
-                "session_id": session_id,
-                "timestamp": datetime.now().isoformat(),
-                "total_steps": step_count
-            }
-        }
+    def _drop_checkpoints(self, run_ids: List[str]):
+        if not CHECKPOINT_ENABLED or not run_ids:
+            return
+        try:
+            delete_checkpoints(run_ids)
+        except Exception as e:
+            logger.warning(f"Could not delete checkpoints: {e}")
+
+    def prune_checkpoints(self) -> int:
+        """
+        Delete checkpoints that are no longer needed for resuming.
+
+        Those are the checkpoints of completed runs (normally deleted as the
+        run completes), of runs without a manifest, which cannot be resumed
+        through the API, and of runs left unfinished for longer than
+        DEEP_CHECKPOINT_RETENTION_HOURS.
+
+        Returns:
+            Number of runs whose checkpoints were deleted
+        """
+        if not CHECKPOINT_ENABLED:
+            return 0
+        now = datetime.now()
+        stale = []
+        for run_id in checkpointed_threads():
+            if self._is_running(run_id):
+                continue
+            manifest = self.artifacts.load(run_id)
+            if manifest is None or manifest.get("status", "completed") == "completed":
+                stale.append(run_id)
+                continue
+            if CHECKPOINT_RETENTION_HOURS <= 0:
+                continue
+            try:
+                updated = datetime.fromisoformat(manifest["updated_at"])
+            except (KeyError, TypeError, ValueError):
+                updated = datetime.fromtimestamp(manifest.get("created_at", 0))
+            if (now - updated).total_seconds() > CHECKPOINT_RETENTION_HOURS * 3600:
+                stale.append(run_id)
+        self._drop_checkpoints(stale)
+        for run_id in stale:
+            # Left behind by a worker that died mid-run
+            self.artifacts.end_heartbeat(run_id)
+        if stale:
+            logger.info(f"Deleted checkpoints of {len(stale)} deep run(s)")
+        return len(stale)
+
+    def _mark_run(self, run_id: str, status: str, **metadata):
+        """Record a deep run's status (and resume metadata) in its manifest."""
+        try:
+            self.artifacts.save(run_id, {}, status=status, updated_at=datetime.now().isoformat(), **metadata)
+        except Exception as e:
+            logger.warning(f"Could not record status of run {run_id}: {e}")
+
+    @staticmethod
+    def _checkpointed_final_message(config: Dict[str, Any]):
+        """Last message of a finished checkpointed run, or None if it did not finish."""
+        state = get_deep_agent().get_state(config)
+        if state.next:
+            return None
+        messages = (state.values or {}).get("messages") or []
+        return messages[-1] if messages else None
 
     def _run_lite_agent(self, query: str, session_id: str) -> Generator[Dict[str, Any], None, None]:
         """
         Execute Lite Agent for quick responses.
         
         Uses markdown knowledge base + internet search for fast answers.
+        The answer is streamed as `token` events (kind `text`, plus
+        `tool_start`/`tool_end` around searches) before the final result.
         """
         yield {
             "type": "status",
@@ -388,8 +1261,24 @@ class RouteLayer:
         }
         
         try:
-            # Execute lite agent (synchronous)
-            answer = run_lite_agent(query)
+            # Stream the lite agent over this session's reports first
+            linked_report = self.sessions.get_report(session_id)
+            answer = ""
+            cached = False
+            for kind, payload in stream_lite_answer(
+                query,
+                config={"callbacks": [self.metrics_callback]},
+                session_id=session_id,
+                session_reports=[linked_report] if linked_report else []
+            ):
+                if kind == "answer":
+                    answer = payload
+                elif kind == "cached":
+                    cached = True
+                elif kind == "text":
+                    yield {"type": "token", "kind": "text", "content": payload}
+                else:
+                    yield {"type": "token", "kind": kind, **payload}
             
             yield {
                 "type": "result",
@@ -398,7 +1287,8 @@ class RouteLayer:
                     "text": answer,
                     "images": [],
                     "session_id": session_id,
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": datetime.now().isoformat(),
+                    "cached": cached
                 }
             }
             
@@ -410,74 +1300,108 @@ class RouteLayer:
                 "session_id": session_id
             }
 
-    def _collect_images(self) -> List[Dict[str, str]]:
+    def warm_up(self) -> bool:
         """
-        Scan visualization directories and convert images to base64.
-        
-        Returns:
-            List of dicts with filename, mime_type, and base64 data
+        Build the deep agent (and its subagents, LLM clients and plotting
+        libraries) ahead of the first query. Failures are logged, not raised:
+        the agent is built again on first use.
         """
-        images = []
-        
-        # Multiple possible paths for visualizations
-        search_paths = [
-            self.output_dir / "visualizations",
-            self.output_dir / "output" / "visualizations"
+        started = datetime.now()
+        try:
+            get_deep_agent()
+        except Exception as e:
+            logger.warning(f"Deep agent warm-up failed: {e}")
+            return False
+        logger.info(f"Deep agent warmed up in {(datetime.now() - started).total_seconds():.1f}s")
+        return True
+
+    def _collect_metrics(self):
+        """Export session, job, cache and run state alongside the latency metrics."""
+        sessions = self.sessions.stats()
+        jobs = self.jobs.stats()
+        flights = self.flights.stats()
+        families = [
+            ("agent_sessions_active", "gauge", "Sessions currently tracked",
+             [("agent_sessions_active", {}, sessions["active"])]),
+            ("agent_sessions_evicted_total", "counter", "Sessions removed by LRU eviction or TTL expiry",
+             [("agent_sessions_evicted_total", {"reason": "lru"}, sessions.get("evicted_lru", 0)),
+              ("agent_sessions_evicted_total", {"reason": "expired"}, sessions.get("expired", 0))]),
+            ("agent_jobs", "gauge", "Background jobs by status",
+             [("agent_jobs", {"status": status}, count)
+              for status, count in jobs.items() if status != "max_concurrency"]),
+            ("agent_deep_runs_in_flight", "gauge", "Deep runs currently executing",
+             [("agent_deep_runs_in_flight", {}, flights["in_flight"])]),
+            ("agent_deep_runs_total", "counter", "Deep run requests by how they were served",
+             [("agent_deep_runs_total", {"mode": mode}, flights[mode])
+              for mode in ("executions", "coalesced", "cancelled", "detached")]),
+            ("agent_admission_active", "gauge", "Agent runs holding an admission slot",
+             [("agent_admission_active", {"pool": name}, pool.active)
+              for name, pool in self.admission.pools.items()]),
+            ("agent_admission_queue_depth", "gauge", "Requests waiting for an admission slot",
+             [("agent_admission_queue_depth", {"pool": name}, pool.queued)
+              for name, pool in self.admission.pools.items()]),
+            ("agent_runs_cancelled_total", "counter", "Runs stopped after the client disconnected",
+             [("agent_runs_cancelled_total", {}, self.runs_cancelled)]),
+            ("agent_run_log_dropped_total", "counter", "Run log lines dropped because the queue was full",
+             [("agent_run_log_dropped_total", {}, self.run_log.stats()["dropped"])]),
         ]
-        
-        processed_files = set()
-        supported_formats = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg']
+        if self.report_cache is not None:
+            cache = self.report_cache.stats()
+            families.append(
+                ("agent_report_cache_lookups_total", "counter", "Report cache lookups by result",
+                 [("agent_report_cache_lookups_total", {"result": "hit"}, cache["hits"]),
+                  ("agent_report_cache_lookups_total", {"result": "miss"}, cache["misses"])])
+            )
+        answers = lite_answer_cache_stats()
+        if answers is not None:
+            families += [
+                ("agent_lite_answer_cache_lookups_total", "counter", "Lite answer cache lookups by result",
+                 [("agent_lite_answer_cache_lookups_total", {"result": "hit"}, answers["hits"]),
+                  ("agent_lite_answer_cache_lookups_total", {"result": "miss"}, answers["misses"])]),
+                ("agent_lite_answer_cache_entries", "gauge", "Lite answers currently cached",
+                 [("agent_lite_answer_cache_entries", {}, answers["entries"])]),
+                ("agent_lite_answer_cache_removed_total", "counter", "Cached lite answers removed by reason",
+                 [("agent_lite_answer_cache_removed_total", {"reason": reason}, answers[reason])
+                  for reason in ("evicted", "expired", "invalidated")]),
+            ]
+        return families
 
-        for viz_path in search_paths:
-            if not viz_path.exists():
-                continue
-            
-            for ext in supported_formats:
-                for filepath in viz_path.glob(ext):
-                    abs_path = filepath.resolve()
-                    
-                    # Skip duplicates
-                    if abs_path in processed_files:
-                        continue
-                    
-                    try:
-                        # Read and encode image
-                        with open(filepath, "rb") as image_file:
-                            image_data = image_file.read()
-                            encoded_string = base64.b64encode(image_data).decode('utf-8')
-                        
-                        # Determine MIME type
-                        ext_lower = filepath.suffix[1:].lower()
-                        mime_type = f"image/{ext_lower}"
-                        if ext_lower == 'svg':
-                            mime_type = "image/svg+xml"
-                        
-                        images.append({
-                            "filename": filepath.name,
-                            "mime_type": mime_type,
-                            "base64": encoded_string,
-                            "size_bytes": len(image_data)
-                        })
-                        
-                        processed_files.add(abs_path)
-                        logger.debug(f"Encoded image: {filepath.name}")
-                        
-                    except Exception as e:
-                        logger.warning(f"Could not process image {filepath}: {e}")
+    def _collect_images(self, run_id: str, inline: bool = False) -> List[Dict[str, Any]]:
+        """
+        Describe the visualizations produced by a single deep run.
+        
+        Only charts recorded for this run are read, and identical content is
+        served from the encoding cache.
         
-        logger.info(f"Collected {len(images)} images")
-        return images
+        Returns:
+            List of dicts with filename, mime_type, size, hash and local path
+            (plus base64 data when inline)
+        """
+        return self.images.collect(run_id, inline=inline)
+
+
+def artifact_url(run_id: str, name: str) -> str:
+    """Relative URL under which an artifact of a run is served."""
+    return f"/api/artifacts/{run_id}/{quote(name)}"
 
 
 # ============================================================================
 # FASTAPI APPLICATION
 # ============================================================================
 
+class CompactJSONResponse(JSONResponse):
+    """JSON response serialized with the fast, compact encoder."""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Pharmaceutical Research Agent API",
     description="Production-ready API for deep research and lite query agents",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=CompactJSONResponse
 )
 
 # Add CORS middleware
@@ -489,10 +1413,82 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Negotiated gzip/brotli for JSON and SSE (events are flushed one by one)
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, min_size=COMPRESSION_MIN_SIZE)
+
 # Initialize router singleton
 router = RouteLayer()
 
 
+async def _sweep_sessions_periodically():
+    """Background task that expires idle sessions."""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        try:
+            await asyncio.to_thread(router.sessions.sweep)
+        except Exception as e:
+            logger.warning(f"Session sweep failed: {e}")
+
+
+@app.on_event("startup")
+async def start_session_sweeper():
+    """Start the periodic session cleanup task."""
+    app.state.session_sweeper = asyncio.create_task(_sweep_sessions_periodically())
+
+
+async def _prune_checkpoints_periodically():
+    """Background task that deletes checkpoints of completed and abandoned deep runs."""
+    while True:
+        try:
+            await asyncio.to_thread(router.prune_checkpoints)
+        except Exception as e:
+            logger.warning(f"Checkpoint pruning failed: {e}")
+        await asyncio.sleep(CHECKPOINT_PRUNE_INTERVAL)
+
+
+@app.on_event("startup")
+async def start_checkpoint_pruner():
+    """Start the periodic checkpoint cleanup task."""
+    if CHECKPOINT_ENABLED:
+        app.state.checkpoint_pruner = asyncio.create_task(_prune_checkpoints_periodically())
+
+
+async def _heartbeat_runs_periodically():
+    """Background task that tells other workers which deep runs are executing here."""
+    while True:
+        await asyncio.sleep(RUN_HEARTBEAT_INTERVAL)
+        try:
+            await asyncio.to_thread(router.heartbeat_runs)
+        except Exception as e:
+            logger.warning(f"Run heartbeat failed: {e}")
+
+
+@app.on_event("startup")
+async def start_run_heartbeat():
+    """Start refreshing the running markers of deep runs."""
+    if CHECKPOINT_ENABLED:
+        app.state.run_heartbeat = asyncio.create_task(_heartbeat_runs_periodically())
+
+
+@app.on_event("startup")
+async def warm_up_agents():
+    """Optionally build the deep agent in the background so startup is not delayed."""
+    if AGENT_WARMUP:
+        app.state.warm_up = asyncio.create_task(asyncio.to_thread(router.warm_up))
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop accepting new agent runs and let in-flight ones finish."""
+    for name in ("session_sweeper", "checkpoint_pruner", "run_heartbeat"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+    router.executor.shutdown(wait=False, cancel_futures=True)
+    router.run_log.flush()
+
+
 @app.get("/")
 async def root():
     """API root - health check and info."""
@@ -504,21 +1500,63 @@ async def root():
             "query": "/api/query",
             "query_stream": "/api/query/stream",
             "ingest": "/api/ingest",
-            "health": "/health"
+            "jobs": "/api/jobs",
+            "artifacts": "/api/artifacts/{run_id}/{name}",
+            "trace": "/api/runs/{run_id}/trace",
+            "health": "/health",
+            "metrics": "/metrics"
         }
     }
 
 
+def _storage_health() -> Dict[str, Any]:
+    """Session and report cache figures for /health (both may be SQLite-backed)."""
+    return {
+        "sessions_active": len(router.sessions),
+        "sessions": router.sessions.stats(),
+        "report_cache": router.report_cache.stats() if router.report_cache else None,
+    }
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
+    # Read the session store and report cache off the loop, as /metrics does
+    storage = await asyncio.to_thread(_storage_health)
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "sessions_active": len(router.sessions)
+        "sessions_active": storage["sessions_active"],
+        "sessions": storage["sessions"],
+        "jobs": router.jobs.stats(),
+        "ingest_jobs": router.ingest_jobs.stats(),
+        "run_log": router.run_log.stats(),
+        "report_cache": storage["report_cache"],
+        "lite_answer_cache": lite_answer_cache_stats(),
+        "deep_runs": router.flights.stats(),
+        "admission": router.admission.stats(),
+        "deep_agent_ready": get_deep_agent.is_built,
+        "runs_cancelled": router.runs_cancelled
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: route, subagent, tool and LLM latencies plus service counters."""
+    # Collectors read the session and cache databases, so render off the loop
+    body = await asyncio.to_thread(REGISTRY.render)
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _overloaded(error: Overloaded) -> HTTPException:
+    """429 (queue full) or 503 (wait timed out) telling the client when to retry."""
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
 @app.post("/api/query", response_model=AgentResponse)
 async def query_agent(request: QueryRequest):
     """
@@ -531,10 +1569,12 @@ async def query_agent(request: QueryRequest):
         final_result = None
         
         # Collect all streaming results
-        for event in router.route(
+        async for event in router.aroute(
             query=request.query,
             agent_type=request.agent_type,
-            session_id=request.session_id
+            session_id=request.session_id,
+            inline_artifacts=request.inline_artifacts,
+            force_refresh=request.force_refresh
         ):
             if event["type"] == "result":
                 final_result = event["data"]
@@ -552,6 +1592,8 @@ async def query_agent(request: QueryRequest):
         
         return AgentResponse(**final_result)
         
+    except Overloaded as e:
+        raise _overloaded(e)
     except HTTPException:
         raise
     except Exception as e:
@@ -560,7 +1602,7 @@ async def query_agent(request: QueryRequest):
 
 
 @app.post("/api/query/stream")
-async def query_agent_stream(request: QueryRequest):
+async def query_agent_stream(request: QueryRequest, http_request: Request):
     """
     Process a research query with Server-Sent Events (SSE) streaming.
     
@@ -570,22 +1612,40 @@ async def query_agent_stream(request: QueryRequest):
     - step: Execution steps (for deep agent)
     - result: Final result
     - error: Error information
+    
+    If the client disconnects, the run is cancelled between graph steps
+    (deep runs are finished in the background when the report cache is on).
     """
     
+    events = router.aroute(
+        query=request.query,
+        agent_type=request.agent_type,
+        session_id=request.session_id,
+        inline_artifacts=request.inline_artifacts,
+        force_refresh=request.force_refresh
+    )
+    
+    # Admission happens before the first event, so overload is still a plain HTTP error
+    try:
+        first_event = await events.__anext__()
+    except Overloaded as e:
+        raise _overloaded(e)
+    except StopAsyncIteration:
+        first_event = None
+    
     async def event_generator():
         """Generate SSE events from router stream."""
         try:
-            for event in router.route(
-                query=request.query,
-                agent_type=request.agent_type,
-                session_id=request.session_id
-            ):
-                # Format as SSE
-                event_json = json.dumps(event, ensure_ascii=False)
-                yield f"data: {event_json}\n\n"
-                
-                # Small delay to prevent overwhelming the client
-                await asyncio.sleep(0.01)
+            async with aclosing(events):
+                if first_event is not None:
+                    yield b"data: " + dumps(first_event) + b"\n\n"
+                async for event in events:
+                    if await http_request.is_disconnected():
+                        logger.info("Client disconnected from stream")
+                        break
+                    
+                    # Format as SSE
+                    yield b"data: " + dumps(event) + b"\n\n"
                 
         except Exception as e:
             logger.error(f"Stream error: {e}", exc_info=True)
@@ -594,7 +1654,7 @@ async def query_agent_stream(request: QueryRequest):
                 "content": str(e),
                 "timestamp": datetime.now().isoformat()
             }
-            yield f"data: {json.dumps(error_event)}\n\n"
+            yield b"data: " + dumps(error_event) + b"\n\n"
     
     return StreamingResponse(
         event_generator(),
@@ -607,15 +1667,243 @@ async def query_agent_stream(request: QueryRequest):
     )
 
 
+def _job_response(job: Job) -> JobResponse:
+    """Build the API view of a job."""
+    return JobResponse(
+        **job.to_dict(),
+        session_id=job.params.get("session_id"),
+        queue_position=router.jobs.queue_position(job)
+    )
+
+
+def _ingest_job_response(job: Job) -> IngestJobResponse:
+    """Build the API view of an ingestion job."""
+    return IngestJobResponse(
+        **job.to_dict(),
+        queue_position=router.ingest_jobs.queue_position(job),
+        filename=job.params.get("filename"),
+        filenames=job.params.get("filenames"),
+        result=_ingest_result(job)
+    )
+
+
+def _ingest_result(job: Job) -> Optional[Union[IngestResponse, BulkIngestResponse]]:
+    if job.status != JOB_SUCCEEDED or not job.result:
+        return None
+    if job.kind == "ingest_bulk":
+        return BulkIngestResponse(**job.result)
+    return IngestResponse(**job.result)
+
+
+@app.post("/api/jobs", response_model=JobResponse, status_code=202)
+async def submit_job(request: JobRequest):
+    """
+    Queue a deep research run and return its job ID immediately.
+    
+    Poll /api/jobs/{job_id} for progress and fetch /api/jobs/{job_id}/result when done.
+    """
+    try:
+        # Resolving the session touches the session store: keep it off the loop
+        job = await asyncio.to_thread(
+            router.submit_deep_job,
+            request.query,
+            request.session_id,
+            inline_artifacts=request.inline_artifacts,
+            force_refresh=request.force_refresh
+        )
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return _job_response(job)
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Get status and progress of a background job."""
+    job = router.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return _job_response(job)
+
+
+@app.get("/api/jobs/{job_id}/result", response_model=AgentResponse)
+async def get_job_result(job_id: str):
+    """Get the result of a finished background job."""
+    job = router.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=job.error or "Job failed")
+    if job.status != JOB_SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}; result not available yet")
+    
+    return AgentResponse(**job.result)
+
+
+ARTIFACT_CHUNK_SIZE = 64 * 1024
+
+
+def _parse_range(range_header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single-range `Range: bytes=...` header.
+    
+    Returns:
+        tuple: (start, end) inclusive byte offsets, or None if unsatisfiable
+    """
+    units, _, spec = range_header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_str, _, end_str = spec.strip().partition("-")
+    try:
+        if not start_str:
+            # Suffix range: last N bytes
+            length = int(end_str)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size - 1
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def _artifact_file(run_id: str, name: str) -> Optional[tuple[Path, os.stat_result, str]]:
+    """Path, stat and ETag of an artifact, or None if unknown. Reads the disk, so call it off the event loop."""
+    path = router.artifacts.resolve(run_id, name)
+    if path is None:
+        return None
+    digest, _ = router.images.digest(path)
+    return path, path.stat(), f'"{digest[:32]}"'
+
+
+def _iter_file(path: Path, start: int, length: int):
+    """Stream `length` bytes of a file starting at `start`."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(ARTIFACT_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+@app.api_route("/api/artifacts/{run_id}/{name}", methods=["GET", "HEAD"])
+async def get_artifact(run_id: str, name: str, request: Request):
+    """
+    Download a report or chart produced by a deep run.
+    
+    Supports conditional requests (ETag / If-None-Match, If-Modified-Since)
+    and single byte ranges (Range / If-Range). Files are streamed in chunks.
+    """
+    artifact = await asyncio.to_thread(_artifact_file, run_id, name)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    
+    path, stat, etag = artifact
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=3600",
+    }
+    
+    # Conditional GET
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+            if int(stat.st_mtime) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    
+    size = stat.st_size
+    start, end = 0, size - 1
+    status_code = 200
+    
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        byte_range = _parse_range(range_header, size)
+        if byte_range is None:
+            return Response(
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    
+    length = max(end - start + 1, 0)
+    headers["Content-Length"] = str(length)
+    media_type = content_type_for(path)
+    
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    
+    return StreamingResponse(
+        _iter_file(path, start, length),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type
+    )
+
+
+@app.post("/api/runs/{run_id}/resume", response_model=JobResponse, status_code=202)
+async def resume_run(run_id: str, inline_artifacts: bool = False):
+    """
+    Resume an interrupted deep run from its last checkpoint as a background job.
+    
+    Subagent and tool calls that completed before the interruption are not
+    repeated. Poll /api/jobs/{job_id} as for any other deep job.
+    """
+    blocker = await asyncio.to_thread(router.resume_blocker, run_id)
+    if blocker is not None:
+        status_code, reason = blocker
+        raise HTTPException(status_code=status_code, detail=reason)
+    
+    try:
+        job = await asyncio.to_thread(router.submit_resume_job, run_id, inline_artifacts)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    return _job_response(job)
+
+
+@app.get("/api/runs/{run_id}/trace")
+async def get_run_trace(run_id: str):
+    """
+    Waterfall of a deep run: one span per LLM call, tool call and subagent,
+    with offsets from the start of the run and totals per tool/subagent.
+    """
+    spans = await asyncio.to_thread(router.spans.load, run_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail=f"No trace for run {run_id}")
+    return build_waterfall(run_id, spans)
+
+
 @app.get("/api/sessions/{session_id}")
 async def get_session_info(session_id: str):
     """Get information about a specific session."""
-    if session_id not in router.sessions:
+    query_count = await asyncio.to_thread(router.sessions.get, session_id)
+    if query_count is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
+    report_path = await asyncio.to_thread(router.sessions.get_report, session_id)
     return {
         "session_id": session_id,
-        "query_count": router.sessions[session_id],
+        "query_count": query_count,
+        "report_filename": Path(report_path).name if report_path else None,
         "timestamp": datetime.now().isoformat()
     }
 
@@ -623,76 +1911,106 @@ async def get_session_info(session_id: str):
 @app.delete("/api/sessions/{session_id}")
 async def delete_session(session_id: str):
     """Delete a session and reset its state."""
-    if session_id in router.sessions:
-        del router.sessions[session_id]
+    if await asyncio.to_thread(router.sessions.delete, session_id):
         return {"message": "Session deleted", "session_id": session_id}
     else:
         raise HTTPException(status_code=404, detail="Session not found")
 
 
-@app.post("/api/ingest", response_model=IngestResponse)
+def _validated_extension(filename: str) -> str:
+    """Lower-cased extension of an upload, or a 400 if it cannot be ingested."""
+    file_ext = os.path.splitext(filename or "")[1].lower()
+    if file_ext not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type: {file_ext or filename}. Allowed: {', '.join(SUPPORTED_EXTENSIONS)}"
+        )
+    return file_ext
+
+
+@app.post("/api/ingest", response_model=IngestJobResponse, status_code=202)
 async def ingest_document(file: UploadFile = File(...)):
     """
-    Upload and ingest a document into the internal knowledge base.
+    Upload a document and queue it for ingestion into the internal knowledge base.
     
     Supported formats: PDF, DOCX, TXT, MD
     
-    The document will be:
-    1. Saved temporarily
+    Returns immediately with a job ID. In the background the document is:
+    1. Parsed
     2. Split into chunks
     3. Embedded using Google Gemini embeddings
     4. Stored in Pinecone vector database
+    
+    Poll GET /api/ingest/{job_id} for progress, chunk/vector counts and
+    per-stage timings.
     """
     import tempfile
-    import shutil
     
     # Validate file extension
-    allowed_extensions = ['.pdf', '.docx', '.txt', '.md']
-    file_ext = os.path.splitext(file.filename)[1].lower()
+    file_ext = _validated_extension(file.filename)
     
-    if file_ext not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported file type: {file_ext}. Allowed: {', '.join(allowed_extensions)}"
-        )
+    def save_upload() -> str:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
+            shutil.copyfileobj(file.file, temp_file)
+            return temp_file.name
     
-    temp_file_path = None
+    # Spool the upload to disk off the event loop; the job deletes it when done
+    temp_file_path = await asyncio.to_thread(save_upload)
     
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            temp_file_path = temp_file.name
-            # Copy uploaded file to temp location
-            shutil.copyfileobj(file.file, temp_file)
-        
-        logger.info(f"Processing uploaded file: {file.filename}")
-        
-        # Process the document using ingest_file
-        # We need to modify ingest_file to return chunk count
-        ingest_file(temp_file_path)
-        
-        return IngestResponse(
-            success=True,
-            message=f"Document '{file.filename}' successfully ingested into knowledge base",
-            filename=file.filename,
-            chunks_created=None,  # Could be enhanced to return actual count
-            timestamp=datetime.now().isoformat()
-        )
-        
-    except Exception as e:
-        logger.error(f"Document ingestion failed: {e}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to ingest document: {str(e)}"
-        )
+        job = router.submit_ingest_job(temp_file_path, file.filename)
+    except JobQueueFull as e:
+        os.unlink(temp_file_path)
+        raise HTTPException(status_code=503, detail=str(e))
     
-    finally:
-        # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                logger.warning(f"Failed to delete temp file {temp_file_path}: {e}")
+    logger.info(f"Queued ingestion of uploaded file: {file.filename}")
+    return _ingest_job_response(job)
+
+
+@app.post("/api/ingest/bulk", response_model=IngestJobResponse, status_code=202)
+async def ingest_documents_bulk(files: List[UploadFile] = File(...)):
+    """
+    Upload several documents and ingest them as one background job.
+    
+    Documents are parsed in a process pool and embedded/upserted in
+    concurrent batches with retries. Poll GET /api/ingest/{job_id} for
+    progress and the throughput report (documents/sec, chunks/sec).
+    """
+    import tempfile
+    
+    for file in files:
+        _validated_extension(file.filename)
+    
+    def save_uploads() -> tuple[str, List[tuple[str, str]]]:
+        upload_dir = tempfile.mkdtemp(prefix="ingest-")
+        saved = []
+        for i, file in enumerate(files):
+            # Prefix with the position so identical names do not overwrite each other
+            path = os.path.join(upload_dir, f"{i:05d}_{os.path.basename(file.filename)}")
+            with open(path, "wb") as out:
+                shutil.copyfileobj(file.file, out)
+            saved.append((path, file.filename))
+        return upload_dir, saved
+    
+    upload_dir, saved = await asyncio.to_thread(save_uploads)
+    
+    try:
+        job = router.submit_bulk_ingest_job(upload_dir, saved)
+    except JobQueueFull as e:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise HTTPException(status_code=503, detail=str(e))
+    
+    logger.info(f"Queued bulk ingestion of {len(saved)} uploaded files")
+    return _ingest_job_response(job)
+
+
+@app.get("/api/ingest/{job_id}", response_model=IngestJobResponse)
+async def get_ingest_job(job_id: str):
+    """Status of an ingestion job; includes the outcome once it has finished."""
+    job = router.ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job {job_id} not found")
+    return _ingest_job_response(job)
 
 
 # ============================================================================
@@ -772,6 +2090,8 @@ if __name__ == "__main__":
             elif event_type == "error":
                 print(f"❌ ERROR: {event['content']}")
         
+        router.run_log.flush()
+        
         print("\n" + "=" * 80)
         print("✅ Testing complete!")
         print(f"📊 Total sessions: {len(router.sessions)}")
@@ -0,0 +1,195 @@
+"""
+Buffered, per-run execution logs.
+
+Agent runs used to append every line to a shared `steps.md`, opening the
+file once per line on the request path. `RunLogWriter` instead queues lines
+and a background thread writes them in batches to one file per run
+(`logs/runs/<run_id>.md`), rotating files that grow past a size limit.
+Writers never block: if the queue is full the line is dropped and counted.
+"""
+
+import os
+import queue
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+
+logger = logging.getLogger("RunLog")
+
+DEFAULT_LOG_DIR = Path(__file__).parent.parent / "logs" / "runs"
+
+_CLOSE = object()
+_FLUSH = object()
+
+
+class RunLogWriter:
+    """
+    Background log sink with one file per run.
+
+    Args:
+        log_dir: Directory for run log files
+        max_bytes: Size after which a run's file is rotated
+        backup_count: Rotated files kept per run (`<run_id>.md.1`, ...)
+        max_queue: Lines buffered before new lines are dropped
+        max_open_files: Open file handles kept across active runs
+    """
+
+    def __init__(
+        self,
+        log_dir: Path = DEFAULT_LOG_DIR,
+        max_bytes: int = 5 * 1024 * 1024,
+        backup_count: int = 3,
+        max_queue: int = 10000,
+        max_open_files: int = 32
+    ):
+        self.log_dir = Path(log_dir)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_open_files = max_open_files
+
+        self._queue: "queue.Queue[Tuple[str, object]]" = queue.Queue(maxsize=max_queue)
+        self._files: "OrderedDict[str, object]" = OrderedDict()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+        self.dropped = 0
+        self.written = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self.log_dir.mkdir(parents=True, exist_ok=True)
+                self._thread = threading.Thread(target=self._worker_loop, name="run-log-writer", daemon=True)
+                self._thread.start()
+
+    def path_for(self, run_id: str) -> Path:
+        """Log file of a run."""
+        safe_id = "".join(c for c in run_id if c.isalnum() or c in "-_") or "run"
+        return self.log_dir / f"{safe_id}.md"
+
+    def write(self, run_id: str, message: str):
+        """Queue a line for a run's log. Never blocks."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((run_id, str(message)))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, run_id: str):
+        """Flush and close a run's log file once its queued lines are written."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((run_id, _CLOSE))
+        except queue.Full:
+            # The handle is closed later by LRU eviction
+            pass
+
+    def flush(self, timeout: float = 5.0):
+        """Block until every line queued so far is on disk (for CLI use and shutdown)."""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(("", (_FLUSH, done)))
+        done.wait(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "open_files": len(self._files),
+        }
+
+    def _worker_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # Drain whatever else is waiting so lines are written in batches
+            while len(batch) < 1000:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                logger.warning(f"Could not write run log batch: {e}")
+
+    def _write_batch(self, batch: List[Tuple[str, object]]):
+        pending: "OrderedDict[str, List[str]]" = OrderedDict()
+        for run_id, item in batch:
+            if item is _CLOSE:
+                self._write_lines(run_id, pending.pop(run_id, []))
+                self._close_file(run_id)
+            elif isinstance(item, tuple) and item and item[0] is _FLUSH:
+                for pending_id, lines in pending.items():
+                    self._write_lines(pending_id, lines)
+                pending.clear()
+                for f in self._files.values():
+                    f.flush()
+                item[1].set()
+            else:
+                pending.setdefault(run_id, []).append(item)
+
+        for run_id, lines in pending.items():
+            self._write_lines(run_id, lines)
+        for f in self._files.values():
+            f.flush()
+
+    def _write_lines(self, run_id: str, lines: List[str]):
+        if not lines:
+            return
+        f = self._open_file(run_id)
+        f.write("\n".join(lines) + "\n")
+        self.written += len(lines)
+        if f.tell() >= self.max_bytes:
+            self._rotate(run_id)
+
+    def _open_file(self, run_id: str):
+        f = self._files.get(run_id)
+        if f is not None:
+            self._files.move_to_end(run_id)
+            return f
+        f = open(self.path_for(run_id), "a", encoding="utf-8")
+        self._files[run_id] = f
+        while len(self._files) > self.max_open_files:
+            _, oldest = self._files.popitem(last=False)
+            oldest.close()
+        return f
+
+    def _close_file(self, run_id: str):
+        f = self._files.pop(run_id, None)
+        if f is not None:
+            f.close()
+
+    def _rotate(self, run_id: str):
+        """Shift `<run>.md` -> `<run>.md.1` -> ... keeping backup_count files."""
+        self._close_file(run_id)
+        path = self.path_for(run_id)
+        for i in range(self.backup_count - 1, 0, -1):
+            src = path.with_name(f"{path.name}.{i}")
+            if src.exists():
+                os.replace(src, path.with_name(f"{path.name}.{i + 1}"))
+        if self.backup_count > 0:
+            os.replace(path, path.with_name(f"{path.name}.1"))
+        else:
+            path.unlink()
+
+
+_default_writer: Optional[RunLogWriter] = None
+_default_lock = threading.Lock()
+
+
+def get_run_log() -> RunLogWriter:
+    """Process-wide run log writer."""
+    global _default_writer
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = RunLogWriter(
+                log_dir=Path(os.getenv("RUN_LOG_DIR", str(DEFAULT_LOG_DIR))),
+                max_bytes=int(os.getenv("RUN_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+            )
+        return _default_writer
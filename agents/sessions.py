@@ -0,0 +1,391 @@
+"""
+Session storage for the routing layer.
+
+Two interchangeable backends are provided:
+- SessionStore: in-process memory, for a single worker
+- SQLiteSessionStore: a local SQLite file shared by every worker process,
+  so `uvicorn --workers N` routes follow-up queries consistently
+
+Both keep sessions in least-recently-used order so that LRU eviction and
+TTL expiry only ever look at the oldest entries instead of walking every
+session on each request.
+"""
+
+import time
+import sqlite3
+import threading
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+try:
+    from agents.sqlite_local import ThreadLocalConnection
+except ImportError:
+    from sqlite_local import ThreadLocalConnection
+
+logger = logging.getLogger("SessionStore")
+
+
+class SessionBackend(ABC):
+    """
+    Interface for session storage.
+
+    A session records how many queries it has received (which drives
+    deep/lite routing) and the path of the deep report linked to it.
+    """
+
+    @abstractmethod
+    def increment(self, session_id: str) -> int:
+        """Record a query for a session, creating it if needed, and return its query count."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[int]:
+        """Query count for a live session, or None if unknown or expired."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Remove a session. Returns False if it did not exist."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_report(self, session_id: str, report_path: str) -> None:
+        """Link a saved deep report to a session."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_report(self, session_id: str) -> Optional[str]:
+        """Path of the report linked to a session, if any."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Remove expired sessions and return how many were removed."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Size and eviction counters."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+
+class SessionStore(SessionBackend):
+    """
+    Bounded in-memory session store with idle TTL and LRU eviction.
+
+    Args:
+        ttl_seconds: Idle time after which a session expires
+        max_sessions: Maximum number of sessions kept; least recently used are evicted
+    """
+
+    def __init__(self, ttl_seconds: float = 6 * 3600, max_sessions: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+
+        # session_id -> {"query_count": int, "last_seen": monotonic seconds, "report_path": str}
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.evicted_lru = 0
+        self.expired = 0
+
+    def _is_expired(self, entry: Dict[str, Any], now: float) -> bool:
+        return now - entry["last_seen"] > self.ttl_seconds
+
+    def increment(self, session_id: str) -> int:
+        """
+        Record a query for a session, creating it if needed.
+
+        Returns:
+            int: The session's query count including this query (1 for a new session)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and self._is_expired(entry, now):
+                del self._sessions[session_id]
+                self.expired += 1
+                entry = None
+
+            if entry is None:
+                entry = {"query_count": 0}
+                self._sessions[session_id] = entry
+                self._evict_overflow()
+            else:
+                self._sessions.move_to_end(session_id)
+
+            entry["query_count"] += 1
+            entry["last_seen"] = now
+            return entry["query_count"]
+
+    def get(self, session_id: str) -> Optional[int]:
+        """Query count for a live session, or None if unknown or expired."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or self._is_expired(entry, time.monotonic()):
+                return None
+            return entry["query_count"]
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a session. Returns False if it did not exist."""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def set_report(self, session_id: str, report_path: str) -> None:
+        """Link a saved deep report to a session."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                entry["report_path"] = report_path
+
+    def get_report(self, session_id: str) -> Optional[str]:
+        """Path of the report linked to a session, if any."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry.get("report_path") if entry else None
+
+    def sweep(self) -> int:
+        """
+        Remove expired sessions.
+
+        Entries are ordered by last access, so the sweep stops at the first
+        session that is still live.
+
+        Returns:
+            int: Number of sessions removed
+        """
+        now = time.monotonic()
+        removed = 0
+        with self._lock:
+            while self._sessions:
+                session_id, entry = next(iter(self._sessions.items()))
+                if not self._is_expired(entry, now):
+                    break
+                del self._sessions[session_id]
+                removed += 1
+            self.expired += removed
+
+        if removed:
+            logger.info(f"Expired {removed} idle session(s)")
+        return removed
+
+    def _evict_overflow(self):
+        """Evict least recently used sessions beyond max_sessions. Caller holds the lock."""
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evicted_lru += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and eviction counters."""
+        return {
+            "backend": "memory",
+            "active": len(self),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "evicted_lru": self.evicted_lru,
+            "expired": self.expired,
+        }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionBackend):
+    """
+    Session store persisted in a local SQLite database.
+
+    Every read-modify-write runs in a `BEGIN IMMEDIATE` transaction, which
+    takes the database write lock, so counters stay consistent when several
+    worker processes share the same file.
+
+    Args:
+        db_path: Path of the SQLite database file
+        ttl_seconds: Idle time after which a session expires
+        max_sessions: Maximum number of sessions kept; least recently used are evicted
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = 6 * 3600, max_sessions: int = 10000):
+        self.db_path = str(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        # Autocommit: transactions are begun explicitly by _transaction()
+        self._connection = ThreadLocalConnection(self.db_path, isolation_level=None, pragmas=("synchronous=NORMAL",))
+
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " query_count INTEGER NOT NULL,"
+                " last_seen REAL NOT NULL,"
+                " report_path TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_seen ON sessions(last_seen)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connection())
+
+    def _bump_counter(self, conn: sqlite3.Connection, name: str, amount: int):
+        if amount:
+            conn.execute(
+                "INSERT INTO counters(name, value) VALUES(?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                (name, amount)
+            )
+
+    def increment(self, session_id: str) -> int:
+        """
+        Record a query for a session, creating it if needed.
+
+        Returns:
+            int: The session's query count including this query (1 for a new session)
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT query_count, last_seen FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+
+            if row is not None and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+                self._bump_counter(conn, "expired", 1)
+                row = None
+
+            if row is None:
+                conn.execute(
+                    "INSERT INTO sessions(session_id, query_count, last_seen) VALUES(?, 1, ?)",
+                    (session_id, now)
+                )
+                query_count = 1
+                self._evict_overflow(conn)
+            else:
+                query_count = row[0] + 1
+                conn.execute(
+                    "UPDATE sessions SET query_count = ?, last_seen = ? WHERE session_id = ?",
+                    (query_count, now, session_id)
+                )
+            return query_count
+
+    def _evict_overflow(self, conn: sqlite3.Connection):
+        """Evict least recently used sessions beyond max_sessions. Caller holds the transaction."""
+        overflow = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] - self.max_sessions
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM sessions WHERE session_id IN "
+                "(SELECT session_id FROM sessions ORDER BY last_seen LIMIT ?)",
+                (overflow,)
+            )
+            self._bump_counter(conn, "evicted_lru", overflow)
+
+    def get(self, session_id: str) -> Optional[int]:
+        """Query count for a live session, or None if unknown or expired."""
+        row = self._connection().execute(
+            "SELECT query_count FROM sessions WHERE session_id = ? AND last_seen >= ?",
+            (session_id, time.time() - self.ttl_seconds)
+        ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a session. Returns False if it did not exist."""
+        with self._transaction() as conn:
+            return conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def set_report(self, session_id: str, report_path: str) -> None:
+        """Link a saved deep report to a session."""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE sessions SET report_path = ? WHERE session_id = ?",
+                (report_path, session_id)
+            )
+
+    def get_report(self, session_id: str) -> Optional[str]:
+        """Path of the report linked to a session, if any."""
+        row = self._connection().execute(
+            "SELECT report_path FROM sessions WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def sweep(self) -> int:
+        """
+        Remove expired sessions.
+
+        Uses the last_seen index, so only expired rows are touched.
+
+        Returns:
+            int: Number of sessions removed
+        """
+        with self._transaction() as conn:
+            removed = conn.execute(
+                "DELETE FROM sessions WHERE last_seen < ?",
+                (time.time() - self.ttl_seconds,)
+            ).rowcount
+            self._bump_counter(conn, "expired", removed)
+
+        if removed:
+            logger.info(f"Expired {removed} idle session(s)")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Size and eviction counters (shared across worker processes)."""
+        counters = dict(self._connection().execute("SELECT name, value FROM counters").fetchall())
+        return {
+            "backend": "sqlite",
+            "active": len(self),
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "evicted_lru": counters.get("evicted_lru", 0),
+            "expired": counters.get("expired", 0),
+        }
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+class _ImmediateTransaction:
+    """Context manager running a block inside BEGIN IMMEDIATE ... COMMIT/ROLLBACK."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def create_session_store(
+    backend: str = "memory",
+    db_path: Optional[str] = None,
+    ttl_seconds: float = 6 * 3600,
+    max_sessions: int = 10000
+) -> SessionBackend:
+    """
+    Build the configured session backend.
+
+    Args:
+        backend: 'memory' (single process) or 'sqlite' (shared across processes)
+        db_path: Database file for the sqlite backend
+    """
+    backend = backend.lower()
+    if backend == "memory":
+        return SessionStore(ttl_seconds=ttl_seconds, max_sessions=max_sessions)
+    if backend == "sqlite":
+        if not db_path:
+            raise ValueError("db_path is required for the sqlite session backend")
+        return SQLiteSessionStore(db_path, ttl_seconds=ttl_seconds, max_sessions=max_sessions)
+    raise ValueError(f"Unknown session backend '{backend}'. Must be 'memory' or 'sqlite'.")
@@ -0,0 +1,151 @@
+"""
+Single-flight coalescing of identical concurrent agent runs.
+
+When several clients ask the same deep research question at the same time,
+only the first request starts a run. Later requests subscribe to that run's
+event stream: they first receive every event emitted so far, then the live
+events, and all of them get the same final result.
+
+If every subscriber disconnects before the run finishes, the run is
+cancelled, unless it was started with keep_alive (e.g. because its result
+will be cached), in which case it completes in the background.
+
+Everything here runs on the asyncio event loop, so no locking is needed.
+"""
+
+import asyncio
+import logging
+from contextlib import aclosing
+from datetime import datetime
+from typing import Any, AsyncGenerator, Callable, Dict, List
+
+logger = logging.getLogger("SingleFlight")
+
+_END = object()
+
+
+class Flight:
+    """One in-progress execution and the clients subscribed to it."""
+
+    def __init__(self, key: str, keep_alive: bool = False):
+        self.key = key
+        self.keep_alive = keep_alive
+        self.history: List[Dict[str, Any]] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.done = False
+        self.task: "asyncio.Task | None" = None
+        self.on_abandoned: "Callable[[Flight], None] | None" = None
+
+    def publish(self, event: Dict[str, Any]):
+        self.history.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def finish(self):
+        self.done = True
+        for queue in self.subscribers:
+            queue.put_nowait(_END)
+
+    async def subscribe(self) -> AsyncGenerator[Dict[str, Any], None]:
+        """Replay the events emitted so far, then follow the live stream."""
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.history:
+            queue.put_nowait(event)
+        if self.done:
+            queue.put_nowait(_END)
+        self.subscribers.append(queue)
+        try:
+            while True:
+                event = await queue.get()
+                if event is _END:
+                    break
+                yield event
+        finally:
+            self.subscribers.remove(queue)
+            if not self.subscribers and not self.done and self.on_abandoned:
+                self.on_abandoned(self)
+
+
+class SingleFlight:
+    """Registry of in-flight executions keyed by request identity."""
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.detached = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._flights
+
+    async def stream(
+        self,
+        key: str,
+        make_stream: Callable[[], AsyncGenerator[Dict[str, Any], None]],
+        keep_alive: bool = False
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Stream the events of the execution identified by `key`.
+
+        Starts `make_stream()` if no identical execution is in flight,
+        otherwise joins the existing one.
+
+        Args:
+            key: Identity of the execution
+            make_stream: Factory for the execution's event stream
+            keep_alive: Finish the execution even if all subscribers leave
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight(key, keep_alive=keep_alive)
+            flight.on_abandoned = self._abandoned
+            self._flights[key] = flight
+            self.executions += 1
+            flight.task = asyncio.create_task(self._drive(flight, make_stream))
+        else:
+            self.coalesced += 1
+            logger.info(f"Coalesced request into in-flight run ({len(flight.subscribers)} subscriber(s))")
+
+        async with aclosing(flight.subscribe()) as events:
+            async for event in events:
+                yield event
+
+    def _abandoned(self, flight: Flight):
+        """All subscribers left an unfinished execution."""
+        if flight.keep_alive:
+            self.detached += 1
+            logger.info("All clients left; finishing run in the background")
+            return
+        self.cancelled += 1
+        # New identical requests must not join a run that is being cancelled
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+        if flight.task:
+            flight.task.cancel()
+
+    async def _drive(self, flight: Flight, make_stream: Callable[[], AsyncGenerator[Dict[str, Any], None]]):
+        """Run the execution to completion, fanning events out to subscribers."""
+        try:
+            async for event in make_stream():
+                flight.publish(event)
+        except Exception as e:
+            logger.error(f"In-flight run failed: {e}", exc_info=True)
+            flight.publish({
+                "type": "error",
+                "content": str(e),
+                "timestamp": datetime.now().isoformat()
+            })
+        finally:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            flight.finish()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._flights),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "detached": self.detached,
+        }
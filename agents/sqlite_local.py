@@ -0,0 +1,44 @@
+"""
+Per-thread SQLite connections.
+
+sqlite3 connections must not be shared across threads, and the session
+store and report cache are used from the event loop and from worker
+threads alike, so each thread opens its own connection on first use.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Optional, Sequence
+
+
+class ThreadLocalConnection:
+    """
+    Callable returning the calling thread's connection to `db_path`.
+
+    Every connection uses WAL journaling, so readers do not block the
+    writer of another worker process.
+
+    Args:
+        db_path: Path of the SQLite database file; its directory is created
+        isolation_level: Passed to sqlite3.connect (None: autocommit, with
+            transactions begun explicitly)
+        pragmas: Further PRAGMA statements run on each new connection
+    """
+
+    def __init__(self, db_path: str, isolation_level: Optional[str] = "", pragmas: Sequence[str] = ()):
+        self.db_path = str(db_path)
+        self.isolation_level = isolation_level
+        self.pragmas = tuple(pragmas)
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+
+    def __call__(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=self.isolation_level)
+            conn.execute("PRAGMA journal_mode=WAL")
+            for pragma in self.pragmas:
+                conn.execute(f"PRAGMA {pragma}")
+            self._local.conn = conn
+        return conn
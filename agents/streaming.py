@@ -0,0 +1,59 @@
+"""
+Incremental consumption of LangGraph agent streams.
+
+`stream_mode="values"` materializes the whole state after every step, which
+gets quadratically more expensive as the message history grows. The helpers
+here use `stream_mode="updates"` instead and yield only the messages each
+node added.
+"""
+
+from typing import Any, Dict, Iterator, Optional
+
+
+def _as_message_list(messages: Any) -> list:
+    """Normalize a node's `messages` update into a list of messages."""
+    # Overwrite(...) style wrappers expose the replacement list as `.value`
+    messages = getattr(messages, "value", messages)
+    if messages is None:
+        return []
+    if isinstance(messages, (list, tuple)):
+        return list(messages)
+    return [messages]
+
+
+def iter_message_deltas(
+    agent: Any,
+    inputs: Optional[Dict[str, Any]],
+    config: Optional[Dict[str, Any]] = None
+) -> Iterator[Any]:
+    """
+    Stream an agent and yield each new message exactly once.
+
+    Messages that a node re-emits (e.g. a middleware rewriting the history)
+    are skipped by message ID, so consumers only ever see deltas.
+
+    Args:
+        agent: Compiled LangGraph graph
+        inputs: Graph input (None resumes from the last checkpoint)
+        config: Runnable config (thread_id, callbacks, ...)
+
+    Yields:
+        Message objects in the order they were produced
+    """
+    seen_ids = set()
+    for update in agent.stream(inputs, config=config, stream_mode="updates"):
+        if not isinstance(update, dict):
+            continue
+        for node_update in update.values():
+            if not isinstance(node_update, dict) or "messages" not in node_update:
+                continue
+            for message in _as_message_list(node_update["messages"]):
+                # RemoveMessage markers carry no content for the consumer
+                if getattr(message, "type", None) == "remove":
+                    continue
+                message_id = getattr(message, "id", None)
+                if message_id is not None:
+                    if message_id in seen_ids:
+                        continue
+                    seen_ids.add(message_id)
+                yield message
@@ -0,0 +1,264 @@
+"""
+Span tracing of agent runs.
+
+`TraceCallbackHandler` is a LangChain callback handler created per run and
+passed in the run config. It records a span for the run itself, every LLM
+call, every tool call (`internet_search`, `pubmed_search_tool`, ...) and
+every subagent invocation (the deep agent's `task` tool), nested under the
+span that caused it. Finished spans are appended to `logs/traces/<run_id>.jsonl`,
+from which `load_waterfall` rebuilds a timeline of the run.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+logger = logging.getLogger("Tracing")
+
+DEFAULT_TRACE_DIR = Path(__file__).parent.parent / "logs" / "traces"
+
+_RUN_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+SPAN_RUN = "run"
+SPAN_LLM = "llm"
+SPAN_TOOL = "tool"
+SPAN_SUBAGENT = "subagent"
+
+
+class SpanExporter:
+    """
+    Appends finished spans to one JSONL file per trace.
+
+    Args:
+        trace_dir: Directory holding `<trace_id>.jsonl` files
+    """
+
+    def __init__(self, trace_dir: Path = DEFAULT_TRACE_DIR):
+        self.trace_dir = Path(trace_dir)
+        self._lock = threading.Lock()
+
+    def path_for(self, trace_id: str) -> Optional[Path]:
+        """Trace file of a run, or None for IDs that are not safe file names."""
+        if not _RUN_ID_PATTERN.match(trace_id):
+            return None
+        return self.trace_dir / f"{trace_id}.jsonl"
+
+    def export(self, span: Dict[str, Any]):
+        path = self.path_for(span["trace_id"])
+        if path is None:
+            return
+        line = json.dumps(span, ensure_ascii=False, default=str) + "\n"
+        try:
+            with self._lock:
+                self.trace_dir.mkdir(parents=True, exist_ok=True)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            logger.warning(f"Could not export span: {e}")
+
+    def load(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        """All spans of a trace, or None if the trace is unknown."""
+        path = self.path_for(trace_id)
+        if path is None or not path.exists():
+            return None
+        spans = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        spans.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Partially written last line of a run still in progress
+                        continue
+        return spans
+
+
+def _model_name(kwargs: Dict[str, Any]) -> str:
+    params = kwargs.get("invocation_params") or {}
+    metadata = kwargs.get("metadata") or {}
+    return str(params.get("model") or params.get("model_name") or metadata.get("ls_model_name") or "llm")
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """
+    Records the spans of one agent run.
+
+    LangChain reports every runnable (graph nodes, chains, LLMs, tools) with
+    its parent's run ID. Only the run itself, LLM calls, tools and subagents
+    become spans; intermediate chains are skipped by mapping them to their
+    nearest recorded ancestor, so subagent tool calls nest under the subagent.
+
+    Args:
+        trace_id: ID linking the spans to the run (the deep run's thread_id)
+        exporter: Where finished spans are written
+        name: Name of the root span
+    """
+
+    def __init__(self, trace_id: str, exporter: SpanExporter, name: str = "agent-run"):
+        self.trace_id = trace_id
+        self.exporter = exporter
+        self.name = name
+        self._open: Dict[UUID, Dict[str, Any]] = {}
+        # run_id -> span_id of the nearest recorded span at or above it
+        self._nearest: Dict[UUID, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], kind: str, name: str, **attributes):
+        with self._lock:
+            self._open[run_id] = {
+                "trace_id": self.trace_id,
+                "span_id": str(run_id),
+                "parent_id": self._nearest.get(parent_run_id) if parent_run_id else None,
+                "kind": kind,
+                "name": name,
+                "start": time.time(),
+                "_perf": time.perf_counter(),
+                "attributes": {k: v for k, v in attributes.items() if v is not None},
+            }
+            self._nearest[run_id] = str(run_id)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None):
+        with self._lock:
+            self._nearest.pop(run_id, None)
+            span = self._open.pop(run_id, None)
+        if span is None:
+            return
+        span["duration_ms"] = round((time.perf_counter() - span.pop("_perf")) * 1000, 2)
+        span["status"] = "error" if error is not None else "ok"
+        if error is not None:
+            span["error"] = str(error)[:500]
+        self.exporter.export(span)
+
+    # -- chains (graph nodes); only the outermost one is a span -------------
+
+    def on_chain_start(self, serialized: Dict[str, Any], inputs: Any, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        if parent_run_id is None:
+            self._start(run_id, None, SPAN_RUN, self.name)
+        else:
+            with self._lock:
+                self._nearest[run_id] = self._nearest.get(parent_run_id)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end_chain(run_id, error)
+
+    def _end_chain(self, run_id: UUID, error: Optional[BaseException] = None):
+        if run_id in self._open:
+            self._end(run_id, error)
+        else:
+            with self._lock:
+                self._nearest.pop(run_id, None)
+
+    # -- tools and subagents -------------------------------------------------
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, parent_run_id: Optional[UUID] = None, inputs: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        if name == "task" and isinstance(inputs, dict) and inputs.get("subagent_type"):
+            self._start(
+                run_id, parent_run_id, SPAN_SUBAGENT, inputs["subagent_type"],
+                description=str(inputs.get("description", ""))[:200]
+            )
+        else:
+            self._start(run_id, parent_run_id, SPAN_TOOL, name, input=str(input_str)[:200])
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, error)
+
+    # -- LLM calls -----------------------------------------------------------
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        self._start(run_id, parent_run_id, SPAN_LLM, _model_name(kwargs))
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        self._start(run_id, parent_run_id, SPAN_LLM, _model_name(kwargs))
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, error)
+
+
+def build_waterfall(trace_id: str, spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Arrange a trace's spans as a timeline.
+
+    Spans are ordered by start time with their offset from the start of the
+    run and their nesting depth; totals summarize where the time went.
+    """
+    if not spans:
+        return {"run_id": trace_id, "duration_ms": 0, "spans": [], "totals": []}
+
+    by_id = {span["span_id"]: span for span in spans}
+    origin = min(span["start"] for span in spans)
+    end = max(span["start"] + span.get("duration_ms", 0) / 1000 for span in spans)
+
+    def depth(span: Dict[str, Any]) -> int:
+        level = 0
+        parent = by_id.get(span.get("parent_id"))
+        while parent is not None and level < 64:
+            level += 1
+            parent = by_id.get(parent.get("parent_id"))
+        return level
+
+    timeline = [
+        {
+            "span_id": span["span_id"],
+            "parent_id": span.get("parent_id"),
+            "kind": span["kind"],
+            "name": span["name"],
+            "depth": depth(span),
+            "offset_ms": round((span["start"] - origin) * 1000, 2),
+            "duration_ms": span.get("duration_ms", 0),
+            "status": span.get("status", "ok"),
+            "error": span.get("error"),
+            "attributes": span.get("attributes", {}),
+        }
+        for span in sorted(spans, key=lambda s: s["start"])
+    ]
+
+    totals: Dict[tuple, Dict[str, Any]] = {}
+    for span in spans:
+        if span["kind"] == SPAN_RUN:
+            continue
+        entry = totals.setdefault((span["kind"], span["name"]), {
+            "kind": span["kind"], "name": span["name"], "count": 0, "total_ms": 0.0
+        })
+        entry["count"] += 1
+        entry["total_ms"] = round(entry["total_ms"] + span.get("duration_ms", 0), 2)
+
+    return {
+        "run_id": trace_id,
+        "started_at": origin,
+        "duration_ms": round((end - origin) * 1000, 2),
+        "span_count": len(spans),
+        "spans": timeline,
+        "totals": sorted(totals.values(), key=lambda t: t["total_ms"], reverse=True),
+    }
+
+
+_default_exporter: Optional[SpanExporter] = None
+_default_lock = threading.Lock()
+
+
+def get_span_exporter() -> SpanExporter:
+    """Process-wide span exporter."""
+    global _default_exporter
+    with _default_lock:
+        if _default_exporter is None:
+            _default_exporter = SpanExporter(Path(os.getenv("TRACE_DIR", str(DEFAULT_TRACE_DIR))))
+        return _default_exporter
@@ -1,30 +1,50 @@
 from langchain.tools import tool
 from langchain.agents import create_agent
 from langchain.agents.middleware import ModelCallLimitMiddleware, ToolCallLimitMiddleware
-from langchain_groq import ChatGroq
 import os
 import tempfile
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
-import numpy as np
 from dotenv import load_dotenv
+try:
+    from agents.artifacts import record_chart
+    from agents.lazy import lazy
+except ImportError:
+    from artifacts import record_chart
+    from lazy import lazy
 
 
 load_dotenv()
 
-# Initialize LLM
-llm =ChatGroq(
-    api_key=os.getenv("visual_groq"),
-    model="moonshotai/kimi-k2-instruct-0905",
-    temperature=0.1,
-)
+@lazy
+def get_llm():
+    """LLM of the visualization agent, created when the agent is built."""
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        api_key=os.getenv("visual_groq"),
+        model="moonshotai/kimi-k2-instruct-0905",
+        temperature=0.1,
+    )
 
-# Directory for saving charts
+# Directory for saving charts (created with the first chart)
 CHARTS_DIR = os.path.join(os.getcwd(), "output", "visualizations")
-os.makedirs(CHARTS_DIR, exist_ok=True)
+
+@lazy
+def get_plotting():
+    """
+    Plotting libraries, imported with the first chart.
+
+    matplotlib, seaborn and pandas dominate this module's import time and are
+    only needed when a chart is actually drawn.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    import pandas as pd
+    import numpy as np
+
+    os.makedirs(CHARTS_DIR, exist_ok=True)
+    return plt, sns, pd, np
 
 @tool
 def execute_visualization(
@@ -43,6 +63,8 @@ def execute_visualization(
         chart_title: Title/name for the chart (used for filename)
     """
     try:
+        plt, sns, pd, np = get_plotting()
+        
         # Sanitize filename
         safe_title = "".join(c for c in chart_title if c.isalnum() or c in (' ', '_')).rstrip().replace(' ', '_')
         filename = os.path.join(CHARTS_DIR, f"{safe_title}_chart.png")
@@ -72,6 +94,9 @@ def execute_visualization(
         
         plt.close('all')
         
+        # Attribute the chart to the deep research run that requested it
+        record_chart(filename)
+        
         return f"Chart created successfully and saved to {filename}"
     
     except Exception as e:
@@ -194,7 +219,7 @@ def get_visualization_agent():
     """
     
     return create_agent(
-        llm, 
+        get_llm(), 
         tools=tools, 
         system_prompt=system_prompt,
         middleware=[
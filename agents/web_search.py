@@ -1,13 +1,19 @@
 import os
 import json
 from typing import Literal
-from tavily import TavilyClient
 from langchain_core.tools import tool
-from langchain.agents import create_agent
+try:
+    from agents.lazy import lazy
+except ImportError:
+    from lazy import lazy
 
-# Initialize Tavily Client
-# Ensure TAVILY_API_KEY is set in your environment variables
-tavily_client = TavilyClient(api_key=os.environ.get("TAVILY_API_KEY"))
+@lazy
+def get_tavily_client():
+    """Tavily client, created on the first search."""
+    from tavily import TavilyClient
+
+    # Ensure TAVILY_API_KEY is set in your environment variables
+    return TavilyClient(api_key=os.environ.get("TAVILY_API_KEY"))
 
 @tool
 def internet_search(
@@ -26,7 +32,7 @@ def internet_search(
         topic (str): 'general', 'pharma', or 'finance','news'.
         include_raw_content (bool): Whether to include raw content.
     """
-    results = tavily_client.search(
+    results = get_tavily_client().search(
         query,
         max_results=max_results,
         include_raw_content=include_raw_content,
@@ -0,0 +1,33 @@
+"""
+Fixtures shared by the API tests.
+
+The app runs in-process with every LLM replaced by the scripted fake model
+of agents/loadtest.py and Tavily, PubMed and Pinecone stubbed, so the tests
+use no API quota. Sessions, reports, run manifests, logs and checkpoints
+are kept in a temporary directory.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# The agents import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "agents"))
+
+# Seconds per fake LLM call: long enough for deep runs to overlap the checks made while they run
+LLM_LATENCY = 0.2
+TOOL_LATENCY = 0.02
+
+
+@pytest.fixture(scope="session")
+def route(tmp_path_factory):
+    """The route module with fake backends installed; serve `route.app`."""
+    pytest.importorskip("fastapi")
+    pytest.importorskip("deepagents")
+    import loadtest
+
+    with loadtest.fake_app(
+        tmp_path_factory.mktemp("app"), llm_latency=LLM_LATENCY, tool_latency=TOOL_LATENCY
+    ) as route:
+        yield route
@@ -0,0 +1,18 @@
+"""Charts are attributed only to the run that recorded them."""
+
+from artifacts import ImageIndex, end_run, record_chart, start_run
+
+
+def test_run_without_charts_does_not_take_a_concurrent_runs_chart(tmp_path):
+    chart = tmp_path / "A_chart.png"
+    chart.write_bytes(b"\x89PNG")
+    index = ImageIndex()
+
+    token_b = start_run("run-b")
+    end_run(token_b)
+    token_a = start_run("run-a")
+    record_chart(str(chart))
+    end_run(token_a)
+
+    assert index.run_paths("run-b") == []
+    assert index.run_paths("run-a") == [chart]
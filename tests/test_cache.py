@@ -0,0 +1,35 @@
+"""Cached deep reports are not served once new documents have been ingested."""
+
+import time
+
+from cache import ReportCache
+
+QUERY = "Assess minocycline repurposing, cached"
+
+
+def _wait(job):
+    for _ in range(100):
+        if job.is_finished:
+            return
+        time.sleep(0.05)
+    raise AssertionError(f"job {job.job_id} did not finish")
+
+
+def test_ingest_invalidates_cached_reports(route, tmp_path, monkeypatch):
+    cache = ReportCache(str(tmp_path / "report_cache.db"), data_version="v1")
+    cache.put(QUERY, {"text": "Report on the old documents."})
+    monkeypatch.setattr(route.router, "report_cache", cache)
+    monkeypatch.setattr(route, "ingest_file", lambda path, progress, source_name: {
+        "documents": 1, "chunks": 1, "vectors": 1, "timings": {}
+    })
+    upload = tmp_path / "upload.txt"
+    upload.write_text("New trial results.", encoding="utf-8")
+
+    assert cache.get(QUERY) is not None
+    job = route.router.submit_ingest_job(str(upload), "trial.txt")
+    _wait(job)
+
+    assert job.status == "succeeded"
+    assert cache.get(QUERY) is None
+    # Other workers sharing the database see the new version as well
+    assert ReportCache(str(tmp_path / "report_cache.db"), data_version="v1").get(QUERY) is None
@@ -0,0 +1,89 @@
+"""
+Agent runs execute in worker threads, so the event loop keeps serving other
+requests (such as /health) while deep runs are in flight.
+"""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from loadtest import asgi_call, asgi_request, percentile
+
+# Within the default deep admission limit (AGENT_DEEP_CONCURRENCY=2), so none is queued
+DEEP_RUNS = 2
+
+
+async def _health_latencies(app, count: int, interval: float = 0.02):
+    latencies = []
+    for _ in range(count):
+        status, _, total, _ = await asgi_call(app, "GET", "/health")
+        assert status == 200
+        latencies.append(total)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+def test_health_stays_fast_while_deep_runs_are_in_flight(route):
+    async def scenario():
+        idle = await _health_latencies(route.app, 20)
+        runs = [
+            asyncio.create_task(asgi_request(
+                route.app, "/api/query",
+                {"query": f"Assess minocycline repurposing, concurrency {i}", "agent_type": "deep"}
+            ))
+            for i in range(DEEP_RUNS)
+        ]
+        busy = []
+        while not all(run.done() for run in runs):
+            busy += await _health_latencies(route.app, 1)
+        return idle, busy, await asyncio.gather(*runs)
+
+    idle, busy, results = asyncio.run(scenario())
+
+    assert [status for status, *_ in results] == [200] * DEEP_RUNS
+    assert len(busy) >= 10, "deep runs finished before /health could be measured under load"
+    # Flat: no slower than a few times the idle latency (with a floor for noisy machines)
+    assert percentile(busy, 95) < max(0.25, 5 * percentile(idle, 95))
+
+
+def test_lite_answers_while_deep_runs_are_in_flight(route):
+    async def scenario():
+        deep = asyncio.create_task(asgi_request(
+            route.app, "/api/query",
+            {"query": "Assess minocycline repurposing, lite overlap", "agent_type": "deep"}
+        ))
+        await asyncio.sleep(0.05)
+        lite = await asgi_request(
+            route.app, "/api/query", {"query": "What is the current market size?", "agent_type": "lite"}
+        )
+        return lite, deep.done(), await deep
+
+    (lite_status, _, _, _), deep_finished, (deep_status, _, _, _) = asyncio.run(scenario())
+
+    assert lite_status == 200 and deep_status == 200
+    # The lite answer came back while the deep run was still going
+    assert not deep_finished
+
+
+def test_disconnected_run_keeps_its_slot_until_the_worker_finishes(route):
+    pool = route.router.admission.pools["lite"]
+
+    async def scenario():
+        events = route.router.aroute("What is the current pipeline status?", agent_type="lite")
+        # The first event from the run itself: its worker is now on the LLM call
+        while (await events.__anext__())["type"] == "session_info":
+            pass
+        await events.aclose()
+        held_after_disconnect = pool.active
+        for _ in range(100):
+            if pool.active == 0:
+                break
+            await asyncio.sleep(0.05)
+        return held_after_disconnect, pool.active
+
+    held_after_disconnect, held_after_run = asyncio.run(scenario())
+
+    assert held_after_disconnect == 1
+    assert held_after_run == 0
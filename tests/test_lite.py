@@ -0,0 +1,51 @@
+"""Only the final reply of the lite agent is streamed as answer text."""
+
+from contextlib import ExitStack
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+from loadtest import CALL_FIRST_TOOL, ScriptedChatModel, _loaded_modules, _patch
+
+ANSWER = "Minocycline's market is growing at a 4.2% CAGR."
+PREAMBLE = "Let me search the web first. "
+
+
+class PreambleChatModel(ScriptedChatModel):
+    """Writes a sentence before each tool call, as Gemini often does."""
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for i, generation in enumerate(super()._stream(messages, stop, run_manager, **kwargs)):
+            if i == 0 and generation.message.tool_call_chunks:
+                preamble = ChatGenerationChunk(message=AIMessageChunk(content=PREAMBLE))
+                if run_manager:
+                    run_manager.on_llm_new_token(PREAMBLE, chunk=preamble)
+                yield preamble
+            yield generation
+
+
+@pytest.fixture
+def lite(route):
+    import lite
+
+    with ExitStack() as stack:
+        model = PreambleChatModel(script=CALL_FIRST_TOOL, answer=ANSWER, model_name="fake-lite")
+        for module in _loaded_modules("lite"):
+            _patch(stack, module, "get_llm", lambda: model)
+            for factory in (module.get_agent, module.get_answer_cache):
+                factory.reset()
+                stack.callback(factory.reset)
+        yield lite
+
+
+def test_text_written_with_a_tool_call_is_not_streamed(lite):
+    events = list(lite.stream_answer("What is the current market size of minocycline?"))
+
+    kinds = [kind for kind, _ in events]
+    assert "tool_start" in kinds and "tool_end" in kinds
+    assert "".join(payload for kind, payload in events if kind == "text") == ANSWER
+    assert events[-1] == ("answer", ANSWER)
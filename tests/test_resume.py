@@ -0,0 +1,156 @@
+"""
+A deep run interrupted mid-way resumes through POST /api/runs/{run_id}/resume
+from its last checkpoint, without repeating the subagent calls that had
+already finished, and its checkpoints are deleted once it completes.
+"""
+
+import json
+import asyncio
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from pydantic import Field
+
+from loadtest import (
+    CALL_FIRST_TOOL, ScriptedChatModel, _loaded_modules, _patch, _turns_since_human,
+    asgi_call, orchestrator_script, synthetic_report
+)
+
+REPORT = synthetic_report(2000)
+
+
+class InterruptedChatModel(ScriptedChatModel):
+    """Orchestrator that dies once at turn `fail_on_turn`, like a worker killed mid-run."""
+
+    fail_on_turn: int = 1
+    # Shared with the copies made by bind_tools
+    state: Dict[str, Any] = Field(default_factory=dict)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if _turns_since_human(messages) == self.fail_on_turn and not self.state.get("failed"):
+            self.state["failed"] = True
+            raise RuntimeError("worker killed")
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+class CountingChatModel(ScriptedChatModel):
+    """Subagent model counting its calls."""
+
+    # Shared with the copies made by bind_tools
+    counter: Dict[str, int] = Field(default_factory=dict)
+
+    @property
+    def calls(self) -> int:
+        return self.counter.get("calls", 0)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.counter["calls"] = self.calls + 1
+        return super()._generate(messages, stop, run_manager, **kwargs)
+
+
+@pytest.fixture
+def interrupted(route):
+    """
+    Deep runs whose orchestrator fails once after the subagents have answered.
+
+    Yields a function returning how often the web and PubMed subagent models were called.
+    """
+    with ExitStack() as stack:
+        workers = []
+        for final in _loaded_modules("final"):
+            for spec in (final.research_subagent, final.pubmed_subagent):
+                workers.append(CountingChatModel(script=CALL_FIRST_TOOL, answer="Findings.", model_name=spec["name"]))
+                _patch(stack, spec, "model", workers[-1])
+            orchestrator = InterruptedChatModel(script=orchestrator_script(), answer=REPORT, model_name="fake-deep")
+            _patch(stack, final, "get_deep_agent_llm", lambda: orchestrator)
+            final.get_agent.reset()
+            stack.callback(final.get_agent.reset)
+        yield lambda: sum(worker.calls for worker in workers)
+
+
+def _failed_run(route, query: str) -> str:
+    """Run ID of the interrupted run for `query`."""
+    for path in route.router.artifacts.runs_dir.glob("*.json"):
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+        if manifest.get("query") == query and manifest.get("status") == "failed":
+            return manifest["run_id"]
+    raise AssertionError(f"no failed run recorded for {query!r}")
+
+
+async def _interrupt(route, query: str) -> str:
+    status, _, _, _ = await asgi_call(route.app, "POST", "/api/query", {"query": query, "agent_type": "deep"})
+    assert status == 500
+    return _failed_run(route, query)
+
+
+def test_interrupted_run_resumes_without_repeating_subagents(route, interrupted):
+    import final
+
+    query = "Assess minocycline repurposing, resumed"
+
+    async def scenario():
+        run_id = await _interrupt(route, query)
+        worker_calls = interrupted()
+
+        status, _, _, body = await asgi_call(route.app, "POST", f"/api/runs/{run_id}/resume")
+        assert status == 202
+        job_id = json.loads(body)["job_id"]
+        for _ in range(200):
+            _, _, _, body = await asgi_call(route.app, "GET", f"/api/jobs/{job_id}")
+            if json.loads(body)["status"] in ("succeeded", "failed"):
+                break
+            await asyncio.sleep(0.05)
+        status, _, _, body = await asgi_call(route.app, "GET", f"/api/jobs/{job_id}/result")
+        return run_id, worker_calls, status, json.loads(body)
+
+    run_id, worker_calls, status, result = asyncio.run(scenario())
+
+    assert status == 200
+    assert result["run_id"] == run_id and result["text"] == REPORT
+    assert worker_calls > 0
+    # The subagents finished before the interruption: they are not run again
+    assert interrupted() == worker_calls
+    assert route.router.artifacts.load(run_id)["status"] == "completed"
+    assert run_id not in final.checkpointed_threads()
+
+
+def test_prune_keeps_recent_unfinished_runs_only(route, interrupted):
+    import final
+
+    # Each interrupted run needs its own failure
+    interrupted_runs = []
+    for query in ("Assess minocycline repurposing, abandoned", "Assess minocycline repurposing, recent"):
+        for module in _loaded_modules("final"):
+            module.get_deep_agent_llm().state.clear()
+        interrupted_runs.append(asyncio.run(_interrupt(route, query)))
+    abandoned, recent = interrupted_runs
+
+    long_ago = datetime.now() - timedelta(hours=final.CHECKPOINT_RETENTION_HOURS + 1)
+    route.router.artifacts.save(abandoned, {}, updated_at=long_ago.isoformat())
+
+    route.router.prune_checkpoints()
+
+    threads = final.checkpointed_threads()
+    assert abandoned not in threads
+    assert recent in threads
+
+
+def test_run_executing_in_another_worker_is_not_resumed(route, interrupted):
+    import final
+
+    query = "Assess minocycline repurposing, other worker"
+    run_id = asyncio.run(_interrupt(route, query))
+    # Another worker picked the run up and keeps its marker fresh
+    route.router.artifacts.heartbeat(run_id, start=True)
+    try:
+        status, _, _, _ = asyncio.run(asgi_call(route.app, "POST", f"/api/runs/{run_id}/resume"))
+        route.router.prune_checkpoints()
+        assert status == 409
+        assert run_id in final.checkpointed_threads()
+    finally:
+        route.router.artifacts.end_heartbeat(run_id)